@@ -9,6 +9,7 @@ from pathlib import Path
 
 from PySide6.QtWidgets import QApplication
 
+from myservers.core.actions import ActionsStore
 from myservers.core.servers import ServerStore
 from myservers.storage.sqlite_store import SqliteStore
 from myservers.ui.main_window import MainWindow
@@ -29,6 +30,8 @@ def main() -> int:
     sqlite_path, json_path = _get_default_paths()
     backend = SqliteStore(sqlite_path, json_migration_path=json_path)
     store = ServerStore(backend)
+    # Runs still marked running were cut short when the app last exited.
+    ActionsStore(backend, store).recover_interrupted_runs()
     window = MainWindow(store)
     window.resize(900, 600)
     window.show()
@@ -0,0 +1,411 @@
+"""Run a process and capture its output with bounded memory.
+
+Pipes are read incrementally; each stream keeps only its first and last few KB
+plus a total byte count, so a command that prints gigabytes costs the same
+memory as one that prints a page. Dropped output is replaced by an explicit
+marker in the captured text. An optional on_output callback sees every chunk
+as it arrives (e.g. to record live output, see core.live_output).
+
+Commands start in their own process group (session). On timeout, or when the
+caller cancels through a CancelToken, the whole group gets SIGTERM, then
+SIGKILL after a grace period, so children of a shell die with it instead of
+running on and holding the pipes open.
+
+run_bounded_async is the asyncio counterpart: no threads per process, so one
+event loop can drive thousands of commands at once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import os
+import signal
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from typing import IO, Callable, Optional, Sequence
+
+# Per stream: first HEAD_BYTES and last TAIL_BYTES are kept (together below actions.MAX_TEXT).
+HEAD_BYTES = 24 * 1024
+TAIL_BYTES = 24 * 1024
+
+# on_output(stream, data): stream is "stdout" or "stderr"; called from reader threads.
+OutputCallback = Callable[[str, bytes], None]
+
+# Time between SIGTERM and SIGKILL when a command is stopped.
+TERMINATE_GRACE_S = 5.0
+
+_CHUNK_SIZE = 64 * 1024
+# How long to wait for pipes to drain after killing a timed-out process.
+_DRAIN_TIMEOUT_S = 2.0
+# How often a blocking wait checks its CancelToken.
+_CANCEL_POLL_S = 0.1
+
+
+class CancelToken:
+    """Stops the commands it is passed to; cancel() may be called from any thread.
+
+    One token can be shared by many runs, e.g. to abort a whole fleet run.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._callbacks: list[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout_s: float) -> bool:
+        """Sleep up to timeout_s, waking early on cancel; True if cancelled."""
+        return self._event.wait(timeout_s)
+
+    async def wait_async(self, timeout_s: float) -> bool:
+        """wait() for asyncio tasks."""
+        loop = asyncio.get_running_loop()
+        woken = asyncio.Event()
+        unregister = self.add_callback(lambda: _call_soon(loop, woken.set))
+        try:
+            await asyncio.wait_for(woken.wait(), timeout_s)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            unregister()
+        return self.cancelled
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call callback on cancel (right away if already cancelled); returns a function that unregisters it."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback: Callable[[], None]) -> None:
+        with self._lock, contextlib.suppress(ValueError):
+            self._callbacks.remove(callback)
+
+
+class BoundedBuffer:
+    """Keeps the head and tail of a byte stream and counts the rest."""
+
+    def __init__(self, head_bytes: int = HEAD_BYTES, tail_bytes: int = TAIL_BYTES) -> None:
+        self._head_limit = head_bytes
+        self._tail_limit = tail_bytes
+        self._head = bytearray()
+        self._tail = bytearray()
+        self.total_bytes = 0
+
+    def write(self, data: bytes) -> None:
+        self.total_bytes += len(data)
+        room = self._head_limit - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if data and self._tail_limit > 0:
+            self._tail += data
+            excess = len(self._tail) - self._tail_limit
+            if excess > 0:
+                del self._tail[:excess]
+
+    @property
+    def omitted_bytes(self) -> int:
+        return self.total_bytes - len(self._head) - len(self._tail)
+
+    @property
+    def truncated(self) -> bool:
+        return self.omitted_bytes > 0
+
+    def text(self) -> str:
+        # Same newline handling as subprocess text mode.
+        if not self.truncated:
+            # One buffer: a character or CRLF may straddle the head/tail split.
+            return bytes(self._head + self._tail).decode("utf-8", errors="replace").replace("\r\n", "\n")
+        # Only the characters cut at the omitted gap are replaced.
+        head = self._head.decode("utf-8", errors="replace").replace("\r\n", "\n")
+        tail = self._tail.decode("utf-8", errors="replace").replace("\r\n", "\n")
+        return f"{head}\n[... {self.omitted_bytes} bytes omitted ...]\n{tail}"
+
+
+@dataclass
+class CaptureResult:
+    exit_code: int
+    stdout: str
+    stderr: str
+    duration_ms: int
+    stdout_bytes: int = 0
+    stderr_bytes: int = 0
+    stdout_truncated: bool = False
+    stderr_truncated: bool = False
+    timed_out: bool = False
+    cancelled: bool = False
+    # SSH runs: the address that served the run (see exec_ssh failover).
+    host: Optional[str] = None
+
+    def as_tuple(self) -> tuple[int, str, str, int]:
+        """(exit_code, stdout, stderr, duration_ms), the executors' legacy return shape."""
+        return self.exit_code, self.stdout, self.stderr, self.duration_ms
+
+
+def run_bounded(
+    args: str | Sequence[str],
+    *,
+    shell: bool = False,
+    timeout_s: float = 60,
+    head_bytes: int = HEAD_BYTES,
+    tail_bytes: int = TAIL_BYTES,
+    on_output: Optional[OutputCallback] = None,
+    cancel: Optional[CancelToken] = None,
+    grace_s: float = TERMINATE_GRACE_S,
+) -> CaptureResult:
+    """Run args, streaming stdout/stderr into bounded buffers.
+
+    On timeout the process group is stopped and exit_code is -1 with
+    "[timeout]" appended to stderr, as subprocess.run-based callers reported
+    it; after cancel.cancel() the same happens with "[cancelled]" and
+    result.cancelled set. Raises FileNotFoundError if the program does not exist.
+    """
+    start = time.monotonic()
+    proc = subprocess.Popen(
+        args,
+        shell=shell,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        start_new_session=True,
+    )
+    out = BoundedBuffer(head_bytes, tail_bytes)
+    err = BoundedBuffer(head_bytes, tail_bytes)
+    readers = [
+        threading.Thread(target=_pump, args=(proc.stdout, out, "stdout", on_output), daemon=True),
+        threading.Thread(target=_pump, args=(proc.stderr, err, "stderr", on_output), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    deadline = start + timeout_s
+    timed_out = cancelled = False
+    exit_code = _wait(proc, deadline, cancel)
+    # A background child can hold the pipes open after the command exits; the
+    # output counts toward the timeout.
+    if exit_code is None or not _drained(readers, deadline, cancel):
+        cancelled = cancel is not None and cancel.cancelled
+        timed_out = not cancelled
+        _terminate(proc, readers, grace_s)
+        exit_code = -1
+    # A child that left the process group can keep the pipes open after a kill.
+    for reader in readers:
+        reader.join(_DRAIN_TIMEOUT_S)
+    duration_ms = int((time.monotonic() - start) * 1000)
+    return _result(out, err, exit_code, duration_ms, timed_out=timed_out, cancelled=cancelled)
+
+
+async def run_bounded_async(
+    args: str | Sequence[str],
+    *,
+    shell: bool = False,
+    timeout_s: float = 60,
+    head_bytes: int = HEAD_BYTES,
+    tail_bytes: int = TAIL_BYTES,
+    on_output: Optional[OutputCallback] = None,
+    cancel: Optional[CancelToken] = None,
+    grace_s: float = TERMINATE_GRACE_S,
+) -> CaptureResult:
+    """Like run_bounded, awaited on the running event loop.
+
+    on_output is called on the event loop thread. Cancelling the awaiting task
+    also stops the process group, before CancelledError propagates.
+    """
+    start = time.monotonic()
+    loop = asyncio.get_running_loop()
+    out = BoundedBuffer(head_bytes, tail_bytes)
+    err = BoundedBuffer(head_bytes, tail_bytes)
+    factory = functools.partial(_CaptureProtocol, out, err, on_output)
+    pipes = dict(stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    if shell:
+        transport, protocol = await loop.subprocess_shell(factory, args, **pipes)  # type: ignore[arg-type]
+    else:
+        transport, protocol = await loop.subprocess_exec(factory, *args, **pipes)  # type: ignore[arg-type]
+
+    stop = asyncio.Event()
+    unregister = cancel.add_callback(lambda: _call_soon(loop, stop.set)) if cancel is not None else None
+    stopper = asyncio.ensure_future(stop.wait())
+    timed_out = cancelled = False
+    deadline = start + timeout_s
+    try:
+        await asyncio.wait([protocol.exited, stopper], timeout=timeout_s, return_when=asyncio.FIRST_COMPLETED)
+        if protocol.exited.done():
+            # The output counts toward the timeout too (see run_bounded).
+            await asyncio.wait(
+                [protocol.drained, stopper],
+                timeout=max(0.0, deadline - time.monotonic()),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        if protocol.exited.done() and protocol.drained.done():
+            exit_code = transport.get_returncode()
+        else:
+            cancelled = stopper.done()
+            timed_out = not cancelled
+            exit_code = -1
+            await _terminate_async(transport, protocol, grace_s)
+    except BaseException:
+        await _terminate_async(transport, protocol, grace_s)
+        raise
+    finally:
+        stopper.cancel()
+        if unregister is not None:
+            unregister()
+        # Also stops reading pipes still held by a child that left the group.
+        transport.close()
+    duration_ms = int((time.monotonic() - start) * 1000)
+    return _result(out, err, exit_code, duration_ms, timed_out=timed_out, cancelled=cancelled)
+
+
+class _CaptureProtocol(asyncio.SubprocessProtocol):
+    """Feeds a process's stdout and stderr into bounded buffers on the event loop."""
+
+    def __init__(self, out: BoundedBuffer, err: BoundedBuffer, on_output: Optional[OutputCallback]) -> None:
+        loop = asyncio.get_running_loop()
+        self._streams = {1: ("stdout", out), 2: ("stderr", err)}
+        self._open = {1, 2}
+        self._on_output = on_output
+        # Done once the process has exited, and once both pipes reached EOF.
+        self.exited: asyncio.Future[None] = loop.create_future()
+        self.drained: asyncio.Future[None] = loop.create_future()
+
+    def pipe_data_received(self, fd: int, data: bytes) -> None:
+        name, buffer = self._streams[fd]
+        buffer.write(data)
+        if self._on_output is not None:
+            self._on_output(name, data)
+
+    def pipe_connection_lost(self, fd: int, exc: Optional[Exception]) -> None:
+        self._open.discard(fd)
+        if not self._open:
+            _resolve(self.drained)
+
+    def process_exited(self) -> None:
+        _resolve(self.exited)
+
+
+def _result(
+    out: BoundedBuffer, err: BoundedBuffer, exit_code: int, duration_ms: int, *, timed_out: bool, cancelled: bool
+) -> CaptureResult:
+    stderr = err.text()
+    if timed_out:
+        stderr += "\n[timeout]"
+    elif cancelled:
+        stderr += "\n[cancelled]"
+    return CaptureResult(
+        exit_code=exit_code,
+        stdout=out.text(),
+        stderr=stderr,
+        duration_ms=duration_ms,
+        stdout_bytes=out.total_bytes,
+        stderr_bytes=err.total_bytes,
+        stdout_truncated=out.truncated,
+        stderr_truncated=err.truncated,
+        timed_out=timed_out,
+        cancelled=cancelled,
+    )
+
+
+def _wait(proc: subprocess.Popen[bytes], deadline: float, cancel: Optional[CancelToken]) -> Optional[int]:
+    """The exit code, or None on timeout (time.monotonic() past deadline) or cancellation."""
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or (cancel is not None and cancel.cancelled):
+            return None
+        try:
+            return proc.wait(timeout=remaining if cancel is None else min(remaining, _CANCEL_POLL_S))
+        except subprocess.TimeoutExpired:
+            pass
+
+
+def _signal_group(proc: subprocess.Popen[bytes] | asyncio.SubprocessTransport, *, force: bool) -> None:
+    if os.name != "posix":
+        # No process groups to signal; terminate() is already a hard kill there.
+        with contextlib.suppress(OSError):
+            proc.kill()
+        return
+    pid = proc.pid if isinstance(proc, subprocess.Popen) else proc.get_pid()
+    try:
+        os.killpg(pid, signal.SIGKILL if force else signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        # The whole group is gone already.
+        pass
+
+
+def _drained(readers: Sequence[threading.Thread], deadline: float, cancel: Optional[CancelToken]) -> bool:
+    """Wait for the reader threads to reach EOF; False on timeout or cancellation."""
+    for reader in readers:
+        while reader.is_alive():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (cancel is not None and cancel.cancelled):
+                return False
+            reader.join(remaining if cancel is None else min(remaining, _CANCEL_POLL_S))
+    return True
+
+
+def _terminate(proc: subprocess.Popen[bytes], readers: Sequence[threading.Thread], grace_s: float) -> None:
+    """SIGTERM the process group, SIGKILL whatever is left after grace_s."""
+    deadline = time.monotonic() + grace_s
+    _signal_group(proc, force=False)
+    try:
+        proc.wait(timeout=grace_s)
+    except subprocess.TimeoutExpired:
+        pass
+    # Children that outlive the shell (or a shell that exited on SIGTERM) get
+    # the rest of the grace period, then are killed too.
+    _drained(readers, deadline, None)
+    _signal_group(proc, force=True)
+    proc.wait()
+
+
+async def _terminate_async(transport: asyncio.SubprocessTransport, protocol: _CaptureProtocol, grace_s: float) -> None:
+    """_terminate on the event loop."""
+    deadline = time.monotonic() + grace_s
+    _signal_group(transport, force=False)
+    await asyncio.wait([protocol.exited], timeout=grace_s)
+    await asyncio.wait([protocol.drained], timeout=max(0.0, deadline - time.monotonic()))
+    _signal_group(transport, force=True)
+    # A child that left the process group can keep the pipes open after a kill.
+    await asyncio.wait([protocol.exited, protocol.drained], timeout=_DRAIN_TIMEOUT_S)
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback: Callable[[], object]) -> None:
+    # Cancelled from another thread after the loop has closed: nothing left to stop.
+    with contextlib.suppress(RuntimeError):
+        loop.call_soon_threadsafe(callback)
+
+
+def _pump(pipe: IO[bytes], buffer: BoundedBuffer, stream: str, on_output: Optional[OutputCallback]) -> None:
+    try:
+        while True:
+            chunk = pipe.read1(_CHUNK_SIZE)  # type: ignore[attr-defined]
+            if not chunk:
+                break
+            buffer.write(chunk)
+            if on_output is not None:
+                on_output(stream, chunk)
+    finally:
+        pipe.close()
+
+
+def _resolve(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
@@ -1,31 +1,36 @@
 from __future__ import annotations
 
-import subprocess
-import time
 from typing import Tuple
 
+from myservers.connectors.capture import CancelToken, CaptureResult, OutputCallback, run_bounded, run_bounded_async
+
 
 def execute(command: str, timeout_s: int = 60) -> Tuple[int, str, str, int]:
     """Execute a local shell command.
 
     Returns (exit_code, stdout, stderr, duration_ms).
     """
-    start = time.monotonic()
-    try:
-        proc = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=timeout_s,
-        )
-        exit_code = proc.returncode
-        stdout = proc.stdout or ""
-        stderr = proc.stderr or ""
-    except subprocess.TimeoutExpired as exc:
-        exit_code = -1
-        stdout = exc.stdout or ""
-        stderr = (exc.stderr or "") + "\n[timeout]"
-    duration_ms = int((time.monotonic() - start) * 1000)
-    return exit_code, stdout, stderr, duration_ms
+    return execute_capture(command, timeout_s).as_tuple()
+
+
+def execute_capture(
+    command: str,
+    timeout_s: int = 60,
+    on_output: OutputCallback | None = None,
+    cancel: CancelToken | None = None,
+) -> CaptureResult:
+    """Execute a local shell command with bounded output capture (see connectors.capture).
+
+    On timeout or cancel the shell and everything it started are stopped.
+    """
+    return run_bounded(command, shell=True, timeout_s=timeout_s, on_output=on_output, cancel=cancel)
+
 
+async def execute_capture_async(
+    command: str,
+    timeout_s: int = 60,
+    on_output: OutputCallback | None = None,
+    cancel: CancelToken | None = None,
+) -> CaptureResult:
+    """Async counterpart of execute_capture; cancelling the task also stops the command."""
+    return await run_bounded_async(command, shell=True, timeout_s=timeout_s, on_output=on_output, cancel=cancel)
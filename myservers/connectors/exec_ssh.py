@@ -1,13 +1,69 @@
 from __future__ import annotations
 
-import subprocess
+import asyncio
+import random
+import re
+import shlex
 import time
-from typing import Tuple
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator, Tuple
 
+from myservers.connectors.capture import CancelToken, CaptureResult, OutputCallback, run_bounded, run_bounded_async
+from myservers.connectors.host_select import candidate_hosts
 from myservers.connectors.ssh_command import build_ssh_command
+from myservers.connectors.ssh_mux import SshMultiplexer, default_multiplexer
 from myservers.core.identities_store import IdentityMeta, SshProfileMeta
 from myservers.core.models import Server
 
+# ssh's exit status for its own errors (connection, authentication, ...)
+SSH_CONNECTION_ERROR = 255
+
+# ssh's messages for failures before a session exists, so the remote command
+# cannot have started. Errors after that (the connection dropping mid-run, a
+# refused login that another address of the same server would refuse too)
+# are not retried: the command may already have run.
+_PRE_SESSION_ERRORS = (
+    r"ssh: connect to host {host} port \d+: "
+    r"(Connection refused|Connection timed out|Operation timed out|No route to host)",
+    r"ssh: Could not resolve hostname {host}: .*",
+    r"kex_exchange_identification: .*",
+)
+# Follows a kex_exchange_identification error.
+_KEX_CLOSED = re.compile(r"Connection (closed|reset) by \S+ port \d+")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How SSH runs retry connection failures before trying the server's next address."""
+
+    attempts_per_host: int = 2
+    # Retry n waits a random time up to min(max_backoff_s, backoff_s * 2**n).
+    backoff_s: float = 0.5
+    max_backoff_s: float = 5.0
+
+    def delay(self, retry: int) -> float:
+        return random.uniform(0, min(self.max_backoff_s, self.backoff_s * 2**retry))
+
+
+NO_RETRY = RetryPolicy(attempts_per_host=1)
+
+
+def is_connection_failure(result: CaptureResult, host: str) -> bool:
+    """True if ssh could not reach host, so the command never ran.
+
+    Every line of stderr must be one of ssh's pre-session errors for host: a
+    remote command that itself runs ssh and fails must not be re-run.
+    """
+    if result.exit_code != SSH_CONNECTION_ERROR or result.stdout_bytes:
+        return False
+    lines = [line.strip() for line in result.stderr.splitlines() if line.strip()]
+    patterns = [re.compile(pattern.format(host=re.escape(host))) for pattern in _PRE_SESSION_ERRORS]
+    kex = any(line.startswith("kex_exchange_identification:") for line in lines)
+    return bool(lines) and all(
+        any(pattern.fullmatch(line) for pattern in patterns) or (kex and _KEX_CLOSED.fullmatch(line))
+        for line in lines
+    )
+
 
 def execute_ssh(
     server: Server,
@@ -25,43 +81,146 @@ def execute_ssh(
 
     Returns (exit_code, stdout, stderr, duration_ms).
     """
-    ssh_base = build_ssh_command(server, ssh_profile, identity)
+    return execute_ssh_capture(server, ssh_profile, identity, remote_command, timeout_s).as_tuple()
+
+
+def execute_ssh_capture(
+    server: Server,
+    ssh_profile: SshProfileMeta | None,
+    identity: IdentityMeta | None,
+    remote_command: str,
+    timeout_s: int = 60,
+    on_output: OutputCallback | None = None,
+    multiplex: bool = True,
+    cancel: CancelToken | None = None,
+    retry: RetryPolicy = RetryPolicy(),
+    on_host: Callable[[str], None] | None = None,
+) -> CaptureResult:
+    """Like execute_ssh, with bounded output capture (see connectors.capture).
+
+    With multiplex, runs share a ControlMaster connection per destination
+    (see connectors.ssh_mux). When ssh cannot reach an address it is retried
+    per retry, then the server's next candidate host is tried; result.host is
+    the address of the last attempt. on_host(host) is called before each
+    attempt (e.g. to take a per-host slot, see RunScheduler.move_host). Timeout and cancel stop the local ssh
+    client; the remote command has no terminal and may keep running until it
+    next writes to the closed session.
+    """
+    mux = default_multiplexer() if multiplex else None
+    result = _no_host()
+    for base, host, delay in _attempts(server, ssh_profile, identity, retry):
+        if delay and cancel is not None and cancel.wait(delay):
+            break
+        if delay and cancel is None:
+            time.sleep(delay)
+        if on_host is not None:
+            on_host(host)
+        try:
+            result = run_bounded(
+                _ssh_argv(base, remote_command, mux), timeout_s=timeout_s, on_output=on_output, cancel=cancel
+            )
+        except FileNotFoundError:
+            return CaptureResult(exit_code=-1, stdout="", stderr="ssh command not found", duration_ms=0)
+        result.host = host
+        if mux is not None and result.exit_code == SSH_CONNECTION_ERROR:
+            _drop_broken_master(mux, base)
+        if not is_connection_failure(result, host):
+            break
+    return result
+
+
+async def execute_ssh_capture_async(
+    server: Server,
+    ssh_profile: SshProfileMeta | None,
+    identity: IdentityMeta | None,
+    remote_command: str,
+    timeout_s: int = 60,
+    on_output: OutputCallback | None = None,
+    multiplex: bool = True,
+    cancel: CancelToken | None = None,
+    retry: RetryPolicy = RetryPolicy(),
+    on_host: Callable[[str], Awaitable[None]] | None = None,
+) -> CaptureResult:
+    """Async counterpart of execute_ssh_capture; cancelling the task also stops the ssh process."""
+    mux = default_multiplexer() if multiplex else None
+    result = _no_host()
+    for base, host, delay in _attempts(server, ssh_profile, identity, retry):
+        if delay and cancel is not None and await cancel.wait_async(delay):
+            break
+        if delay and cancel is None:
+            await asyncio.sleep(delay)
+        if on_host is not None:
+            await on_host(host)
+        try:
+            result = await run_bounded_async(
+                _ssh_argv(base, remote_command, mux), timeout_s=timeout_s, on_output=on_output, cancel=cancel
+            )
+        except FileNotFoundError:
+            return CaptureResult(exit_code=-1, stdout="", stderr="ssh command not found", duration_ms=0)
+        result.host = host
+        if mux is not None and result.exit_code == SSH_CONNECTION_ERROR:
+            await asyncio.to_thread(_drop_broken_master, mux, base)
+        if not is_connection_failure(result, host):
+            break
+    return result
+
+
+def _no_host() -> CaptureResult:
+    return CaptureResult(exit_code=-1, stdout="", stderr="No host available", duration_ms=0)
+
+
+def _attempts(
+    server: Server,
+    ssh_profile: SshProfileMeta | None,
+    identity: IdentityMeta | None,
+    retry: RetryPolicy,
+) -> Iterator[tuple[list[str], str, float]]:
+    """(ssh base argv, host, delay before the attempt) for each connection attempt, in order.
+
+    The caller stops iterating once an attempt reaches its host.
+    """
+    hosts = list(dict.fromkeys(candidate_hosts(server)))
+    for host in hosts:
+        base = _ssh_base(server, ssh_profile, identity, host)
+        if base is None:
+            continue
+        for attempt in range(max(1, retry.attempts_per_host)):
+            # The next address is tried right away; retries of the same one back off.
+            yield base, host, retry.delay(attempt - 1) if attempt else 0.0
+
+
+def _ssh_base(
+    server: Server,
+    ssh_profile: SshProfileMeta | None,
+    identity: IdentityMeta | None,
+    host: str | None = None,
+) -> list[str] | None:
+    """build_ssh_command as an argument list, or None if the server has no host."""
+    ssh_base = build_ssh_command(server, ssh_profile, identity, host)
     if not ssh_base:
-        return -1, "", "No host available", 0
+        return None
+    # Parse ssh_base into parts for subprocess (handle quoted paths)
+    return shlex.split(ssh_base)
+
 
+def _ssh_argv(base: list[str], remote_command: str, mux: SshMultiplexer | None) -> list[str]:
     # Add safe SSH options and remote command
     ssh_opts = [
         "-o", "BatchMode=yes",
         "-o", "ConnectTimeout=5",
         "-o", "StrictHostKeyChecking=accept-new",
     ]
-    # Parse ssh_base into parts for subprocess (handle quoted paths)
-    import shlex
-    parts = shlex.split(ssh_base)
-    ssh_cmd = parts[0]  # "ssh"
-    ssh_args = parts[1:] + ssh_opts + ["--", remote_command]
-
-    start = time.monotonic()
-    try:
-        proc = subprocess.run(
-            [ssh_cmd] + ssh_args,
-            capture_output=True,
-            text=True,
-            timeout=timeout_s,
-        )
-        exit_code = proc.returncode
-        stdout = proc.stdout or ""
-        stderr = proc.stderr or ""
-    except subprocess.TimeoutExpired as exc:
-        exit_code = -1
-        stdout = exc.stdout or ""
-        stderr = (exc.stderr or "") + "\n[timeout]"
-    except FileNotFoundError:
-        exit_code = -1
-        stdout = ""
-        stderr = "ssh command not found"
-    duration_ms = int((time.monotonic() - start) * 1000)
-    return exit_code, stdout, stderr, duration_ms
+    if mux is not None:
+        ssh_opts += mux.options(base)
+    ssh_cmd = base[0]  # "ssh"
+    return [ssh_cmd] + base[1:] + ssh_opts + ["--", remote_command]
+
+
+def _drop_broken_master(mux: SshMultiplexer, base: list[str]) -> None:
+    # 255 is ssh failing (or the remote command exiting 255). A master that no
+    # longer answers is closed so the next run connects afresh.
+    if not mux.check(base):
+        mux.exit(base)
 
 
 def build_ssh_invocation_string(
@@ -9,6 +9,7 @@ def build_ssh_command(
     server: Server,
     ssh_profile: SshProfileMeta | None,
     identity: IdentityMeta | None,
+    host: str | None = None,
 ) -> str:
     """Build SSH command string. Never embeds password/token secrets.
 
@@ -18,8 +19,9 @@ def build_ssh_command(
     - Use ssh_profile.port if set, else 22
     - Username: ssh_profile.username_override or identity.username or ""
     - key_path: identity.key_path (only for kind='ssh_key_path')
+    - host: the given address (e.g. another of candidate_hosts), else choose_best_host
     """
-    host = choose_best_host(server)
+    host = host or choose_best_host(server)
     if not host:
         return ""
 
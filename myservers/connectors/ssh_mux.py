@@ -0,0 +1,130 @@
+"""SSH connection multiplexing with OpenSSH ControlMaster.
+
+Runs against the same destination share one authenticated master connection:
+the first run starts it (ControlMaster=auto) and later runs attach through a
+socket in an app-private runtime directory, skipping the TCP, key exchange and
+authentication round trips. ControlPersist keeps an idle master around for
+CONTROL_PERSIST_S. Masters used by this process are stopped at interpreter
+exit. Multiplexing is off on Windows, where OpenSSH has no ControlMaster.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import subprocess
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional, Sequence
+
+CONTROL_PERSIST_S = 300
+
+# A master whose peer died would otherwise hang every session attached to it.
+_KEEPALIVE_OPTS = ["-o", "ServerAliveInterval=15", "-o", "ServerAliveCountMax=3"]
+_CONTROL_TIMEOUT_S = 5
+
+
+def runtime_dir() -> Optional[Path]:
+    """Private (0700) directory for control sockets; None where multiplexing is unavailable."""
+    if os.name == "nt":
+        return None
+    base = os.environ.get("XDG_RUNTIME_DIR")
+    if base:
+        path = Path(base) / "myservers-tool-v2"
+    else:
+        path = Path(tempfile.gettempdir()) / f"myservers-tool-v2-{os.getuid()}"
+    try:
+        path.mkdir(mode=0o700, exist_ok=True)
+        st = path.stat()
+    except OSError:
+        return None
+    # Whoever can write here can hijack the sessions: it must be ours and private.
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        return None
+    return path
+
+
+class SshMultiplexer:
+    """ControlMaster options for ssh runs, plus health checks and teardown of the masters.
+
+    Destinations are identified by the ssh base argv of build_ssh_command
+    (ssh [-p port] [-i key] [user@]host); the same argv must be passed for
+    control commands so ssh finds the same socket.
+    """
+
+    def __init__(self, control_dir: Optional[Path], *, persist_s: int = CONTROL_PERSIST_S) -> None:
+        self._dir = control_dir
+        self._persist_s = persist_s
+        self._lock = threading.Lock()
+        self._destinations: set[tuple[str, ...]] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self._dir is not None
+
+    def options(self, base: Sequence[str]) -> list[str]:
+        """ssh options that route a run through the destination's master (none if disabled)."""
+        if self._dir is None:
+            return []
+        with self._lock:
+            self._destinations.add(tuple(base))
+        return [
+            "-o", "ControlMaster=auto",
+            "-o", f"ControlPath={self._control_path()}",
+            "-o", f"ControlPersist={self._persist_s}",
+            *_KEEPALIVE_OPTS,
+        ]
+
+    def check(self, base: Sequence[str]) -> bool:
+        """True if the destination's master is running and answering (ssh -O check)."""
+        return self._control(base, "check") == 0
+
+    def exit(self, base: Sequence[str]) -> None:
+        """Close the destination's master and its sessions, e.g. after a connection failure."""
+        with self._lock:
+            self._destinations.discard(tuple(base))
+        self._control(base, "exit")
+
+    def close_all(self) -> None:
+        """Stop the masters this process used; sessions still running may finish."""
+        with self._lock:
+            destinations, self._destinations = self._destinations, set()
+        if self._dir is None or not any(self._dir.iterdir()):
+            return
+        for base in destinations:
+            self._control(base, "stop")
+
+    def _control_path(self) -> str:
+        # %C is a hash of local host, remote host, port and user: short enough for
+        # the socket path limit and distinct per destination.
+        return str(self._dir / "%C") if self._dir is not None else ""
+
+    def _control(self, base: Sequence[str], command: str) -> Optional[int]:
+        if self._dir is None or not base:
+            return None
+        argv = [base[0], "-o", f"ControlPath={self._control_path()}", "-O", command, *base[1:]]
+        try:
+            return subprocess.run(
+                argv,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                timeout=_CONTROL_TIMEOUT_S,
+            ).returncode
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+
+
+_default: Optional[SshMultiplexer] = None
+_default_lock = threading.Lock()
+
+
+def default_multiplexer() -> SshMultiplexer:
+    """The process-wide multiplexer used by exec_ssh; stopped at interpreter exit."""
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = SshMultiplexer(runtime_dir())
+            atexit.register(_default.close_all)
+        return _default
@@ -1,15 +1,30 @@
 from __future__ import annotations
 
+import asyncio
+import csv
+import functools
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import List, Optional
+from typing import Awaitable, Callable, List, Optional, Sequence, TextIO, Tuple
 
+from myservers.connectors.capture import CancelToken, CaptureResult
 from myservers.connectors.host_select import choose_best_host
-from myservers.connectors.exec_local import execute
-from myservers.connectors.exec_ssh import execute_ssh, build_ssh_invocation_string
+from myservers.connectors.exec_local import execute_capture, execute_capture_async
+from myservers.connectors.exec_ssh import RetryPolicy, execute_ssh_capture, execute_ssh_capture_async, build_ssh_invocation_string
 from myservers.core.identities_store import IdentitiesStore
+from myservers.core.live_output import LiveOutputFlusher, LiveOutputPump, LiveOutputWriter
 from myservers.core.models import Server
+from myservers.core.retention import FAILURE_STATUSES, PruneReport, RetentionPolicy, prune_history
+from myservers.core.run_persister import DEFAULT_MAX_PENDING, RunPersister
+from myservers.core.scheduler import RunScheduler
 from myservers.core.servers import ServerStore
+from myservers.core.tags_store import TagStore
+from myservers.storage import histogram, output_blobs, run_output_index
+from myservers.storage.compression import decompress_text
 from myservers.storage.sqlite_store import SqliteStore
 
 
@@ -28,7 +43,7 @@ class ActionTemplate:
 
 @dataclass
 class ActionRun:
-    id: int
+    id: int  # 0 while the run waits in the write-behind queue
     action_id: int
     server_name: str
     started_at: str
@@ -39,16 +54,216 @@ class ActionRun:
     command_rendered: str
     stdout: str
     stderr: str
+    # Bytes the command actually printed; the captured text keeps head and tail only.
+    stdout_bytes: int = 0
+    stderr_bytes: int = 0
+    output_truncated: bool = False
+    # Time spent waiting for an execution slot (see core.scheduler) before started_at.
+    queue_wait_ms: int = 0
+    # Address that served an SSH run (None for local and dry runs).
+    host: Optional[str] = None
+
+
+@dataclass
+class RunOutput:
+    command_rendered: str
+    stdout: str
+    stderr: str
+
+
+@dataclass
+class _PreparedRun:
+    """An action resolved against one server, ready to execute (see ActionsStore._prepare_run)."""
+
+    template: ActionTemplate
+    server: Server
+    server_id: int
+    command_rendered: str
+    # Executors taking an optional on_output callback; None for a dry run.
+    execute: Optional[Callable[..., CaptureResult]]
+    execute_async: Optional[Callable[..., Awaitable[CaptureResult]]]
+    # RunScheduler keys: the target host and the server's limited tags
+    slot_keys: tuple[str, ...] = ()
+    # SSH runs may fail over to another host; their per-host slot moves with them.
+    ssh: bool = False
+
+
+@dataclass
+class ServerResult:
+    """Outcome of run_action_many on one server: its run, or why it did not run."""
+
+    server_name: str
+    run: Optional[ActionRun]
+    error: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        return self.run.status if self.run is not None else "not_run"
+
+
+@dataclass
+class FleetRun:
+    """Result of run_action_many, one ServerResult per requested server in the same order."""
+
+    action_id: int
+    results: List[ServerResult]
+    duration_ms: int
+
+    @property
+    def run_ids(self) -> List[int]:
+        """Ids of the recorded runs (e.g. for output_groups); empty with write-behind."""
+        return [r.run.id for r in self.results if r.run is not None and r.run.id]
+
+    def summary(self) -> dict[str, int]:
+        """Number of servers per status ('not_run' for servers the action could not run on)."""
+        counts: dict[str, int] = {}
+        for result in self.results:
+            counts[result.status] = counts.get(result.status, 0) + 1
+        return counts
+
+
+@dataclass
+class RunTail:
+    """Output a running run printed after a given chunk (see ActionsStore.tail_run)."""
+
+    status: str
+    chunks: List[Tuple[str, str]]  # (stream, text) in the order printed
+    next_seq: int  # pass as after_seq to continue from here
+
+
+@dataclass
+class RunSummary:
+    """Metadata of a run, without command/output (see ActionsStore.get_run_output)."""
+
+    id: int
+    action_id: int
+    action_name: str
+    server_name: str
+    started_at: str
+    finished_at: str
+    status: str
+    exit_code: Optional[int]
+    duration_ms: int
+    queue_wait_ms: int = 0
+    host: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class RunCursor:
+    """Position after the last run of a page: (started_at, id) of that run."""
+
+    started_at: str
+    id: int
+
+
+@dataclass
+class RunPage:
+    runs: List[RunSummary]
+    # None when there are no older runs matching the filters.
+    next_cursor: Optional[RunCursor]
+
+
+DEFAULT_PAGE_SIZE = 100
+# run_action_many: servers executing at the same time
+DEFAULT_MAX_WORKERS = 16
+# run_action_many_async: no thread per command, so many more
+DEFAULT_MAX_CONCURRENCY = 500
+
+EXPORT_FORMATS = ("ndjson", "csv")
+_EXPORT_FIELDS = (
+    "id", "started_at", "finished_at", "server", "action", "status", "exit_code", "duration_ms", "queue_wait_ms", "host"
+)
+_EXPORT_BATCH = 500
+
+
+@dataclass
+class RunStats:
+    """Aggregated runs for one group of run_stats(); action/server are None when not grouped on."""
+
+    action_id: Optional[int]
+    action_name: Optional[str]
+    server_name: Optional[str]
+    runs: int
+    successes: int
+    failures: int
+    avg_ms: float
+    p50_ms: Optional[int]
+    p95_ms: Optional[int]
+    max_ms: int
+    last_failure_at: Optional[str]
+
+    @property
+    def success_rate(self) -> float:
+        return self.successes / self.runs if self.runs else 0.0
+
+
+@dataclass
+class OutputGroup:
+    """Runs that printed exactly the same stdout."""
+
+    output_hash: str  # hex sha256 of stdout; "" for runs without output
+    run_ids: List[int]
+    server_names: List[str]
+    stdout: str
+
+    @property
+    def runs(self) -> int:
+        return len(self.run_ids)
+
+
+@dataclass
+class OutputMatch:
+    run_id: int
+    action_name: str
+    server_name: str
+    started_at: str
+    stream: str  # 'stdout' or 'stderr'
+    snippet: str
 
 
 class ActionsStore:
     """Actions (templates) and execution history."""
 
-    def __init__(self, backend: SqliteStore, server_store: ServerStore) -> None:
+    def __init__(
+        self,
+        backend: SqliteStore,
+        server_store: ServerStore,
+        *,
+        write_behind: bool = False,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        scheduler: Optional[RunScheduler] = None,
+        ssh_retry: Optional[RetryPolicy] = None,
+    ) -> None:
+        """write_behind=True records runs from a background thread in batched
+        transactions (see core.run_persister); call flush() before reading
+        history that must include them, and close() when done.
+
+        Executed runs wait for a slot from scheduler (default limits if None);
+        share one RunScheduler between stores to share the limits. SSH runs
+        that cannot connect are retried, then fail over to the server's other
+        addresses, per ssh_retry (see exec_ssh.RetryPolicy)."""
         self._backend = backend
-        self._conn = backend._conn
+        self.scheduler = scheduler or RunScheduler()
+        self._ssh_retry = ssh_retry or RetryPolicy()
         self._servers = server_store
         self._idents = IdentitiesStore(backend)
+        self._persister: Optional[RunPersister] = (
+            RunPersister(backend, self._insert_run, max_pending=max_pending) if write_behind else None
+        )
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._backend._conn
+
+    def flush(self) -> None:
+        """Wait until runs queued for write-behind are saved (no-op otherwise)."""
+        if self._persister is not None:
+            self._persister.flush()
+
+    def close(self) -> None:
+        """Save pending runs and stop the write-behind thread."""
+        if self._persister is not None:
+            self._persister.close()
 
     # ---------- actions ----------
 
@@ -85,7 +300,7 @@ class ActionsStore:
             """,
             (name.strip(), description, command_template, 1 if requires_confirm else 0, execution_target),
         )
-        self._conn.commit()
+        self._backend.commit()
         return int(cur.lastrowid)
 
     def update_action(
@@ -106,17 +321,163 @@ class ActionsStore:
             """,
             (name.strip(), description, command_template, 1 if requires_confirm else 0, execution_target, action_id),
         )
-        self._conn.commit()
+        self._backend.commit()
 
     def delete_action(self, action_id: int) -> None:
         cur = self._conn.cursor()
         cur.execute("DELETE FROM actions WHERE id = ?", (action_id,))
-        self._conn.commit()
+        self._backend.commit()
 
     # ---------- runs ----------
 
-    def run_action(self, action_id: int, server_name: str, *, dry_run: bool) -> ActionRun:
-        """Render and optionally execute an action on a server."""
+    def run_action(
+        self,
+        action_id: int,
+        server_name: str,
+        *,
+        dry_run: bool,
+        on_started: Optional[Callable[[int], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> ActionRun:
+        """Render and optionally execute an action on a server.
+
+        An executed run is recorded as 'running' before the command starts and
+        its output is saved as it arrives (see tail_run); on_started receives
+        the run id once that row exists. Dry runs and write-behind runs are
+        recorded when they finish. cancel.cancel() stops the command and the
+        run is recorded as 'cancelled'.
+        """
+        prepared = self._prepare_run(self._load_action(action_id), server_name, dry_run=dry_run)
+        return self._execute_run(prepared, on_started=on_started, cancel=cancel)
+
+    def run_action_many(
+        self,
+        action_id: int,
+        server_names: Sequence[str],
+        *,
+        dry_run: bool,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        on_result: Optional[Callable[[ServerResult], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> FleetRun:
+        """Run an action on many servers, at most max_workers at a time.
+
+        Each server gets its own run record, as with run_action. A server the
+        action cannot run on (unknown, no host, executor failure) gets an error
+        in its ServerResult instead of stopping the others. on_result is called
+        as each server finishes, from the worker threads. cancel.cancel()
+        aborts the fleet: running commands are stopped and servers still
+        waiting are recorded as 'cancelled' without running.
+        """
+        template = self._load_action(action_id)
+        started = time.monotonic()
+        # Lookups run here, on the caller's connection; workers only execute and record.
+        results, prepared = self._prepare_many(template, server_names, dry_run=dry_run, on_result=on_result)
+
+        def work(run: _PreparedRun, flusher: LiveOutputFlusher) -> ServerResult:
+            try:
+                result = ServerResult(
+                    server_name=run.server.name, run=self._execute_run(run, cancel=cancel, flusher=flusher)
+                )
+            except Exception as exc:
+                result = ServerResult(server_name=run.server.name, run=None, error=str(exc))
+            if on_result is not None:
+                on_result(result)
+            return result
+
+        if prepared:
+            workers = max(1, min(max_workers, len(prepared)))
+            # One flusher writes the live output of all runs, one transaction per tick.
+            with LiveOutputFlusher(self._backend) as flusher:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="run-action") as pool:
+                    futures = {index: pool.submit(work, run, flusher) for index, run in prepared.items()}
+                    for index, future in futures.items():
+                        results[index] = future.result()
+        return FleetRun(
+            action_id=template.id,
+            results=[results[index] for index in range(len(server_names))],
+            duration_ms=int((time.monotonic() - started) * 1000),
+        )
+
+    async def run_action_async(
+        self,
+        action_id: int,
+        server_name: str,
+        *,
+        dry_run: bool,
+        on_started: Optional[Callable[[int], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> ActionRun:
+        """Async counterpart of run_action: the command runs on the event loop.
+
+        Cancelling the task stops the command and its run is recorded as
+        'interrupted'; cancel.cancel() records it as 'cancelled', as run_action does.
+        """
+        prepared = self._prepare_run(self._load_action(action_id), server_name, dry_run=dry_run)
+        async with LiveOutputPump(self._backend) as pump:
+            return await self._execute_run_async(prepared, pump, on_started=on_started, cancel=cancel)
+
+    async def run_action_many_async(
+        self,
+        action_id: int,
+        server_names: Sequence[str],
+        *,
+        dry_run: bool,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        on_result: Optional[Callable[[ServerResult], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> FleetRun:
+        """Async counterpart of run_action_many, at most max_concurrency commands at a time.
+
+        Commands need no thread each, so max_concurrency can be far above
+        run_action_many's max_workers; the store's scheduler limits still
+        apply on top of it. on_result is called on the event loop.
+        """
+        template = self._load_action(action_id)
+        started = time.monotonic()
+        results, prepared = self._prepare_many(template, server_names, dry_run=dry_run, on_result=on_result)
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def work(run: _PreparedRun, pump: LiveOutputPump) -> ServerResult:
+            async with semaphore:
+                try:
+                    result = ServerResult(server_name=run.server.name, run=await self._execute_run_async(run, pump, cancel=cancel))
+                except Exception as exc:
+                    result = ServerResult(server_name=run.server.name, run=None, error=str(exc))
+            if on_result is not None:
+                on_result(result)
+            return result
+
+        async with LiveOutputPump(self._backend) as pump:
+            outcomes = await asyncio.gather(*(work(run, pump) for run in prepared.values()))
+        results.update(zip(prepared, outcomes))
+        return FleetRun(
+            action_id=template.id,
+            results=[results[index] for index in range(len(server_names))],
+            duration_ms=int((time.monotonic() - started) * 1000),
+        )
+
+    def _prepare_many(
+        self,
+        template: ActionTemplate,
+        server_names: Sequence[str],
+        *,
+        dry_run: bool,
+        on_result: Optional[Callable[[ServerResult], None]],
+    ) -> tuple[dict[int, ServerResult], dict[int, _PreparedRun]]:
+        """Prepare a run per server, keyed by position; servers it cannot run on get a result right away."""
+        results: dict[int, ServerResult] = {}
+        prepared: dict[int, _PreparedRun] = {}
+        for index, name in enumerate(server_names):
+            try:
+                prepared[index] = self._prepare_run(template, name, dry_run=dry_run)
+            except ValueError as exc:
+                results[index] = ServerResult(server_name=name, run=None, error=str(exc))
+                if on_result is not None:
+                    on_result(results[index])
+        return results, prepared
+
+    def _load_action(self, action_id: int) -> ActionTemplate:
         cur = self._conn.cursor()
         cur.execute(
             "SELECT id, name, description, command_template, requires_confirm, COALESCE(execution_target, 'local') as execution_target FROM actions WHERE id = ?",
@@ -125,7 +486,7 @@ class ActionsStore:
         arow = cur.fetchone()
         if arow is None:
             raise ValueError("Action not found")
-        template = ActionTemplate(
+        return ActionTemplate(
             id=arow["id"],
             name=arow["name"],
             description=arow["description"],
@@ -134,20 +495,20 @@ class ActionsStore:
             execution_target=arow["execution_target"],
         )
 
+    def _prepare_run(self, template: ActionTemplate, server_name: str, *, dry_run: bool) -> _PreparedRun:
+        """Resolve the server and render the command; raises ValueError if the action cannot run there."""
         server: Optional[Server] = self._servers.get_server(server_name)
         if server is None:
             raise ValueError("Server not found")
 
         # server_id for history FK
-        cur.execute("SELECT id FROM servers WHERE name = ?", (server_name.strip(),))
-        srow = cur.fetchone()
-        if srow is None:
+        server_id = self._backend.server_id(server_name)
+        if server_id is None:
             raise ValueError("Server row not found")
-        server_id = srow["id"]
 
         # Build context (no secrets)
         host = choose_best_host(server) or ""
-        ssh_profile = self._idents.get_ssh_profile(server_name)
+        ssh_profile = self._idents.get_ssh_profile_by_id(server_id)
         ssh_port = ssh_profile.port if ssh_profile else 22
 
         ctx = {
@@ -162,35 +523,165 @@ class ActionsStore:
 
         command_rendered = _render_template(template.command_template, ctx)
 
-        started = datetime.now(timezone.utc)
-        if dry_run:
+        execute: Optional[Callable[..., CaptureResult]] = None
+        execute_async: Optional[Callable[..., Awaitable[CaptureResult]]] = None
+        if not dry_run:
+            if template.execution_target == "ssh":
+                if not host:
+                    raise ValueError("No host available for SSH execution")
+                identity = None
+                if ssh_profile and ssh_profile.identity_id:
+                    identity = self._idents.get_identity(ssh_profile.identity_id)
+                ssh_args = (server, ssh_profile, identity, command_rendered)
+                execute = functools.partial(execute_ssh_capture, *ssh_args, retry=self._ssh_retry)
+                execute_async = functools.partial(execute_ssh_capture_async, *ssh_args, retry=self._ssh_retry)
+            else:
+                execute = functools.partial(execute_capture, command_rendered)
+                execute_async = functools.partial(execute_capture_async, command_rendered)
+        tags: list[str] = []
+        if self.scheduler.limits.per_tag:
+            tags = TagStore(self._backend).get_server_tags_by_id(server_id)
+        return _PreparedRun(
+            template=template,
+            server=server,
+            server_id=server_id,
+            command_rendered=command_rendered,
+            execute=execute,
+            execute_async=execute_async,
+            slot_keys=self.scheduler.keys(host or server.name, tags),
+            ssh=template.execution_target == "ssh",
+        )
+
+    def _execute_run(
+        self,
+        prepared: _PreparedRun,
+        *,
+        on_started: Optional[Callable[[int], None]] = None,
+        cancel: Optional[CancelToken] = None,
+        flusher: Optional[LiveOutputFlusher] = None,
+    ) -> ActionRun:
+        """Execute a prepared run (unless it is a dry run) and record it.
+
+        Live output goes through flusher when runs execute together, else
+        through a writer with its own ticker.
+        """
+        if prepared.execute is None:
+            return self._record_run(prepared, 0, datetime.now(timezone.utc), None)
+        run_id = 0
+        with self.scheduler.slot(prepared.slot_keys) as slot:
+            queue_wait_ms = slot.queue_wait_ms
+            execute = prepared.execute
+            if prepared.ssh:
+                execute = functools.partial(execute, on_host=functools.partial(self.scheduler.move_host, slot))
+            started = datetime.now(timezone.utc)
+            if cancel is not None and cancel.cancelled:
+                result = _cancelled_before_start()
+            elif self._persister is not None:
+                result = execute(cancel=cancel)
+            else:
+                run_id = self._start_run(
+                    prepared.template.id,
+                    prepared.server_id,
+                    started.isoformat(),
+                    prepared.command_rendered,
+                    queue_wait_ms,
+                )
+                if on_started is not None:
+                    on_started(run_id)
+                if flusher is not None:
+                    writer = flusher.open(run_id)
+                    close_writer = functools.partial(flusher.close, writer)
+                else:
+                    writer = LiveOutputWriter(self._backend, run_id)
+                    close_writer = writer.close
+                try:
+                    result = execute(on_output=writer.write, cancel=cancel)
+                except BaseException:
+                    close_writer()
+                    self._interrupt_run(run_id)
+                    raise
+                close_writer()
+        return self._record_run(prepared, run_id, started, result, queue_wait_ms)
+
+    async def _execute_run_async(
+        self,
+        prepared: _PreparedRun,
+        pump: LiveOutputPump,
+        *,
+        on_started: Optional[Callable[[int], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> ActionRun:
+        """_execute_run on the event loop; database writes go to worker threads."""
+        if prepared.execute_async is None:
+            return await asyncio.to_thread(self._record_run, prepared, 0, datetime.now(timezone.utc), None)
+        run_id = 0
+        async with self.scheduler.slot_async(prepared.slot_keys) as slot:
+            queue_wait_ms = slot.queue_wait_ms
+            execute = prepared.execute_async
+            if prepared.ssh:
+                execute = functools.partial(execute, on_host=functools.partial(self.scheduler.move_host_async, slot))
+            started = datetime.now(timezone.utc)
+            if cancel is not None and cancel.cancelled:
+                result = _cancelled_before_start()
+            elif self._persister is not None:
+                result = await execute(cancel=cancel)
+            else:
+                run_id = await asyncio.to_thread(
+                    self._start_run,
+                    prepared.template.id,
+                    prepared.server_id,
+                    started.isoformat(),
+                    prepared.command_rendered,
+                    queue_wait_ms,
+                )
+                if on_started is not None:
+                    on_started(run_id)
+                writer = pump.open(run_id)
+                try:
+                    result = await execute(on_output=writer.write, cancel=cancel)
+                except BaseException:
+                    await pump.close(writer)
+                    await asyncio.to_thread(self._interrupt_run, run_id)
+                    raise
+                await pump.close(writer)
+        return await asyncio.to_thread(self._record_run, prepared, run_id, started, result, queue_wait_ms)
+
+    def _record_run(
+        self,
+        prepared: _PreparedRun,
+        run_id: int,
+        started: datetime,
+        result: Optional[CaptureResult],
+        queue_wait_ms: int = 0,
+    ) -> ActionRun:
+        """Save a run's outcome (result is None for a dry run).
+
+        run_id is the row from _start_run, or 0 if the run has not been inserted yet.
+        """
+        template = prepared.template
+        server = prepared.server
+        server_id = prepared.server_id
+        command_rendered = prepared.command_rendered
+        if result is None:
             status = "dry_run"
             exit_code = None
             duration_ms = 0
             stdout = ""
             stderr = ""
-        elif template.execution_target == "ssh":
-            host = choose_best_host(server)
-            if not host:
-                raise ValueError("No host available for SSH execution")
-            ssh_profile = self._idents.get_ssh_profile(server_name)
-            identity = None
-            if ssh_profile and ssh_profile.identity_id:
-                identity = self._idents.get_identity(ssh_profile.identity_id)
-            ec, out, err, duration_ms = execute_ssh(server, ssh_profile, identity, command_rendered)
-            status = "success" if ec == 0 else "error"
-            exit_code = ec
-            stdout = out or ""
-            stderr = err or ""
+            host = None
         else:
-            ec, out, err, duration_ms = execute(command_rendered)
-            status = "success" if ec == 0 else "error"
-            exit_code = ec
-            stdout = out or ""
-            stderr = err or ""
+            host = result.host
+            if result.cancelled:
+                status = "cancelled"
+            else:
+                status = "success" if result.exit_code == 0 else "error"
+            exit_code = result.exit_code
+            duration_ms = result.duration_ms
+            stdout = result.stdout or ""
+            stderr = result.stderr or ""
 
         finished = datetime.now(timezone.utc)
-        run_id = self._insert_run(
+        record = dict(
             action_id=template.id,
             server_id=server_id,
             server_name=server.name,
@@ -202,7 +693,27 @@ class ActionsStore:
             command_rendered=command_rendered,
             stdout=stdout,
             stderr=stderr,
+            queue_wait_ms=queue_wait_ms,
+            host=host,
         )
+        if run_id:
+            self._finish_run(
+                run_id,
+                action_id=template.id,
+                server_id=server_id,
+                started_at=started.isoformat(),
+                finished_at=finished.isoformat(),
+                status=status,
+                exit_code=exit_code,
+                duration_ms=duration_ms,
+                stdout=stdout,
+                stderr=stderr,
+                host=host,
+            )
+        elif self._persister is not None:
+            self._persister.submit(record)
+        else:
+            run_id = self._insert_run(**record)
 
         return ActionRun(
             id=run_id,
@@ -216,6 +727,457 @@ class ActionsStore:
             command_rendered=command_rendered,
             stdout=stdout[:MAX_TEXT],
             stderr=stderr[:MAX_TEXT],
+            stdout_bytes=result.stdout_bytes if result else 0,
+            stderr_bytes=result.stderr_bytes if result else 0,
+            output_truncated=bool(result and (result.stdout_truncated or result.stderr_truncated)),
+            queue_wait_ms=queue_wait_ms,
+            host=host,
+        )
+
+    def query_runs(
+        self,
+        *,
+        server: Optional[str] = None,
+        action: Optional[int] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        after_cursor: Optional[RunCursor] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> RunPage:
+        """Return one page of runs, newest first.
+
+        server is a server name, action an action id; since/until are ISO
+        timestamps (since inclusive, until exclusive). Pass the returned
+        next_cursor as after_cursor to get the following page; paging seeks on
+        (started_at, id) so every page costs the same regardless of depth.
+        """
+        filters = self._run_filters(server, action, status, since, until)
+        if filters is None:
+            return RunPage(runs=[], next_cursor=None)
+        where, params = filters
+        if after_cursor is not None:
+            where.append("(ar.started_at, ar.id) < (?, ?)")
+            params.extend((after_cursor.started_at, after_cursor.id))
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        cur = self._conn.cursor()
+        cur.execute(
+            f"""
+            SELECT ar.id, ar.action_id, a.name AS action_name, s.name AS server_name,
+                   ar.started_at, ar.finished_at, ar.status, ar.exit_code, ar.duration_ms, ar.queue_wait_ms,
+                   ar.host
+            FROM action_runs ar
+            JOIN servers s ON s.id = ar.server_id
+            JOIN actions a ON a.id = ar.action_id
+            {clause}
+            ORDER BY ar.started_at DESC, ar.id DESC
+            LIMIT ?
+            """,
+            (*params, page_size + 1),
+        )
+        rows = cur.fetchall()
+        runs = [
+            RunSummary(
+                id=row["id"],
+                action_id=row["action_id"],
+                action_name=row["action_name"],
+                server_name=row["server_name"],
+                started_at=row["started_at"] or "",
+                finished_at=row["finished_at"] or "",
+                status=row["status"] or "",
+                exit_code=row["exit_code"],
+                duration_ms=row["duration_ms"] or 0,
+                queue_wait_ms=row["queue_wait_ms"] or 0,
+                host=row["host"],
+            )
+            for row in rows[:page_size]
+        ]
+        next_cursor = None
+        if len(rows) > page_size and runs:
+            last = runs[-1]
+            next_cursor = RunCursor(started_at=last.started_at, id=last.id)
+        return RunPage(runs=runs, next_cursor=next_cursor)
+
+    def export_runs(
+        self,
+        fh: TextIO,
+        fmt: str = "ndjson",
+        *,
+        include_output: bool = False,
+        server: Optional[str] = None,
+        action: Optional[int] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> int:
+        """Write runs (oldest first) to fh as NDJSON or CSV; returns the number of runs.
+
+        Rows are streamed from the cursor in batches, so memory stays flat however
+        much history is exported. include_output adds the decompressed command,
+        stdout and stderr. Filters are the same as query_runs().
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+        filters = self._run_filters(server, action, status, since, until)
+        if filters is None:
+            where, params = ["0"], []
+        else:
+            where, params = filters
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        output_cols = f", {output_blobs.COLUMNS}"
+        output_join = f"LEFT JOIN action_run_output o ON o.run_id = ar.id {output_blobs.JOINS}"
+
+        fields = list(_EXPORT_FIELDS) + (["command_rendered", "stdout", "stderr"] if include_output else [])
+        writer = csv.DictWriter(fh, fieldnames=fields) if fmt == "csv" else None
+        if writer is not None:
+            writer.writeheader()
+
+        cur = self._conn.cursor()
+        cur.execute(
+            f"""
+            SELECT ar.id, ar.started_at, ar.finished_at, s.name AS server, a.name AS action,
+                   ar.status, ar.exit_code, ar.duration_ms, ar.queue_wait_ms, ar.host
+                   {output_cols if include_output else ""}
+            FROM action_runs ar
+            JOIN servers s ON s.id = ar.server_id
+            JOIN actions a ON a.id = ar.action_id
+            {output_join if include_output else ""}
+            {clause}
+            ORDER BY ar.started_at, ar.id
+            """,
+            params,
+        )
+        count = 0
+        while True:
+            rows = cur.fetchmany(_EXPORT_BATCH)
+            if not rows:
+                break
+            for row in rows:
+                record = {name: row[name] for name in _EXPORT_FIELDS}
+                if include_output:
+                    record["command_rendered"] = decompress_text(row["command_blob"])
+                    record["stdout"] = decompress_text(row["stdout_blob"])
+                    record["stderr"] = decompress_text(row["stderr_blob"])
+                if writer is not None:
+                    writer.writerow(record)
+                else:
+                    fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def _run_filters(
+        self,
+        server: Optional[str],
+        action: Optional[int],
+        status: Optional[str],
+        since: Optional[str],
+        until: Optional[str],
+    ) -> Optional[tuple[list[str], list[object]]]:
+        """WHERE clauses + params over action_runs ar; None if the server does not exist."""
+        where: list[str] = []
+        params: list[object] = []
+        if server is not None:
+            server_id = self._backend.server_id(server)
+            if server_id is None:
+                return None
+            where.append("ar.server_id = ?")
+            params.append(server_id)
+        if action is not None:
+            where.append("ar.action_id = ?")
+            params.append(action)
+        if status is not None:
+            where.append("ar.status = ?")
+            params.append(status)
+        if since is not None:
+            where.append("ar.started_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ar.started_at < ?")
+            params.append(until)
+        return where, params
+
+    def run_stats(
+        self,
+        *,
+        group_by: str = "action_server",
+        action: Optional[int] = None,
+        server: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[RunStats]:
+        """Aggregate run statistics from the daily rollups (dry runs are not counted).
+
+        group_by is "action_server", "action" or "server". since/until are UTC
+        dates or ISO timestamps; only their date part is used (since inclusive,
+        until exclusive). Percentiles are estimated from the latency histogram.
+        Rollups outlive pruned runs, so history retention does not change them.
+        """
+        if group_by not in ("action_server", "action", "server"):
+            raise ValueError(f"Unknown group_by: {group_by}")
+        where: list[str] = []
+        params: list[object] = []
+        if action is not None:
+            where.append("st.action_id = ?")
+            params.append(action)
+        if server is not None:
+            server_id = self._backend.server_id(server)
+            if server_id is None:
+                return []
+            where.append("st.server_id = ?")
+            params.append(server_id)
+        if since is not None:
+            where.append("st.day >= ?")
+            params.append(since[:10])
+        if until is not None:
+            where.append("st.day < ?")
+            params.append(until[:10])
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        cur = self._conn.cursor()
+        cur.execute(
+            f"""
+            SELECT st.action_id, a.name AS action_name, s.name AS server_name,
+                   st.runs, st.successes, st.failures, st.total_ms, st.max_ms,
+                   st.last_failure_at, st.histogram
+            FROM action_run_stats st
+            JOIN actions a ON a.id = st.action_id
+            JOIN servers s ON s.id = st.server_id
+            {clause}
+            """,
+            params,
+        )
+        groups: dict[tuple, list[sqlite3.Row]] = {}
+        for row in cur.fetchall():
+            key = (
+                row["action_id"] if group_by != "server" else None,
+                row["action_name"] if group_by != "server" else None,
+                row["server_name"] if group_by != "action" else None,
+            )
+            groups.setdefault(key, []).append(row)
+
+        stats: List[RunStats] = []
+        for (action_id, action_name, server_name), rows in groups.items():
+            runs = sum(r["runs"] for r in rows)
+            merged = histogram.merge(histogram.loads(r["histogram"]) for r in rows)
+            failures = [r["last_failure_at"] for r in rows if r["last_failure_at"]]
+            stats.append(
+                RunStats(
+                    action_id=action_id,
+                    action_name=action_name,
+                    server_name=server_name,
+                    runs=runs,
+                    successes=sum(r["successes"] for r in rows),
+                    failures=sum(r["failures"] for r in rows),
+                    avg_ms=sum(r["total_ms"] for r in rows) / runs if runs else 0.0,
+                    p50_ms=histogram.percentile(merged, 50),
+                    p95_ms=histogram.percentile(merged, 95),
+                    max_ms=max(r["max_ms"] for r in rows),
+                    last_failure_at=max(failures) if failures else None,
+                )
+            )
+        stats.sort(key=lambda st: ((st.action_name or "").lower(), (st.server_name or "").lower()))
+        return stats
+
+    def output_groups(
+        self,
+        *,
+        run_ids: Optional[Sequence[int]] = None,
+        action: Optional[int] = None,
+        server: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[OutputGroup]:
+        """Group runs by identical stdout, largest group first.
+
+        Scope with run_ids (e.g. one fleet run) and/or the query_runs() filters.
+        Groups come from the content hashes, so only one output per group is
+        decompressed; the small groups at the end are the odd ones out.
+        """
+        filters = self._run_filters(server, action, status, since, until)
+        if filters is None:
+            return []
+        where, params = filters
+        if run_ids is not None:
+            if not run_ids:
+                return []
+            where.append(f"ar.id IN ({', '.join('?' for _ in run_ids)})")
+            params.extend(run_ids)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        cur = self._conn.cursor()
+        cur.execute(
+            f"""
+            SELECT ar.id, s.name AS server_name, o.stdout_id
+            FROM action_runs ar
+            JOIN servers s ON s.id = ar.server_id
+            LEFT JOIN action_run_output o ON o.run_id = ar.id
+            {clause}
+            ORDER BY ar.started_at, ar.id
+            """,
+            params,
+        )
+        members: dict[Optional[int], list[sqlite3.Row]] = {}
+        for row in cur.fetchall():
+            members.setdefault(row["stdout_id"], []).append(row)
+
+        groups: List[OutputGroup] = []
+        for blob_id, rows in members.items():
+            digest, stdout = "", ""
+            if blob_id is not None:
+                cur.execute("SELECT hash, data FROM output_blobs WHERE id = ?", (blob_id,))
+                blob = cur.fetchone()
+                digest, stdout = blob["hash"].hex(), decompress_text(blob["data"])
+            groups.append(
+                OutputGroup(
+                    output_hash=digest,
+                    run_ids=[row["id"] for row in rows],
+                    server_names=[row["server_name"] for row in rows],
+                    stdout=stdout,
+                )
+            )
+        groups.sort(key=lambda g: (-g.runs, g.output_hash))
+        return groups
+
+    def search_run_output(self, query: str, limit: int = 50) -> List[OutputMatch]:
+        """Find runs whose stdout/stderr contains the phrase query, newest first."""
+        q = (query or "").strip()
+        if not q:
+            return []
+        if not self._backend.has_table(run_output_index.TABLE):
+            return self._scan_run_output(q, limit)
+        cur = self._conn.cursor()
+        cur.execute(
+            f"""
+            SELECT ar.id, ar.started_at, a.name AS action_name, s.name AS server_name,
+                   {output_blobs.COLUMNS}
+            FROM {run_output_index.TABLE} f
+            JOIN action_runs ar ON ar.id = f.rowid
+            JOIN action_run_output o ON o.run_id = ar.id
+            {output_blobs.JOINS}
+            JOIN servers s ON s.id = ar.server_id
+            JOIN actions a ON a.id = ar.action_id
+            WHERE {run_output_index.TABLE} MATCH ?
+            ORDER BY ar.started_at DESC, ar.id DESC
+            LIMIT ?
+            """,
+            (run_output_index.match_query(q), limit),
+        )
+        return [self._output_match(row, q) for row in cur.fetchall()]
+
+    def _scan_run_output(self, q: str, limit: int) -> List[OutputMatch]:
+        """Fallback without FTS5: decompress and scan outputs, newest first."""
+        cur = self._conn.cursor()
+        cur.execute(
+            f"""
+            SELECT ar.id, ar.started_at, a.name AS action_name, s.name AS server_name,
+                   {output_blobs.COLUMNS}
+            FROM action_runs ar
+            JOIN action_run_output o ON o.run_id = ar.id
+            {output_blobs.JOINS}
+            JOIN servers s ON s.id = ar.server_id
+            JOIN actions a ON a.id = ar.action_id
+            ORDER BY ar.started_at DESC, ar.id DESC
+            """
+        )
+        needle = q.lower()
+        matches: List[OutputMatch] = []
+        for row in cur:
+            match = self._output_match(row, q)
+            if needle in match.snippet.lower():
+                matches.append(match)
+                if len(matches) >= limit:
+                    break
+        return matches
+
+    @staticmethod
+    def _output_match(row: sqlite3.Row, q: str) -> OutputMatch:
+        stdout = decompress_text(row["stdout_blob"])
+        stderr = decompress_text(row["stderr_blob"])
+        stream, text = ("stdout", stdout) if q.lower() in stdout.lower() or not stderr else ("stderr", stderr)
+        return OutputMatch(
+            run_id=row["id"],
+            action_name=row["action_name"],
+            server_name=row["server_name"],
+            started_at=row["started_at"] or "",
+            stream=stream,
+            snippet=run_output_index.snippet(text, q),
+        )
+
+    def prune_history(self, policy: RetentionPolicy, *, full_vacuum: bool = False) -> PruneReport:
+        """Apply a retention policy to the run history (see core.retention)."""
+        return prune_history(self._backend, policy, full_vacuum=full_vacuum)
+
+    def tail_run(self, run_id: int, after_seq: int = 0) -> Optional[RunTail]:
+        """Output of a running run printed after chunk after_seq; None if the run does not exist.
+
+        Poll while status is 'running'. When the run finishes its chunks are
+        replaced by the stored output, which get_run_output() returns.
+        """
+        cur = self._conn.cursor()
+        cur.execute("SELECT status FROM action_runs WHERE id = ?", (run_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        cur.execute(
+            "SELECT seq, stream, data FROM action_run_chunks WHERE run_id = ? AND seq > ? ORDER BY seq",
+            (run_id, after_seq),
+        )
+        chunks = cur.fetchall()
+        return RunTail(
+            status=row["status"] or "",
+            chunks=[(chunk["stream"], chunk["data"]) for chunk in chunks],
+            next_seq=chunks[-1]["seq"] if chunks else after_seq,
+        )
+
+    def recover_interrupted_runs(self) -> int:
+        """Finalize runs left 'running' by a process that exited; returns how many.
+
+        Call once at startup, before any run starts: every 'running' row is
+        taken to be orphaned. Such runs become 'interrupted', keep the output
+        saved so far and end at the time of their last output.
+        """
+        cur = self._conn.cursor()
+        cur.execute("SELECT id FROM action_runs WHERE status = 'running'")
+        run_ids = [row["id"] for row in cur.fetchall()]
+        for run_id in run_ids:
+            self._interrupt_run(run_id)
+        return len(run_ids)
+
+    def get_run_output(self, run_id: int) -> Optional[RunOutput]:
+        """Load the (decompressed) command and output of a run, or None if it does not exist.
+
+        For a run still in progress, stdout/stderr are what it has printed so far.
+        """
+        cur = self._conn.cursor()
+        cur.execute(
+            f"""
+            SELECT ar.status, ar.command_rendered, ar.stdout, ar.stderr,
+                   o.run_id AS packed, {output_blobs.COLUMNS}
+            FROM action_runs ar
+            LEFT JOIN action_run_output o ON o.run_id = ar.id
+            {output_blobs.JOINS}
+            WHERE ar.id = ?
+            """,
+            (run_id,),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return None
+        if row["packed"] is None:
+            # Rows written by an older version before the migration ran.
+            return RunOutput(
+                command_rendered=row["command_rendered"] or "",
+                stdout=row["stdout"] or "",
+                stderr=row["stderr"] or "",
+            )
+        if row["status"] == "running":
+            stdout, stderr, _ = self._read_chunks(cur, run_id)
+            return RunOutput(command_rendered=decompress_text(row["command_blob"]), stdout=stdout, stderr=stderr)
+        return RunOutput(
+            command_rendered=decompress_text(row["command_blob"]),
+            stdout=decompress_text(row["stdout_blob"]),
+            stderr=decompress_text(row["stderr_blob"]),
         )
 
     def _insert_run(
@@ -232,6 +1194,8 @@ class ActionsStore:
         command_rendered: str,
         stdout: str,
         stderr: str,
+        queue_wait_ms: int = 0,
+        host: Optional[str] = None,
     ) -> int:
         cur = self._conn.cursor()
         cur.execute(
@@ -244,11 +1208,10 @@ class ActionsStore:
                 status,
                 exit_code,
                 duration_ms,
-                command_rendered,
-                stdout,
-                stderr
+                queue_wait_ms,
+                host
             )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 action_id,
@@ -258,13 +1221,206 @@ class ActionsStore:
                 status,
                 exit_code,
                 duration_ms,
-                (command_rendered or "")[:MAX_TEXT],
-                (stdout or "")[:MAX_TEXT],
-                (stderr or "")[:MAX_TEXT],
+                queue_wait_ms,
+                host,
             ),
         )
-        self._conn.commit()
-        return int(cur.lastrowid)
+        run_id = int(cur.lastrowid)
+        cur.execute(
+            "INSERT INTO action_run_output(run_id, command_id, stdout_id, stderr_id) VALUES (?, ?, ?, ?)",
+            (
+                run_id,
+                output_blobs.store(cur, (command_rendered or "")[:MAX_TEXT]),
+                output_blobs.store(cur, (stdout or "")[:MAX_TEXT]),
+                output_blobs.store(cur, (stderr or "")[:MAX_TEXT]),
+            ),
+        )
+        self._index_run(cur, run_id, action_id, server_id, started_at, status, duration_ms, stdout, stderr)
+        self._backend.commit()
+        return run_id
+
+    def _start_run(
+        self,
+        action_id: int,
+        server_id: int,
+        started_at: str,
+        command_rendered: str,
+        queue_wait_ms: int = 0,
+    ) -> int:
+        """Record a run that is about to execute as 'running'."""
+        cur = self._conn.cursor()
+        cur.execute(
+            """
+            INSERT INTO action_runs(action_id, server_id, started_at, status, queue_wait_ms)
+            VALUES (?, ?, ?, 'running', ?)
+            """,
+            (action_id, server_id, started_at, queue_wait_ms),
+        )
+        run_id = int(cur.lastrowid)
+        cur.execute(
+            "INSERT INTO action_run_output(run_id, command_id) VALUES (?, ?)",
+            (run_id, output_blobs.store(cur, command_rendered[:MAX_TEXT])),
+        )
+        self._backend.commit()
+        return run_id
+
+    def _finish_run(
+        self,
+        run_id: int,
+        *,
+        action_id: int,
+        server_id: int,
+        started_at: str,
+        finished_at: str,
+        status: str,
+        exit_code: Optional[int],
+        duration_ms: int,
+        stdout: str,
+        stderr: str,
+        host: Optional[str] = None,
+    ) -> None:
+        """Complete a run started by _start_run; its live chunks give way to the stored output."""
+        cur = self._conn.cursor()
+        cur.execute(
+            """
+            UPDATE action_runs SET finished_at = ?, status = ?, exit_code = ?, duration_ms = ?, host = ?
+            WHERE id = ?
+            """,
+            (finished_at, status, exit_code, duration_ms, host, run_id),
+        )
+        if cur.rowcount == 0:
+            # Deleted while it ran (e.g. with its server).
+            self._backend.commit()
+            return
+        cur.execute(
+            "UPDATE action_run_output SET stdout_id = ?, stderr_id = ? WHERE run_id = ?",
+            (
+                output_blobs.store(cur, (stdout or "")[:MAX_TEXT]),
+                output_blobs.store(cur, (stderr or "")[:MAX_TEXT]),
+                run_id,
+            ),
+        )
+        cur.execute("DELETE FROM action_run_chunks WHERE run_id = ?", (run_id,))
+        self._index_run(cur, run_id, action_id, server_id, started_at, status, duration_ms, stdout, stderr)
+        self._backend.commit()
+
+    def _interrupt_run(self, run_id: int) -> None:
+        """Finalize a 'running' run whose command never completed, keeping its saved output."""
+        cur = self._conn.cursor()
+        cur.execute(
+            "SELECT action_id, server_id, started_at FROM action_runs WHERE id = ? AND status = 'running'",
+            (run_id,),
+        )
+        row = cur.fetchone()
+        if row is None:
+            return
+        stdout, stderr, last_output_at = self._read_chunks(cur, run_id)
+        started_at = row["started_at"] or ""
+        finished_at = last_output_at or started_at
+        self._finish_run(
+            run_id,
+            action_id=row["action_id"],
+            server_id=row["server_id"],
+            started_at=started_at,
+            finished_at=finished_at,
+            status="interrupted",
+            exit_code=None,
+            duration_ms=_elapsed_ms(started_at, finished_at),
+            stdout=stdout,
+            stderr=stderr,
+        )
+
+    @staticmethod
+    def _read_chunks(cur: sqlite3.Cursor, run_id: int) -> tuple[str, str, Optional[str]]:
+        """(stdout, stderr, time of the last chunk) from a run's live chunks."""
+        cur.execute(
+            "SELECT stream, data, written_at FROM action_run_chunks WHERE run_id = ? ORDER BY seq",
+            (run_id,),
+        )
+        parts: dict[str, list[str]] = {"stdout": [], "stderr": []}
+        last_written_at = None
+        for row in cur.fetchall():
+            parts[row["stream"]].append(row["data"])
+            last_written_at = row["written_at"]
+        return "".join(parts["stdout"]), "".join(parts["stderr"]), last_written_at
+
+    def _index_run(
+        self,
+        cur: sqlite3.Cursor,
+        run_id: int,
+        action_id: int,
+        server_id: int,
+        started_at: str,
+        status: str,
+        duration_ms: int,
+        stdout: str,
+        stderr: str,
+    ) -> None:
+        """Add a finished run to the output search index and the statistics rollups."""
+        if self._backend.has_table(run_output_index.TABLE):
+            run_output_index.index_output(cur, run_id, (stdout or "")[:MAX_TEXT], (stderr or "")[:MAX_TEXT])
+        # Interrupted runs have no meaningful duration.
+        if status not in ("dry_run", "interrupted", "cancelled"):
+            self._record_stats(cur, action_id, server_id, started_at, status, duration_ms)
+
+    def _record_stats(
+        self,
+        cur: sqlite3.Cursor,
+        action_id: int,
+        server_id: int,
+        started_at: str,
+        status: str,
+        duration_ms: int,
+    ) -> None:
+        """Fold one run into its action_run_stats rollup (same transaction as the run)."""
+        day = started_at[:10]
+        failed = status in FAILURE_STATUSES
+        cur.execute(
+            "SELECT histogram FROM action_run_stats WHERE action_id = ? AND server_id = ? AND day = ?",
+            (action_id, server_id, day),
+        )
+        row = cur.fetchone()
+        hist = histogram.loads(row["histogram"] if row else None)
+        histogram.add(hist, duration_ms or 0)
+        cur.execute(
+            """
+            INSERT INTO action_run_stats(action_id, server_id, day, runs, successes, failures,
+                                         total_ms, max_ms, last_failure_at, histogram)
+            VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(action_id, server_id, day) DO UPDATE SET
+                runs = runs + 1,
+                successes = successes + excluded.successes,
+                failures = failures + excluded.failures,
+                total_ms = total_ms + excluded.total_ms,
+                max_ms = MAX(max_ms, excluded.max_ms),
+                last_failure_at = NULLIF(MAX(COALESCE(last_failure_at, ''), COALESCE(excluded.last_failure_at, '')), ''),
+                histogram = excluded.histogram
+            """,
+            (
+                action_id,
+                server_id,
+                day,
+                1 if status == "success" else 0,
+                1 if failed else 0,
+                duration_ms or 0,
+                duration_ms or 0,
+                started_at if failed else None,
+                histogram.dumps(hist),
+            ),
+        )
+
+
+def _elapsed_ms(start: str, end: str) -> int:
+    try:
+        delta = datetime.fromisoformat(end) - datetime.fromisoformat(start)
+    except ValueError:
+        return 0
+    return max(0, int(delta.total_seconds() * 1000))
+
+
+def _cancelled_before_start() -> CaptureResult:
+    """Outcome of a run whose fleet was aborted while it waited for a slot."""
+    return CaptureResult(exit_code=-1, stdout="", stderr="[cancelled before start]", duration_ms=0, cancelled=True)
 
 
 def _render_template(template: str, ctx: dict[str, str]) -> str:
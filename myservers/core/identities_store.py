@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import sqlite3
 from dataclasses import dataclass
 from typing import List, Optional
 
@@ -28,7 +29,10 @@ class IdentitiesStore:
 
     def __init__(self, backend: SqliteStore) -> None:
         self._backend = backend
-        self._conn = backend._conn  # internal use within core layer
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._backend._conn  # internal use within core layer
 
     # -------- identities --------
 
@@ -71,7 +75,7 @@ class IdentitiesStore:
             "INSERT INTO identities(name, username, kind, key_path) VALUES (?, ?, ?, ?)",
             (name.strip(), (username or "").strip() or None, kind, (key_path or "").strip() or None),
         )
-        self._conn.commit()
+        self._backend.commit()
         return int(cur.lastrowid)
 
     def update_identity_metadata(
@@ -87,22 +91,29 @@ class IdentitiesStore:
             "UPDATE identities SET name = ?, username = ?, kind = ?, key_path = ? WHERE id = ?",
             (name.strip(), (username or "").strip() or None, kind, (key_path or "").strip() or None, identity_id),
         )
-        self._conn.commit()
+        self._backend.commit()
 
     def delete_identity_metadata(self, identity_id: int) -> None:
         cur = self._conn.cursor()
         cur.execute("DELETE FROM identities WHERE id = ?", (identity_id,))
-        self._conn.commit()
+        self._backend.commit()
 
     # -------- ssh_profiles --------
 
     def get_ssh_profile(self, server_name: str) -> Optional[SshProfileMeta]:
-        cur = self._conn.cursor()
-        cur.execute("SELECT id FROM servers WHERE name = ?", (server_name.strip(),))
-        srow = cur.fetchone()
-        if srow is None:
+        server_id = self._backend.server_id(server_name)
+        if server_id is None:
+            return None
+        return self._get_ssh_profile(server_id, server_name)
+
+    def get_ssh_profile_by_id(self, server_id: int) -> Optional[SshProfileMeta]:
+        server_name = self._backend.server_name(server_id)
+        if server_name is None:
             return None
-        server_id = srow["id"]
+        return self._get_ssh_profile(server_id, server_name)
+
+    def _get_ssh_profile(self, server_id: int, server_name: str) -> Optional[SshProfileMeta]:
+        cur = self._conn.cursor()
         cur.execute(
             "SELECT port, identity_id, username_override FROM ssh_profiles WHERE server_id = ?",
             (server_id,),
@@ -124,13 +135,20 @@ class IdentitiesStore:
         identity_id: Optional[int],
         username_override: Optional[str],
     ) -> None:
-        cur = self._conn.cursor()
-        cur.execute("SELECT id FROM servers WHERE name = ?", (server_name.strip(),))
-        srow = cur.fetchone()
-        if srow is None:
+        server_id = self._backend.server_id(server_name)
+        if server_id is None:
             # no such server; nothing to do
             return
-        server_id = srow["id"]
+        self.set_ssh_profile_by_id(server_id, port, identity_id, username_override)
+
+    def set_ssh_profile_by_id(
+        self,
+        server_id: int,
+        port: int,
+        identity_id: Optional[int],
+        username_override: Optional[str],
+    ) -> None:
+        cur = self._conn.cursor()
         cur.execute(
             """
             INSERT INTO ssh_profiles(server_id, port, identity_id, username_override)
@@ -147,5 +165,5 @@ class IdentitiesStore:
                 (username_override or "").strip() or None,
             ),
         )
-        self._conn.commit()
+        self._backend.commit()
 
@@ -60,21 +60,22 @@ def import_legacy_into_store(path: Path, store: ServerStore) -> ImportResult:
     imported = 0
     renamed = 0
 
-    for server in servers:
-        base = server.name.strip()
-        if not base:
-            continue
-        candidate = base
-        suffix = 2
-        while candidate in existing_names:
-            candidate = f"{base} (imported {suffix})"
-            suffix += 1
-        if candidate != server.name:
-            renamed += 1
-        to_save = Server(name=candidate, hosts=server.hosts)
-        store.create_server(to_save)
-        existing_names.add(candidate)
-        imported += 1
+    with store.transaction():
+        for server in servers:
+            base = server.name.strip()
+            if not base:
+                continue
+            candidate = base
+            suffix = 2
+            while candidate in existing_names:
+                candidate = f"{base} (imported {suffix})"
+                suffix += 1
+            if candidate != server.name:
+                renamed += 1
+            to_save = Server(name=candidate, hosts=server.hosts)
+            store.create_server(to_save)
+            existing_names.add(candidate)
+            imported += 1
 
     return ImportResult(imported_count=imported, renamed_count=renamed)
 
@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Optional
 
-from myservers.core.identities_store import IdentitiesStore, IdentityMeta
+from myservers.core.identities_store import IdentitiesStore
 from myservers.core.models import HostSet, Server
 from myservers.core.servers import ServerStore
 
@@ -119,19 +119,6 @@ def parse_ssh_config(text: str) -> List[SshConfigCandidate]:
     return candidates
 
 
-def _find_identity_by_key_path(
-    store: IdentitiesStore, key_path: str
-) -> Optional[IdentityMeta]:
-    """Return existing identity with kind='ssh_key_path' and matching key_path, if any."""
-    key_path_norm = key_path.strip()
-    if not key_path_norm:
-        return None
-    for ident in store.list_identities():
-        if ident.kind == "ssh_key_path" and (ident.key_path or "").strip() == key_path_norm:
-            return ident
-    return None
-
-
 def apply_ssh_config_import(
     candidates: List[SshConfigCandidate],
     server_store: ServerStore,
@@ -152,50 +139,64 @@ def apply_ssh_config_import(
         * key_path stored in key_path column
         * NEVER store key contents or touch keyring for ssh_key_path identities
         * de-duplicate by key_path
-    """
 
-    for cand in candidates:
-        alias = cand.host_alias.strip()
-        if not alias:
-            continue
+    All writes are committed as a single transaction.
+    """
 
-        # Ensure a server entry exists (update existing if found).
-        existing = server_store.get_server(alias)
-        if existing is None:
-            hosts = HostSet(internal_primary=cand.host_name)
-            server = Server(name=alias, hosts=hosts)
-            server_store.create_server(server)
-        else:
-            # Update internal_primary but keep other host fields as-is.
-            hosts = HostSet(
-                internal_primary=cand.host_name,
-                internal_secondary=existing.hosts.internal_secondary,
-                external_primary=existing.hosts.external_primary,
-                external_secondary=existing.hosts.external_secondary,
-            )
-            server_store.update_server(existing.name, Server(name=existing.name, hosts=hosts))
-
-        # Decide on identity metadata.
-        identity_id: Optional[int] = None
-        if cand.identity_file:
-            existing_ident = _find_identity_by_key_path(identities, cand.identity_file)
-            if existing_ident is not None:
-                identity_id = existing_ident.id
+    idents_by_key_path = {
+        (ident.key_path or "").strip(): ident
+        for ident in identities.list_identities()
+        if ident.kind == "ssh_key_path" and (ident.key_path or "").strip()
+    }
+
+    with server_store.transaction():
+        for cand in candidates:
+            alias = cand.host_alias.strip()
+            if not alias:
+                continue
+
+            # Ensure a server entry exists (update existing if found).
+            existing = server_store.get_server(alias)
+            if existing is None:
+                hosts = HostSet(internal_primary=cand.host_name)
+                server = Server(name=alias, hosts=hosts)
+                server_store.create_server(server)
             else:
-                # Create new metadata-only identity for this key path.
-                # We never touch keyring for ssh_key_path identities.
-                from os.path import basename
-
-                name = f"ssh-key:{basename(cand.identity_file)}"
-                identity_id = identities.create_identity_metadata(
-                    name=name,
-                    username=cand.username,
-                    kind="ssh_key_path",
-                    key_path=cand.identity_file,
+                # Update internal_primary but keep other host fields as-is.
+                hosts = HostSet(
+                    internal_primary=cand.host_name,
+                    internal_secondary=existing.hosts.internal_secondary,
+                    external_primary=existing.hosts.external_primary,
+                    external_secondary=existing.hosts.external_secondary,
+                )
+                server_store.update_server(
+                    existing.name, Server(name=existing.name, hosts=hosts, notes=existing.notes)
                 )
 
-        # Upsert SSH profile for this server.
-        port = cand.port if cand.port is not None else 22
-        username_override = cand.username or None
-        identities.set_ssh_profile(alias, port=port, identity_id=identity_id, username_override=username_override)
+            # Decide on identity metadata.
+            identity_id: Optional[int] = None
+            if cand.identity_file:
+                existing_ident = idents_by_key_path.get(cand.identity_file.strip())
+                if existing_ident is not None:
+                    identity_id = existing_ident.id
+                else:
+                    # Create new metadata-only identity for this key path.
+                    # We never touch keyring for ssh_key_path identities.
+                    from os.path import basename
+
+                    name = f"ssh-key:{basename(cand.identity_file)}"
+                    identity_id = identities.create_identity_metadata(
+                        name=name,
+                        username=cand.username,
+                        kind="ssh_key_path",
+                        key_path=cand.identity_file,
+                    )
+                    created = identities.get_identity(identity_id)
+                    if created is not None:
+                        idents_by_key_path[cand.identity_file.strip()] = created
+
+            # Upsert SSH profile for this server.
+            port = cand.port if cand.port is not None else 22
+            username_override = cand.username or None
+            identities.set_ssh_profile(alias, port=port, identity_id=identity_id, username_override=username_override)
 
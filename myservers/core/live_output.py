@@ -0,0 +1,292 @@
+"""Live output of runs in progress.
+
+While a command executes, the output it prints is appended to
+action_run_chunks so the UI (or the app after a restart) can see it before the
+run finishes. Reader threads hand raw chunks to LiveOutputWriter.write(); a
+ticker thread writes whatever has accumulated every flush_interval_s in one
+short transaction, so a chatty command costs a few commits per second instead
+of one per read. The chunks are deleted when the run is finalized and its
+output moves to output_blobs.
+
+Runs executed together share one flusher instead of a ticker each: a
+LiveOutputFlusher thread for a threaded fan-out, a LiveOutputPump task for
+async runs. Either writes the output of all its runs in a single transaction
+per tick.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import contextlib
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+from myservers.storage.sqlite_store import SqliteStore
+
+DEFAULT_FLUSH_INTERVAL_S = 0.5
+# Live output kept per run; the finished run still records the head and tail.
+LIVE_OUTPUT_LIMIT = 1024 * 1024
+
+_STREAMS = ("stdout", "stderr")
+
+_INSERT_CHUNK = "INSERT INTO action_run_chunks(run_id, seq, stream, data, written_at) VALUES (?, ?, ?, ?, ?)"
+
+
+class LiveOutputWriter:
+    """Appends a run's output to action_run_chunks while it executes.
+
+    ticker=False leaves flushing to the owner (see LiveOutputPump).
+    """
+
+    def __init__(
+        self,
+        backend: SqliteStore,
+        run_id: int,
+        *,
+        flush_interval_s: float = DEFAULT_FLUSH_INTERVAL_S,
+        limit_bytes: int = LIVE_OUTPUT_LIMIT,
+        ticker: bool = True,
+    ) -> None:
+        self._backend = backend
+        self._run_id = run_id
+        self._interval = flush_interval_s
+        self._limit = limit_bytes
+        self._bytes = 0
+        self._seq = 0
+        # Chunks can split multi-byte characters.
+        self._decoders = {stream: codecs.getincrementaldecoder("utf-8")(errors="replace") for stream in _STREAMS}
+        self._pending: list[tuple[str, str]] = []
+        # Set once the run's row is gone (deleted while it ran): output is dropped.
+        self._abandoned = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        if ticker:
+            self._thread = threading.Thread(target=self._tick, name=f"live-output-{run_id}", daemon=True)
+            self._thread.start()
+
+    def write(self, stream: str, data: bytes) -> None:
+        """Queue output for the next flush (capture.OutputCallback; thread-safe)."""
+        with self._lock:
+            room = self._limit - self._bytes
+            if room <= 0 or self._abandoned:
+                return
+            if len(data) > room:
+                data = data[:room]
+            self._bytes += len(data)
+            text = self._decoders[stream].decode(data)
+            if self._bytes >= self._limit:
+                text += self._decoders[stream].decode(b"", final=True)
+                text += "\n[... live output limit reached ...]\n"
+            if text:
+                self._pending.append((stream, text.replace("\r\n", "\n")))
+
+    def has_pending(self) -> bool:
+        with self._lock:
+            return bool(self._pending)
+
+    def close(self) -> None:
+        """Stop the ticker and write the remaining output."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.finish()
+        try:
+            flush_many(self._backend, [self])
+        except sqlite3.DatabaseError:
+            # Not fatal: the finished run records its output anyway.
+            pass
+
+    def finish(self) -> None:
+        """Queue any partial character left in the decoders (the process has exited)."""
+        with self._lock:
+            for stream, decoder in self._decoders.items():
+                tail = decoder.decode(b"", final=True)
+                if tail:
+                    self._pending.append((stream, tail))
+
+    def _tick(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                flush_many(self._backend, [self])
+            except sqlite3.DatabaseError:
+                # Busy beyond the timeout; the output is kept for the next tick.
+                pass
+
+    def _drain(self, written_at: str) -> tuple[list[tuple[str, str]], list[tuple[Any, ...]]]:
+        """Take the pending output as chunk rows; (pending, rows)."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            merged: list[list[str]] = []
+            for stream, text in pending:
+                if merged and merged[-1][0] == stream:
+                    merged[-1][1] += text
+                else:
+                    merged.append([stream, text])
+            # Numbered under the lock: a ticker and close() may drain concurrently.
+            rows = [
+                (self._run_id, self._seq + i, stream, text, written_at)
+                for i, (stream, text) in enumerate(merged, start=1)
+            ]
+            self._seq += len(rows)
+        return pending, rows
+
+    def _restore(self, pending: list[tuple[str, str]]) -> None:
+        with self._lock:
+            self._pending[:0] = pending
+
+    def _abandon(self) -> None:
+        with self._lock:
+            self._abandoned = True
+            self._pending = []
+
+
+def flush_many(backend: SqliteStore, writers: Iterable[LiveOutputWriter]) -> None:
+    """Write the pending output of several runs in one transaction.
+
+    On failure the output goes back to its writers for the next attempt. A
+    run deleted while it executes (its chunks break the foreign key) stops
+    receiving output; the others are still written.
+    """
+    written_at = datetime.now(timezone.utc).isoformat()
+    drained = [(writer, *writer._drain(written_at)) for writer in writers]
+    rows = [row for _, _, writer_rows in drained for row in writer_rows]
+    if not rows:
+        return
+    try:
+        with backend.transaction() as conn:
+            conn.executemany(_INSERT_CHUNK, rows)
+        return
+    except sqlite3.IntegrityError:
+        pass
+    except BaseException:
+        for writer, pending, _ in drained:
+            writer._restore(pending)
+        raise
+    # Find the deleted run(s), one transaction per run.
+    for i, (writer, pending, writer_rows) in enumerate(drained):
+        if not writer_rows:
+            continue
+        try:
+            with backend.transaction() as conn:
+                conn.executemany(_INSERT_CHUNK, writer_rows)
+        except sqlite3.IntegrityError:
+            writer._abandon()
+        except BaseException:
+            for later, later_pending, _ in drained[i:]:
+                later._restore(later_pending)
+            raise
+
+
+class LiveOutputFlusher:
+    """Flushes the live output of many concurrent threaded runs from one thread.
+
+    Use as a context manager around the runs (see ActionsStore.run_action_many);
+    LiveOutputPump is the asyncio counterpart.
+    """
+
+    def __init__(self, backend: SqliteStore, *, flush_interval_s: float = DEFAULT_FLUSH_INTERVAL_S) -> None:
+        self._backend = backend
+        self._interval = flush_interval_s
+        self._writers: set[LiveOutputWriter] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> LiveOutputFlusher:
+        self._thread = threading.Thread(target=self._tick, name="live-output", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            writers = list(self._writers)
+        self._flush(writers)
+
+    def open(self, run_id: int) -> LiveOutputWriter:
+        writer = LiveOutputWriter(self._backend, run_id, flush_interval_s=self._interval, ticker=False)
+        with self._lock:
+            self._writers.add(writer)
+        return writer
+
+    def close(self, writer: LiveOutputWriter) -> None:
+        """Write the rest of a finished run's output and stop tracking it."""
+        with self._lock:
+            self._writers.discard(writer)
+        writer.finish()
+        self._flush([writer])
+
+    def _tick(self) -> None:
+        while not self._stop.wait(self._interval):
+            with self._lock:
+                writers = list(self._writers)
+            self._flush(writers)
+
+    def _flush(self, writers: list[LiveOutputWriter]) -> None:
+        writers = [writer for writer in writers if writer.has_pending()]
+        if not writers:
+            return
+        try:
+            flush_many(self._backend, writers)
+        except sqlite3.DatabaseError:
+            # Busy beyond the timeout; retried on the next tick (or dropped at
+            # close, the finished run records its output anyway).
+            pass
+
+
+class LiveOutputPump:
+    """Flushes the live output of many concurrent async runs from one task.
+
+    Use as an async context manager around the runs; the writes happen on a
+    worker thread so the event loop never waits on SQLite.
+    """
+
+    def __init__(self, backend: SqliteStore, *, flush_interval_s: float = DEFAULT_FLUSH_INTERVAL_S) -> None:
+        self._backend = backend
+        self._interval = flush_interval_s
+        self._writers: set[LiveOutputWriter] = set()
+        self._task: asyncio.Task[None] | None = None
+
+    async def __aenter__(self) -> LiveOutputPump:
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        await self._flush(list(self._writers))
+
+    def open(self, run_id: int) -> LiveOutputWriter:
+        writer = LiveOutputWriter(self._backend, run_id, flush_interval_s=self._interval, ticker=False)
+        self._writers.add(writer)
+        return writer
+
+    async def close(self, writer: LiveOutputWriter) -> None:
+        """Write the rest of a finished run's output and stop tracking it."""
+        self._writers.discard(writer)
+        writer.finish()
+        await self._flush([writer])
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            await self._flush(list(self._writers))
+
+    async def _flush(self, writers: list[LiveOutputWriter]) -> None:
+        writers = [writer for writer in writers if writer.has_pending()]
+        if not writers:
+            return
+        try:
+            await asyncio.to_thread(flush_many, self._backend, writers)
+        except sqlite3.DatabaseError:
+            # Busy beyond the timeout; retried on the next tick (or dropped at
+            # close, the finished run records its output anyway).
+            pass
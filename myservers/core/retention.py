@@ -0,0 +1,152 @@
+"""Retention for action history: prune old runs and give the space back.
+
+Pruning deletes in small batches (one short transaction each) so the app and
+other writers are never blocked for long. Output blobs go with their runs via
+ON DELETE CASCADE; the daily rollups in action_run_stats are kept.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from myservers.storage import run_output_index
+from myservers.storage.sqlite_store import SqliteStore
+
+
+# Statuses that count as a failure (keep_last_failure, run statistics).
+FAILURE_STATUSES = ("error", "interrupted", "cancelled")
+
+DEFAULT_BATCH_SIZE = 500
+
+
+@dataclass
+class RetentionPolicy:
+    """What to keep. None disables a rule."""
+
+    max_age_days: Optional[int] = 90
+    max_runs_per_action_server: Optional[int] = 500
+    # Always keep the most recent failed run of each action/server pair.
+    keep_last_failure: bool = True
+
+
+@dataclass
+class PruneReport:
+    runs_deleted: int
+    bytes_before: int
+    bytes_after: int
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return max(0, self.bytes_before - self.bytes_after)
+
+
+def prune_history(
+    backend: SqliteStore,
+    policy: RetentionPolicy,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    full_vacuum: bool = False,
+    now: Optional[datetime] = None,
+) -> PruneReport:
+    """Delete runs outside the policy, then compact the database file.
+
+    Compaction uses incremental_vacuum. full_vacuum=True runs VACUUM instead,
+    which also converts databases created before auto_vacuum was enabled (it
+    rewrites the whole file, so it is slow on large databases). Raises
+    sqlite3.ProgrammingError when called inside a transaction.
+    """
+    _check_no_transaction(backend)
+    bytes_before = database_size(backend)
+    deleted = _delete_runs(backend, policy, batch_size, now or datetime.now(timezone.utc))
+    compact(backend, full=full_vacuum)
+    return PruneReport(runs_deleted=deleted, bytes_before=bytes_before, bytes_after=database_size(backend))
+
+
+def database_size(backend: SqliteStore) -> int:
+    """Size of the database in bytes (page_count * page_size)."""
+    return backend.database_size()
+
+
+def compact(backend: SqliteStore, *, full: bool = False) -> None:
+    """Return free pages to the filesystem and truncate the WAL (see SqliteStore.compact).
+
+    The run output index is optimized first; deletions only leave tombstones
+    in it until its segments are merged. Raises sqlite3.ProgrammingError when
+    called inside a transaction.
+    """
+    _check_no_transaction(backend)
+    if backend.has_table(run_output_index.TABLE):
+        with backend.transaction() as conn:
+            run_output_index.optimize(conn.cursor())
+    backend.compact(full=full)
+
+
+def _check_no_transaction(backend: SqliteStore) -> None:
+    # Pruning commits batch by batch and VACUUM cannot run in a transaction;
+    # neither may commit (or be rolled back with) the caller's writes.
+    if backend.in_transaction():
+        raise sqlite3.ProgrammingError("Cannot prune or compact the database inside a transaction")
+
+
+def _delete_runs(backend: SqliteStore, policy: RetentionPolicy, batch_size: int, now: datetime) -> int:
+    conn = backend._conn
+    rules: list[str] = []
+    params: list[object] = []
+    if policy.max_age_days is not None:
+        rules.append("started_at < ?")
+        params.append((now - timedelta(days=policy.max_age_days)).isoformat())
+    if policy.max_runs_per_action_server is not None:
+        rules.append("rn > ?")
+        params.append(policy.max_runs_per_action_server)
+    if not rules:
+        return 0
+    where = " OR ".join(rules)
+    failures = ", ".join(f"'{status}'" for status in FAILURE_STATUSES)
+    if policy.keep_last_failure:
+        where = f"({where}) AND NOT (fail_rn = 1 AND status IN ({failures}))"
+
+    # Candidates are computed once into a temp table; the window functions scan
+    # action_runs a single time instead of once per batch.
+    conn.execute("DROP TABLE IF EXISTS temp.prune_ids")
+    conn.execute("CREATE TEMP TABLE prune_ids (id INTEGER PRIMARY KEY)")
+    deleted = 0
+    try:
+        with backend.transaction():
+            conn.execute(
+                f"""
+                INSERT INTO temp.prune_ids(id)
+                SELECT id FROM (
+                    SELECT id, status, started_at,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY action_id, server_id ORDER BY started_at DESC, id DESC
+                           ) AS rn,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY action_id, server_id, status IN ({failures})
+                               ORDER BY started_at DESC, id DESC
+                           ) AS fail_rn
+                    FROM action_runs
+                )
+                WHERE {where}
+                """,
+                params,
+            )
+        indexed = backend.has_table(run_output_index.TABLE)
+        while True:
+            ids = [row[0] for row in conn.execute("SELECT id FROM temp.prune_ids ORDER BY id LIMIT ?", (batch_size,))]
+            if not ids:
+                break
+            upto = ids[-1]
+            with backend.transaction():
+                if indexed:
+                    run_output_index.unindex_runs(conn.cursor(), ids)
+                cur = conn.execute(
+                    "DELETE FROM action_runs WHERE id IN (SELECT id FROM temp.prune_ids WHERE id <= ?)", (upto,)
+                )
+                conn.execute("DELETE FROM temp.prune_ids WHERE id <= ?", (upto,))
+            deleted += cur.rowcount
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.prune_ids")
+    return deleted
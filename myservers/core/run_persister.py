@@ -0,0 +1,113 @@
+"""Write-behind persistence for action runs.
+
+run_action hands finished runs to a RunPersister instead of inserting and
+committing each one; a background thread drains the queue and writes whatever
+has accumulated in one transaction, so many concurrent runs share a single
+commit (and fsync). A full queue blocks submit() until the writer catches up.
+"""
+
+from __future__ import annotations
+
+import atexit
+import queue
+import threading
+from typing import Any, Callable
+
+from myservers.storage.sqlite_store import SqliteStore
+
+DEFAULT_MAX_PENDING = 1000
+DEFAULT_BATCH_SIZE = 100
+
+_STOP = object()
+
+
+class RunPersister:
+    """Background writer for run records (keyword arguments of ActionsStore._insert_run)."""
+
+    def __init__(
+        self,
+        backend: SqliteStore,
+        insert: Callable[..., int],
+        *,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self._backend = backend
+        self._insert = insert
+        self._batch_size = batch_size
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=max_pending)
+        self._errors: list[Exception] = []
+        self._errors_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="run-persister", daemon=True)
+        self._thread.start()
+        # Pending runs are written even if the owner never calls close().
+        atexit.register(self.close)
+
+    def submit(self, record: dict[str, Any]) -> None:
+        """Queue a run for writing; blocks while max_pending runs are already waiting."""
+        if self._closed:
+            raise RuntimeError("RunPersister is closed")
+        self._queue.put(record)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def flush(self) -> None:
+        """Wait until every submitted run is written.
+
+        Raises RuntimeError if any run could not be saved since the last flush.
+        """
+        self._queue.join()
+        self._raise_errors()
+
+    def close(self) -> None:
+        """Flush and stop the writer thread (idempotent)."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._raise_errors()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [item for item in batch if item is not _STOP]
+            try:
+                if records:
+                    self._write(records)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(records) < len(batch):
+                return
+
+    def _write(self, records: list[dict[str, Any]]) -> None:
+        try:
+            with self._backend.transaction():
+                for record in records:
+                    self._insert(**record)
+            return
+        except Exception:
+            pass
+        # Isolate the bad record(s) so the rest of the batch is still saved.
+        for record in records:
+            try:
+                with self._backend.transaction():
+                    self._insert(**record)
+            except Exception as exc:
+                with self._errors_lock:
+                    self._errors.append(exc)
+
+    def _raise_errors(self) -> None:
+        with self._errors_lock:
+            errors, self._errors = self._errors, []
+        if errors:
+            raise RuntimeError(f"{len(errors)} run(s) could not be saved: {errors[0]}") from errors[0]
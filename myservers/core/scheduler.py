@@ -0,0 +1,206 @@
+"""Concurrency limits for action execution.
+
+Every executed run takes a slot from the RunScheduler before its command
+starts: one of max_in_flight overall, one of per_host for its target host and
+one of per_tag[tag] for each limited tag of its server, all at once or not at
+all. An optional token bucket also caps how fast commands start. The same
+scheduler serves threads (slot) and asyncio tasks (slot_async), so threaded
+and async runs share the limits; local and SSH actions are limited alike, by
+the host they target. An SSH run that fails over to another address moves its
+per-host share there (move_host), so the limit follows the host actually
+serving the run.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator, Optional, Sequence
+
+
+@dataclass
+class ConcurrencyLimits:
+    """How many runs may execute at once, and how fast they may start. None disables a limit."""
+
+    max_in_flight: Optional[int] = 64
+    per_host: Optional[int] = 4
+    # tag name -> runs at once across all servers with that tag (e.g. {"bastion": 2})
+    per_tag: dict[str, int] = field(default_factory=dict)
+    starts_per_second: Optional[float] = None
+    # Starts allowed back to back before the rate applies.
+    burst: int = 10
+
+
+@dataclass
+class Slot:
+    """Execution slot held by one run (see RunScheduler.slot)."""
+
+    keys: tuple[str, ...]
+    # Time spent waiting for the slot.
+    queue_wait_ms: int = 0
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int) -> None:
+        self._rate = rate
+        self._capacity = max(1, burst)
+        self._tokens = float(self._capacity)
+        self._updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token; 0 if one was available, else the seconds until there is one."""
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self._rate
+
+
+class RunScheduler:
+    """Hands out execution slots under a ConcurrencyLimits."""
+
+    def __init__(self, limits: Optional[ConcurrencyLimits] = None) -> None:
+        self.limits = limits or ConcurrencyLimits()
+        self._cond = threading.Condition()
+        self._in_flight: dict[str, int] = {}
+        self._bucket = (
+            _TokenBucket(self.limits.starts_per_second, self.limits.burst) if self.limits.starts_per_second else None
+        )
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future[None]]] = []
+
+    def keys(self, host: str, tags: Sequence[str] = ()) -> tuple[str, ...]:
+        """Slot keys of a run against host on a server with tags."""
+        keys = ["*", f"host:{host}"]
+        keys += [f"tag:{tag}" for tag in tags if tag in self.limits.per_tag]
+        return tuple(keys)
+
+    def in_flight(self, key: str = "*") -> int:
+        with self._cond:
+            return self._in_flight.get(key, 0)
+
+    @contextlib.contextmanager
+    def slot(self, keys: Sequence[str]) -> Iterator[Slot]:
+        """Block until a slot is free; yields it, with the time waited in ms."""
+        held = Slot(keys=tuple(keys), queue_wait_ms=self._acquire(keys))
+        try:
+            yield held
+        finally:
+            self._release(held.keys)
+
+    @contextlib.asynccontextmanager
+    async def slot_async(self, keys: Sequence[str]) -> AsyncIterator[Slot]:
+        """slot() for asyncio tasks: waits without blocking the event loop."""
+        held = Slot(keys=tuple(keys), queue_wait_ms=await self._acquire_async(keys))
+        try:
+            yield held
+        finally:
+            self._release(held.keys)
+
+    def move_host(self, held: Slot, host: str) -> None:
+        """Move a held slot's per-host share to host, e.g. when SSH fails over to another address.
+
+        The old host's share is given back before waiting for the new one, so a
+        run never waits while holding a host slot.
+        """
+        old, new = self._host_move(held, host)
+        if new:
+            self._release(old)
+            held.keys = tuple(key for key in held.keys if key not in old)
+            self._acquire(new)
+            held.keys += new
+
+    async def move_host_async(self, held: Slot, host: str) -> None:
+        """move_host() for asyncio tasks."""
+        old, new = self._host_move(held, host)
+        if new:
+            self._release(old)
+            held.keys = tuple(key for key in held.keys if key not in old)
+            await self._acquire_async(new)
+            held.keys += new
+
+    @staticmethod
+    def _host_move(held: Slot, host: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        """(keys to give back, keys to take) to move held to host; both empty if it is already there."""
+        new = f"host:{host}"
+        if new in held.keys:
+            return (), ()
+        return tuple(key for key in held.keys if key.startswith("host:")), (new,)
+
+    def _acquire(self, keys: Sequence[str]) -> int:
+        """Block until keys are taken; the time waited in ms."""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                delay = self._try_acquire(keys)
+                if delay == 0:
+                    break
+                self._cond.wait(None if delay == math.inf else delay)
+        return int((time.monotonic() - start) * 1000)
+
+    async def _acquire_async(self, keys: Sequence[str]) -> int:
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        while True:
+            with self._cond:
+                delay = self._try_acquire(keys)
+                if delay == 0:
+                    break
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await asyncio.wait_for(waiter, None if delay == math.inf else delay)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._cond, contextlib.suppress(ValueError):
+                    self._async_waiters.remove((loop, waiter))
+        return int((time.monotonic() - start) * 1000)
+
+    def _limit(self, key: str) -> Optional[int]:
+        if key == "*":
+            return self.limits.max_in_flight
+        if key.startswith("host:"):
+            return self.limits.per_host
+        return self.limits.per_tag.get(key[len("tag:"):])
+
+    def _try_acquire(self, keys: Sequence[str]) -> float:
+        """Take the slot if possible (caller holds the lock).
+
+        Returns 0 on success, else how long to wait: the time until the next
+        start token, or math.inf until another run releases its slot.
+        """
+        for key in keys:
+            limit = self._limit(key)
+            if limit is not None and self._in_flight.get(key, 0) >= limit:
+                return math.inf
+        if self._bucket is not None:
+            delay = self._bucket.take()
+            if delay > 0:
+                return delay
+        for key in keys:
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+        return 0.0
+
+    def _release(self, keys: Sequence[str]) -> None:
+        with self._cond:
+            for key in keys:
+                self._in_flight[key] -= 1
+            self._cond.notify_all()
+            # Waiters may be blocked on different keys, so all of them re-check.
+            waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            # A loop that closed with a task still waiting has nothing to wake;
+            # it must not stop the release from reaching the other waiters.
+            with contextlib.suppress(RuntimeError):
+                loop.call_soon_threadsafe(_wake, waiter)
+
+
+def _wake(waiter: asyncio.Future[None]) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from contextlib import AbstractContextManager, nullcontext
 from pathlib import Path
 from typing import Any, List, Optional, Protocol, runtime_checkable
 
@@ -16,6 +17,19 @@ class Storage(Protocol):
     def delete(self, section: str, key: str) -> None: ...
 
 
+@runtime_checkable
+class ServerStorage(Protocol):
+    """Backends that store Server objects natively (e.g. SqliteStore)."""
+
+    def list_servers(self) -> List[Server]: ...
+
+    def get_server(self, name: str) -> Optional[Server]: ...
+
+    def upsert_server(self, server: Server, original_name: str | None = None) -> None: ...
+
+    def delete_server(self, name: str) -> None: ...
+
+
 class ServerStore:
     """Server CRUD facade over a storage backend (JsonStore, SqliteStore, etc.).
 
@@ -34,6 +48,10 @@ class ServerStore:
         else:
             self._store = backend
         self._section = section
+        # Native Server API when the backend offers it; skips the dict round-trip.
+        self._typed: ServerStorage | None = None
+        if section == "Servers" and isinstance(self._store, ServerStorage):
+            self._typed = self._store
 
     # -------- internal helpers ---------
 
@@ -61,7 +79,16 @@ class ServerStore:
 
     # -------- public API ---------
 
+    def transaction(self) -> AbstractContextManager[Any]:
+        """Group several writes into one commit when the backend supports it."""
+        transaction = getattr(self._store, "transaction", None)
+        if transaction is None:
+            return nullcontext()
+        return transaction()
+
     def list_servers(self) -> List[Server]:
+        if self._typed is not None:
+            return self._typed.list_servers()
         bucket = self._store.get(self._section, None) or {}
         if not isinstance(bucket, dict):
             return []
@@ -71,6 +98,8 @@ class ServerStore:
         name = name.strip()
         if not name:
             return None
+        if self._typed is not None:
+            return self._typed.get_server(name)
         data = self._store.get(self._section, name)
         if not data:
             return None
@@ -80,8 +109,12 @@ class ServerStore:
         name = server.name.strip()
         if not name:
             raise ValueError("Server name is required")
-        bucket = self._store.get(self._section, None) or {}
-        if name in bucket:
+        if self._typed is not None:
+            if self._typed.get_server(name) is not None:
+                raise ValueError("Server already exists")
+            self._typed.upsert_server(Server(name=name, hosts=server.hosts, notes=server.notes))
+            return
+        if self._store.get(self._section, name) is not None:
             raise ValueError("Server already exists")
         self._store.set(self._section, name, self._serialize(Server(name=name, hosts=server.hosts, notes=server.notes)))
 
@@ -92,10 +125,20 @@ class ServerStore:
             raise ValueError("Original name is required")
         if not new_name:
             raise ValueError("Server name is required")
-        bucket = self._store.get(self._section, None) or {}
-        if original_name not in bucket:
+        if self._typed is not None:
+            if self._typed.get_server(original_name) is None:
+                raise KeyError("Server does not exist")
+            if new_name != original_name and self._typed.get_server(new_name) is not None:
+                raise ValueError("Server with this name already exists")
+            # Renames happen in place, keeping everything attached to the server.
+            self._typed.upsert_server(
+                Server(name=new_name, hosts=server.hosts, notes=server.notes),
+                original_name=original_name,
+            )
+            return
+        if self._store.get(self._section, original_name) is None:
             raise KeyError("Server does not exist")
-        if new_name != original_name and new_name in bucket:
+        if new_name != original_name and self._store.get(self._section, new_name) is not None:
             raise ValueError("Server with this name already exists")
 
         # Rename if needed
@@ -111,5 +154,8 @@ class ServerStore:
         name = name.strip()
         if not name:
             return
+        if self._typed is not None:
+            self._typed.delete_server(name)
+            return
         self._store.delete(self._section, name)
 
@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import sqlite3
 from dataclasses import dataclass
 from typing import List, Sequence
 
 from myservers.core.models import HostSet
-from myservers.storage.sqlite_store import SqliteStore
+from myservers.storage.sqlite_store import ChangeToken, SqliteStore
 
 
 @dataclass
@@ -22,24 +23,37 @@ class TagStore:
 
     def __init__(self, backend: SqliteStore) -> None:
         self._backend = backend
-        self._conn = backend._conn
+        # list_tags() runs on every search refresh; reuse it until tags change.
+        self._tags_cache: tuple[ChangeToken, list[str]] | None = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._backend._conn
 
     # -------- tag metadata --------
 
     def list_tags(self) -> List[str]:
         """Return all distinct tag names."""
+        cached = self._tags_cache
+        if cached is not None and not self._backend.has_changed_since(cached[0]):
+            return list(cached[1])
+        token = self._backend.change_token(("tags",))
         cur = self._conn.cursor()
         cur.execute("SELECT name FROM tags ORDER BY name COLLATE NOCASE")
-        return [row["name"] for row in cur.fetchall()]
+        names = [row["name"] for row in cur.fetchall()]
+        self._tags_cache = (token, names)
+        return list(names)
 
     def get_server_tags(self, server_name: str) -> List[str]:
         """Return tags for a given server name."""
-        cur = self._conn.cursor()
-        cur.execute("SELECT id FROM servers WHERE name = ?", (server_name.strip(),))
-        srow = cur.fetchone()
-        if srow is None:
+        server_id = self._backend.server_id(server_name)
+        if server_id is None:
             return []
-        server_id = srow["id"]
+        return self.get_server_tags_by_id(server_id)
+
+    def get_server_tags_by_id(self, server_id: int) -> List[str]:
+        """Return tags for a given servers.id."""
+        cur = self._conn.cursor()
         cur.execute(
             """
             SELECT t.name
@@ -66,15 +80,16 @@ class TagStore:
         name = server_name.strip()
         if not name:
             return
+        server_id = self._backend.server_id(name)
+        if server_id is None:
+            return
+        self.set_server_tags_by_id(server_id, tags)
 
+    def set_server_tags_by_id(self, server_id: int, tags: list[str]) -> None:
+        """Replace tags for the given servers.id (same normalization as set_server_tags)."""
         normalized = sorted({t.strip().lower() for t in tags if t.strip()})
 
         cur = self._conn.cursor()
-        cur.execute("SELECT id FROM servers WHERE name = ?", (name,))
-        srow = cur.fetchone()
-        if srow is None:
-            return
-        server_id = srow["id"]
 
         # Resolve / create tag ids
         tag_ids: list[int] = []
@@ -96,7 +111,7 @@ class TagStore:
                 (server_id, tag_id),
             )
 
-        self._conn.commit()
+        self._backend.commit()
 
 
 def filter_servers(
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import sqlite3
 from dataclasses import dataclass
 from typing import List, Optional
 
@@ -19,15 +20,25 @@ class WebLinksStore:
 
     def __init__(self, backend: SqliteStore) -> None:
         self._backend = backend
-        self._conn = backend._conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._backend._conn
 
     def list_links(self, server_name: str) -> List[WebLink]:
-        cur = self._conn.cursor()
-        cur.execute("SELECT id FROM servers WHERE name = ?", (server_name.strip(),))
-        srow = cur.fetchone()
-        if srow is None:
+        server_id = self._backend.server_id(server_name)
+        if server_id is None:
             return []
-        server_id = srow["id"]
+        return self._list_links(server_id, server_name)
+
+    def list_links_by_id(self, server_id: int) -> List[WebLink]:
+        server_name = self._backend.server_name(server_id)
+        if server_name is None:
+            return []
+        return self._list_links(server_id, server_name)
+
+    def _list_links(self, server_id: int, server_name: str) -> List[WebLink]:
+        cur = self._conn.cursor()
         cur.execute(
             "SELECT id, label, url FROM web_links WHERE server_id = ? ORDER BY label",
             (server_id,),
@@ -38,17 +49,18 @@ class WebLinksStore:
         ]
 
     def create_link(self, server_name: str, label: str, url: str) -> int:
-        cur = self._conn.cursor()
-        cur.execute("SELECT id FROM servers WHERE name = ?", (server_name.strip(),))
-        srow = cur.fetchone()
-        if srow is None:
+        server_id = self._backend.server_id(server_name)
+        if server_id is None:
             raise ValueError("Server not found")
-        server_id = srow["id"]
+        return self.create_link_by_id(server_id, label, url)
+
+    def create_link_by_id(self, server_id: int, label: str, url: str) -> int:
+        cur = self._conn.cursor()
         cur.execute(
             "INSERT INTO web_links(server_id, label, url) VALUES (?, ?, ?)",
             (server_id, label.strip(), url.strip()),
         )
-        self._conn.commit()
+        self._backend.commit()
         return int(cur.lastrowid)
 
     def update_link(self, link_id: int, label: str, url: str) -> None:
@@ -57,9 +69,9 @@ class WebLinksStore:
             "UPDATE web_links SET label = ?, url = ? WHERE id = ?",
             (label.strip(), url.strip(), link_id),
         )
-        self._conn.commit()
+        self._backend.commit()
 
     def delete_link(self, link_id: int) -> None:
         cur = self._conn.cursor()
         cur.execute("DELETE FROM web_links WHERE id = ?", (link_id,))
-        self._conn.commit()
+        self._backend.commit()
@@ -0,0 +1,22 @@
+"""zlib helpers for large text columns (action run output)."""
+
+from __future__ import annotations
+
+import zlib
+
+# Level 6 is zlib's default speed/ratio trade-off; shell output compresses well at it.
+COMPRESSION_LEVEL = 6
+
+
+def compress_text(text: str | None) -> bytes | None:
+    """Compress text to a zlib blob; empty or missing text is stored as NULL."""
+    if not text:
+        return None
+    return zlib.compress(text.encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def decompress_text(blob: bytes | None) -> str:
+    """Inverse of compress_text (NULL -> "")."""
+    if not blob:
+        return ""
+    return zlib.decompress(blob).decode("utf-8")
@@ -0,0 +1,59 @@
+"""Compact log-scale latency histograms, stored as JSON {bucket: count}.
+
+Bucket b holds durations d with floor(4 * log2(d + 1)) == b, i.e. four buckets
+per doubling (~19% wide), so a few dozen integers cover 1 ms to hours.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from typing import Iterable
+
+_BUCKETS_PER_DOUBLING = 4
+
+
+def bucket_for(duration_ms: int) -> int:
+    return int(_BUCKETS_PER_DOUBLING * math.log2(max(0, duration_ms) + 1))
+
+
+def bucket_upper_ms(bucket: int) -> int:
+    """Largest duration that falls into bucket."""
+    return max(0, math.ceil(2 ** ((bucket + 1) / _BUCKETS_PER_DOUBLING) - 1) - 1)
+
+
+def add(histogram: dict[int, int], duration_ms: int, count: int = 1) -> None:
+    bucket = bucket_for(duration_ms)
+    histogram[bucket] = histogram.get(bucket, 0) + count
+
+
+def merge(histograms: Iterable[dict[int, int]]) -> dict[int, int]:
+    merged: dict[int, int] = {}
+    for histogram in histograms:
+        for bucket, count in histogram.items():
+            merged[bucket] = merged.get(bucket, 0) + count
+    return merged
+
+
+def percentile(histogram: dict[int, int], q: float) -> int | None:
+    """Estimate the q-th percentile (0-100) as the upper bound of its bucket."""
+    total = sum(histogram.values())
+    if total == 0:
+        return None
+    rank = max(1, math.ceil(total * q / 100))
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return bucket_upper_ms(bucket)
+    return bucket_upper_ms(max(histogram))
+
+
+def dumps(histogram: dict[int, int]) -> str:
+    return json.dumps({str(bucket): count for bucket, count in sorted(histogram.items())}, separators=(",", ":"))
+
+
+def loads(text: str | None) -> dict[int, int]:
+    if not text:
+        return {}
+    return {int(bucket): count for bucket, count in json.loads(text).items()}
@@ -0,0 +1,591 @@
+"""Schema migrations for SqliteStore, keyed on PRAGMA user_version.
+
+Each step moves the database from version N-1 to N and receives a cursor inside
+the migration transaction. Steps are append-only: never edit a released step,
+add a new one at the end of MIGRATIONS instead.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable
+
+from myservers.storage import histogram, output_blobs, run_output_index
+from myservers.storage.compression import compress_text, decompress_text
+
+
+@dataclass
+class MigrationTiming:
+    version: int
+    name: str
+    duration_ms: float
+
+
+# ---------- baseline schema ----------
+
+_BASELINE_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS servers (
+        id      INTEGER PRIMARY KEY AUTOINCREMENT,
+        name    TEXT UNIQUE NOT NULL,
+        notes   TEXT DEFAULT ''
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS hosts (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        server_id  INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
+        kind       TEXT NOT NULL,       -- 'internal' or 'external'
+        priority   INTEGER NOT NULL,    -- 1 or 2 (primary/secondary)
+        address    TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tags (
+        id    INTEGER PRIMARY KEY AUTOINCREMENT,
+        name  TEXT UNIQUE NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS server_tags (
+        server_id  INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
+        tag_id     INTEGER NOT NULL REFERENCES tags(id) ON DELETE CASCADE,
+        PRIMARY KEY (server_id, tag_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS identities (
+        id       INTEGER PRIMARY KEY AUTOINCREMENT,
+        name     TEXT UNIQUE NOT NULL,
+        username TEXT,
+        kind     TEXT NOT NULL CHECK (kind IN ('ssh_key_path','password','token')),
+        key_path TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ssh_profiles (
+        server_id        INTEGER PRIMARY KEY REFERENCES servers(id) ON DELETE CASCADE,
+        port             INTEGER NOT NULL DEFAULT 22,
+        identity_id      INTEGER REFERENCES identities(id) ON DELETE SET NULL,
+        username_override TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS web_links (
+        id         INTEGER PRIMARY KEY AUTOINCREMENT,
+        server_id  INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
+        label      TEXT NOT NULL,
+        url        TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS actions (
+        id               INTEGER PRIMARY KEY AUTOINCREMENT,
+        name             TEXT UNIQUE NOT NULL,
+        description      TEXT,
+        command_template TEXT NOT NULL,
+        requires_confirm INTEGER NOT NULL DEFAULT 1,
+        execution_target TEXT NOT NULL DEFAULT 'local' CHECK (execution_target IN ('local','ssh'))
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS action_runs (
+        id              INTEGER PRIMARY KEY AUTOINCREMENT,
+        action_id       INTEGER NOT NULL REFERENCES actions(id) ON DELETE CASCADE,
+        server_id       INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
+        started_at      TEXT,
+        finished_at     TEXT,
+        status          TEXT,
+        exit_code       INTEGER,
+        duration_ms     INTEGER,
+        command_rendered TEXT,
+        stdout          TEXT,
+        stderr          TEXT
+    )
+    """,
+)
+
+
+def _columns(cur: sqlite3.Cursor, table: str) -> set[str]:
+    cur.execute(f"PRAGMA table_info({table})")
+    return {row[1] for row in cur.fetchall()}
+
+
+def _m001_baseline(cur: sqlite3.Cursor) -> None:
+    """Create the base tables; bring pre-versioning databases up to the same shape."""
+    for statement in _BASELINE_TABLES:
+        cur.execute(statement)
+    if "key_path" not in _columns(cur, "identities"):
+        cur.execute("ALTER TABLE identities ADD COLUMN key_path TEXT")
+    if "execution_target" not in _columns(cur, "actions"):
+        cur.execute("ALTER TABLE actions ADD COLUMN execution_target TEXT NOT NULL DEFAULT 'local'")
+
+
+def _m002_actions_target_check(cur: sqlite3.Cursor) -> None:
+    """Rebuild actions tables that were migrated without the execution_target CHECK."""
+    cur.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='actions'")
+    row = cur.fetchone()
+    if row is None or "CHECK (execution_target" in row[0]:
+        return
+    cur.execute(
+        """
+        CREATE TABLE actions_rebuild (
+            id               INTEGER PRIMARY KEY AUTOINCREMENT,
+            name             TEXT UNIQUE NOT NULL,
+            description      TEXT,
+            command_template TEXT NOT NULL,
+            requires_confirm INTEGER NOT NULL DEFAULT 1,
+            execution_target TEXT NOT NULL DEFAULT 'local' CHECK (execution_target IN ('local','ssh'))
+        )
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO actions_rebuild(id, name, description, command_template, requires_confirm, execution_target)
+        SELECT id, name, description, command_template, requires_confirm,
+               CASE WHEN execution_target IN ('local','ssh') THEN execution_target ELSE 'local' END
+        FROM actions
+        """
+    )
+    cur.execute("DROP TABLE actions")
+    cur.execute("ALTER TABLE actions_rebuild RENAME TO actions")
+
+
+# ---------- indexes ----------
+
+# Secondary indexes: (name, table(columns)).
+INDEXES: tuple[tuple[str, str], ...] = (
+    # covers SqliteStore._load_hosts (server_id -> kind, priority, address)
+    ("idx_hosts_server", "hosts(server_id, kind, priority, address)"),
+    ("idx_web_links_server", "web_links(server_id, label)"),
+    ("idx_server_tags_tag", "server_tags(tag_id)"),
+    ("idx_ssh_profiles_identity", "ssh_profiles(identity_id)"),
+    ("idx_action_runs_started", "action_runs(started_at)"),
+    ("idx_action_runs_server_started", "action_runs(server_id, started_at)"),
+    ("idx_action_runs_action_started", "action_runs(action_id, started_at)"),
+)
+
+
+def _m003_indexes(cur: sqlite3.Cursor) -> None:
+    for name, target in INDEXES:
+        cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+# ---------- server search ----------
+
+# Full-text index over everything the server list search matches on. Rows are keyed by
+# servers.id and rebuilt by triggers whenever a server, its hosts or its tags change.
+# The trigram tokenizer gives case-insensitive substring matching (queries of 3+ chars).
+_SERVER_SEARCH_TABLE = """
+CREATE VIRTUAL TABLE server_search USING fts5(name, notes, hosts, tags, tokenize = 'trigram')
+"""
+
+# Builds server_search rows (rowid, name, notes, hosts, tags); callers append a WHERE clause.
+_SERVER_SEARCH_ROWS = """
+    INSERT INTO server_search(rowid, name, notes, hosts, tags)
+    SELECT s.id,
+           s.name,
+           COALESCE(s.notes, ''),
+           COALESCE((SELECT group_concat(h.address, ' ') FROM hosts h WHERE h.server_id = s.id), ''),
+           COALESCE((SELECT group_concat(t.name, ' ')
+                     FROM server_tags st JOIN tags t ON t.id = st.tag_id
+                     WHERE st.server_id = s.id), '')
+    FROM servers s
+"""
+
+
+def _server_search_refresh(server_id: str) -> str:
+    return f"""
+    DELETE FROM server_search WHERE rowid = {server_id};
+    {_SERVER_SEARCH_ROWS} WHERE s.id = {server_id};
+    """
+
+
+_SERVER_SEARCH_TRIGGERS = (
+    f"""
+    CREATE TRIGGER server_search_servers_ai AFTER INSERT ON servers BEGIN
+        {_server_search_refresh("NEW.id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER server_search_servers_au AFTER UPDATE ON servers BEGIN
+        DELETE FROM server_search WHERE rowid = OLD.id;
+        {_server_search_refresh("NEW.id")}
+    END
+    """,
+    """
+    CREATE TRIGGER server_search_servers_ad AFTER DELETE ON servers BEGIN
+        DELETE FROM server_search WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER server_search_hosts_ai AFTER INSERT ON hosts BEGIN
+        {_server_search_refresh("NEW.server_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER server_search_hosts_au AFTER UPDATE ON hosts BEGIN
+        {_server_search_refresh("OLD.server_id")}
+        {_server_search_refresh("NEW.server_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER server_search_hosts_ad AFTER DELETE ON hosts BEGIN
+        {_server_search_refresh("OLD.server_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER server_search_server_tags_ai AFTER INSERT ON server_tags BEGIN
+        {_server_search_refresh("NEW.server_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER server_search_server_tags_ad AFTER DELETE ON server_tags BEGIN
+        {_server_search_refresh("OLD.server_id")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER server_search_tags_au AFTER UPDATE OF name ON tags BEGIN
+        DELETE FROM server_search
+        WHERE rowid IN (SELECT server_id FROM server_tags WHERE tag_id = NEW.id);
+        {_SERVER_SEARCH_ROWS} WHERE s.id IN (SELECT server_id FROM server_tags WHERE tag_id = NEW.id);
+    END
+    """,
+)
+
+
+def _m004_server_search(cur: sqlite3.Cursor) -> None:
+    """Create and backfill the server_search FTS5 index.
+
+    Skipped when SQLite is built without FTS5; search then uses its LIKE fallback.
+    """
+    cur.execute("SAVEPOINT fts_probe")
+    try:
+        cur.execute(_SERVER_SEARCH_TABLE)
+    except sqlite3.OperationalError:
+        cur.execute("ROLLBACK TO fts_probe")
+        cur.execute("RELEASE fts_probe")
+        return
+    cur.execute("RELEASE fts_probe")
+    for statement in _SERVER_SEARCH_TRIGGERS:
+        cur.execute(statement)
+    cur.execute(_SERVER_SEARCH_ROWS)
+
+
+# ---------- change counters ----------
+
+# Tables whose writes bump change_counters; lets caches detect changes made by
+# other connections or processes (see SqliteStore.has_changed_since).
+TRACKED_TABLES = (
+    "servers",
+    "hosts",
+    "tags",
+    "server_tags",
+    "identities",
+    "ssh_profiles",
+    "web_links",
+    "actions",
+)
+
+
+def _m005_change_counters(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS change_counters (
+            table_name TEXT PRIMARY KEY,
+            version    INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """
+    )
+    for table in TRACKED_TABLES:
+        cur.execute("INSERT OR IGNORE INTO change_counters(table_name, version) VALUES (?, 0)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cur.execute(
+                f"""
+                CREATE TRIGGER IF NOT EXISTS change_counters_{table}_{event.lower()} AFTER {event} ON {table} BEGIN
+                    UPDATE change_counters SET version = version + 1 WHERE table_name = '{table}';
+                END
+                """
+            )
+
+
+# ---------- run output ----------
+
+_RUN_OUTPUT_BATCH = 500
+
+
+def _m006_run_output(cur: sqlite3.Cursor) -> None:
+    """Move command/stdout/stderr out of action_runs into compressed blobs.
+
+    The inline columns stay (SQLite cannot drop them on older versions) but are
+    left NULL from now on, so history scans only touch the small metadata rows.
+    """
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS action_run_output (
+            run_id           INTEGER PRIMARY KEY REFERENCES action_runs(id) ON DELETE CASCADE,
+            command_rendered BLOB,
+            stdout           BLOB,
+            stderr           BLOB
+        )
+        """
+    )
+    last_id = 0
+    while True:
+        cur.execute(
+            """
+            SELECT id, command_rendered, stdout, stderr FROM action_runs
+            WHERE id > ? AND (command_rendered IS NOT NULL OR stdout IS NOT NULL OR stderr IS NOT NULL)
+            ORDER BY id LIMIT ?
+            """,
+            (last_id, _RUN_OUTPUT_BATCH),
+        )
+        rows = cur.fetchall()
+        if not rows:
+            break
+        cur.executemany(
+            "INSERT OR IGNORE INTO action_run_output(run_id, command_rendered, stdout, stderr) VALUES (?, ?, ?, ?)",
+            [(row[0], compress_text(row[1]), compress_text(row[2]), compress_text(row[3])) for row in rows],
+        )
+        cur.executemany(
+            "UPDATE action_runs SET command_rendered = NULL, stdout = NULL, stderr = NULL WHERE id = ?",
+            [(row[0],) for row in rows],
+        )
+        last_id = rows[-1][0]
+
+
+# ---------- run statistics ----------
+
+def _m007_run_stats(cur: sqlite3.Cursor) -> None:
+    """Daily rollups per action and server; backfilled from existing runs (dry runs excluded)."""
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS action_run_stats (
+            action_id       INTEGER NOT NULL REFERENCES actions(id) ON DELETE CASCADE,
+            server_id       INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
+            day             TEXT NOT NULL,      -- UTC date, YYYY-MM-DD
+            runs            INTEGER NOT NULL DEFAULT 0,
+            successes       INTEGER NOT NULL DEFAULT 0,
+            failures        INTEGER NOT NULL DEFAULT 0,
+            total_ms        INTEGER NOT NULL DEFAULT 0,
+            max_ms          INTEGER NOT NULL DEFAULT 0,
+            last_failure_at TEXT,
+            histogram       TEXT NOT NULL DEFAULT '{}',  -- see storage.histogram
+            PRIMARY KEY (action_id, server_id, day)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_action_run_stats_server ON action_run_stats(server_id, day)")
+    cur.execute("SELECT 1 FROM action_run_stats LIMIT 1")
+    if cur.fetchone() is not None:
+        return
+    cur.execute(
+        """
+        SELECT action_id, server_id, substr(started_at, 1, 10) AS day,
+               COUNT(*), SUM(status = 'success'), SUM(status = 'error'),
+               SUM(COALESCE(duration_ms, 0)), MAX(COALESCE(duration_ms, 0)),
+               MAX(CASE WHEN status = 'error' THEN started_at END)
+        FROM action_runs
+        WHERE started_at IS NOT NULL AND COALESCE(status, '') != 'dry_run'
+        GROUP BY action_id, server_id, day
+        """
+    )
+    rollups = cur.fetchall()
+    cur.execute(
+        """
+        SELECT action_id, server_id, substr(started_at, 1, 10), COALESCE(duration_ms, 0), COUNT(*)
+        FROM action_runs
+        WHERE started_at IS NOT NULL AND COALESCE(status, '') != 'dry_run'
+        GROUP BY 1, 2, 3, 4
+        """
+    )
+    histograms: dict[tuple, dict[int, int]] = {}
+    for action_id, server_id, day, duration_ms, count in cur.fetchall():
+        histogram.add(histograms.setdefault((action_id, server_id, day), {}), duration_ms, count)
+    cur.executemany(
+        """
+        INSERT INTO action_run_stats(action_id, server_id, day, runs, successes, failures,
+                                     total_ms, max_ms, last_failure_at, histogram)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [(*row, histogram.dumps(histograms.get(tuple(row[:3]), {}))) for row in rollups],
+    )
+
+
+# ---------- run output search ----------
+
+
+def _m008_run_output_search(cur: sqlite3.Cursor) -> None:
+    """Create and backfill the run_output_search FTS5 index (skipped without FTS5)."""
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (run_output_index.TABLE,))
+    if cur.fetchone() is not None:
+        return
+    cur.execute("SAVEPOINT fts_probe")
+    try:
+        cur.execute(run_output_index.CREATE_TABLE)
+    except sqlite3.OperationalError:
+        cur.execute("ROLLBACK TO fts_probe")
+        cur.execute("RELEASE fts_probe")
+        return
+    cur.execute("RELEASE fts_probe")
+    last_id = 0
+    while True:
+        cur.execute(
+            "SELECT run_id, stdout, stderr FROM action_run_output WHERE run_id > ? ORDER BY run_id LIMIT ?",
+            (last_id, _RUN_OUTPUT_BATCH),
+        )
+        rows = cur.fetchall()
+        if not rows:
+            break
+        for run_id, stdout, stderr in rows:
+            run_output_index.index_output(cur, run_id, decompress_text(stdout), decompress_text(stderr))
+        last_id = rows[-1][0]
+
+
+# ---------- output deduplication ----------
+
+_OUTPUT_BLOB_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS output_blobs_ref_ai AFTER INSERT ON action_run_output BEGIN
+        UPDATE output_blobs SET refcount = refcount + 1
+        WHERE id IN (NEW.command_id, NEW.stdout_id, NEW.stderr_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS output_blobs_ref_ad AFTER DELETE ON action_run_output BEGIN
+        UPDATE output_blobs SET refcount = refcount - 1
+        WHERE id IN (OLD.command_id, OLD.stdout_id, OLD.stderr_id);
+        DELETE FROM output_blobs
+        WHERE id IN (OLD.command_id, OLD.stdout_id, OLD.stderr_id) AND refcount <= 0;
+    END
+    """,
+)
+
+
+def _m009_output_blobs(cur: sqlite3.Cursor) -> None:
+    """Store each distinct output once: action_run_output now references output_blobs."""
+    if "stdout" not in _columns(cur, "action_run_output"):
+        return
+    cur.execute(
+        """
+        CREATE TABLE output_blobs (
+            id       INTEGER PRIMARY KEY,
+            hash     BLOB NOT NULL UNIQUE,   -- sha256 of the uncompressed UTF-8 text
+            data     BLOB NOT NULL,          -- zlib
+            size     INTEGER NOT NULL,       -- uncompressed bytes
+            refcount INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE action_run_output_refs (
+            run_id     INTEGER PRIMARY KEY REFERENCES action_runs(id) ON DELETE CASCADE,
+            command_id INTEGER REFERENCES output_blobs(id),
+            stdout_id  INTEGER REFERENCES output_blobs(id),
+            stderr_id  INTEGER REFERENCES output_blobs(id)
+        )
+        """
+    )
+    refcounts: dict[int, int] = {}
+    last_id = 0
+    while True:
+        cur.execute(
+            """
+            SELECT run_id, command_rendered, stdout, stderr FROM action_run_output
+            WHERE run_id > ? ORDER BY run_id LIMIT ?
+            """,
+            (last_id, _RUN_OUTPUT_BATCH),
+        )
+        rows = cur.fetchall()
+        if not rows:
+            break
+        refs = []
+        for run_id, *blobs in rows:
+            ids = []
+            for blob in blobs:
+                text = decompress_text(blob)
+                ids.append(output_blobs.store(cur, text, data=blob) if text else None)
+            refs.append((run_id, *ids))
+            # one reference per run, as the triggers count them
+            for blob_id in {i for i in ids if i is not None}:
+                refcounts[blob_id] = refcounts.get(blob_id, 0) + 1
+        cur.executemany(
+            "INSERT INTO action_run_output_refs(run_id, command_id, stdout_id, stderr_id) VALUES (?, ?, ?, ?)",
+            refs,
+        )
+        last_id = rows[-1][0]
+    cur.execute("DROP TABLE action_run_output")
+    cur.execute("ALTER TABLE action_run_output_refs RENAME TO action_run_output")
+    cur.executemany("UPDATE output_blobs SET refcount = ? WHERE id = ?", [(n, i) for i, n in refcounts.items()])
+    for statement in _OUTPUT_BLOB_TRIGGERS:
+        cur.execute(statement)
+
+
+def _m010_live_runs(cur: sqlite3.Cursor) -> None:
+    """Output chunks of runs in progress, and output refs that can be filled in later.
+
+    A run is inserted as 'running' when it starts; its output is appended to
+    action_run_chunks while it executes and moved into output_blobs when it
+    finishes, so action_run_output is now updated in place.
+    """
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS action_run_chunks (
+            run_id     INTEGER NOT NULL REFERENCES action_runs(id) ON DELETE CASCADE,
+            seq        INTEGER NOT NULL,
+            stream     TEXT NOT NULL CHECK (stream IN ('stdout', 'stderr')),
+            data       TEXT NOT NULL,
+            written_at TEXT NOT NULL,
+            PRIMARY KEY (run_id, seq)
+        ) WITHOUT ROWID
+        """
+    )
+    # Startup recovery looks for runs left 'running'; there are only ever a few.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_action_runs_running ON action_runs(id) WHERE status = 'running'")
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS output_blobs_ref_au
+        AFTER UPDATE OF command_id, stdout_id, stderr_id ON action_run_output BEGIN
+            UPDATE output_blobs SET refcount = refcount + 1
+            WHERE id IN (NEW.command_id, NEW.stdout_id, NEW.stderr_id);
+            UPDATE output_blobs SET refcount = refcount - 1
+            WHERE id IN (OLD.command_id, OLD.stdout_id, OLD.stderr_id);
+            DELETE FROM output_blobs
+            WHERE id IN (OLD.command_id, OLD.stdout_id, OLD.stderr_id) AND refcount <= 0;
+        END
+        """
+    )
+
+
+def _m011_run_queue_wait(cur: sqlite3.Cursor) -> None:
+    """Time each run waited for an execution slot (core.scheduler) before it started."""
+    if "queue_wait_ms" not in _columns(cur, "action_runs"):
+        cur.execute("ALTER TABLE action_runs ADD COLUMN queue_wait_ms INTEGER")
+
+
+def _m012_run_host(cur: sqlite3.Cursor) -> None:
+    """Address that served each SSH run, which may differ from the server's first host after a failover."""
+    if "host" not in _columns(cur, "action_runs"):
+        cur.execute("ALTER TABLE action_runs ADD COLUMN host TEXT")
+
+
+# ---------- registry ----------
+
+MIGRATIONS: tuple[tuple[int, str, Callable[[sqlite3.Cursor], None]], ...] = (
+    (1, "baseline", _m001_baseline),
+    (2, "actions_target_check", _m002_actions_target_check),
+    (3, "indexes", _m003_indexes),
+    (4, "server_search", _m004_server_search),
+    (5, "change_counters", _m005_change_counters),
+    (6, "run_output", _m006_run_output),
+    (7, "run_stats", _m007_run_stats),
+    (8, "run_output_search", _m008_run_output_search),
+    (9, "output_blobs", _m009_output_blobs),
+    (10, "live_runs", _m010_live_runs),
+    (11, "run_queue_wait", _m011_run_queue_wait),
+    (12, "run_host", _m012_run_host),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
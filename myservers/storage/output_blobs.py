@@ -0,0 +1,46 @@
+"""Content-addressed storage for run output.
+
+Each distinct text (command, stdout or stderr) is stored once in output_blobs,
+keyed by the SHA-256 of its UTF-8 bytes and zlib-compressed. action_run_output
+rows reference blobs by id; triggers keep output_blobs.refcount equal to the
+number of referencing runs and delete blobs that drop to zero.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+
+from myservers.storage.compression import compress_text
+
+# Joins the three output blobs of `o` (an action_run_output alias) ...
+JOINS = """
+    LEFT JOIN output_blobs bc ON bc.id = o.command_id
+    LEFT JOIN output_blobs bo ON bo.id = o.stdout_id
+    LEFT JOIN output_blobs be ON be.id = o.stderr_id
+"""
+# ... and selects their compressed data (decompress with compression.decompress_text).
+COLUMNS = "bc.data AS command_blob, bo.data AS stdout_blob, be.data AS stderr_blob"
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+def store(cur: sqlite3.Cursor, text: str | None, digest: bytes | None = None, data: bytes | None = None) -> int | None:
+    """Return the blob id for text, inserting it if it is new; None for empty text.
+
+    digest/data may be passed when already known (e.g. migrating compressed rows).
+    """
+    if not text:
+        return None
+    digest = digest or content_hash(text)
+    cur.execute("SELECT id FROM output_blobs WHERE hash = ?", (digest,))
+    row = cur.fetchone()
+    if row is not None:
+        return int(row[0])
+    cur.execute(
+        "INSERT INTO output_blobs(hash, data, size) VALUES (?, ?, ?)",
+        (digest, data if data is not None else compress_text(text), len(text.encode("utf-8"))),
+    )
+    return int(cur.lastrowid)
@@ -0,0 +1,77 @@
+"""Full-text index over action run output (stdout/stderr).
+
+run_output_search is a contentless FTS5 table keyed by action_runs.id: it
+stores only the index, the text itself stays compressed in output_blobs.
+Contentless tables cannot be updated from triggers here (the text is zlib
+data), so rows are indexed by ActionsStore._insert_run and removed by
+retention; runs deleted any other way (e.g. cascades from deleting a server)
+leave stale entries that searches drop by joining to action_runs.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Sequence
+
+from myservers.storage.compression import decompress_text
+
+TABLE = "run_output_search"
+
+CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE {TABLE} USING fts5(stdout, stderr, content = '')
+"""
+
+
+def index_output(cur: sqlite3.Cursor, run_id: int, stdout: str, stderr: str) -> None:
+    if not stdout and not stderr:
+        return
+    cur.execute(f"INSERT INTO {TABLE}(rowid, stdout, stderr) VALUES (?, ?, ?)", (run_id, stdout, stderr))
+
+
+def unindex_runs(cur: sqlite3.Cursor, run_ids: Sequence[int]) -> None:
+    """Remove runs from the index; must run before their output rows are deleted."""
+    if not run_ids:
+        return
+    placeholders = ", ".join("?" for _ in run_ids)
+    cur.execute(
+        f"""
+        SELECT o.run_id, bo.data, be.data
+        FROM action_run_output o
+        LEFT JOIN output_blobs bo ON bo.id = o.stdout_id
+        LEFT JOIN output_blobs be ON be.id = o.stderr_id
+        WHERE o.run_id IN ({placeholders})
+        """,
+        tuple(run_ids),
+    )
+    rows = [(row[0], decompress_text(row[1]), decompress_text(row[2])) for row in cur.fetchall()]
+    # A contentless delete needs the exact values that were indexed.
+    cur.executemany(
+        f"INSERT INTO {TABLE}({TABLE}, rowid, stdout, stderr) VALUES ('delete', ?, ?, ?)",
+        [row for row in rows if row[1] or row[2]],
+    )
+
+
+def optimize(cur: sqlite3.Cursor) -> None:
+    """Merge index segments, dropping entries of unindexed runs (frees their pages)."""
+    cur.execute(f"INSERT INTO {TABLE}({TABLE}) VALUES ('optimize')")
+
+
+def match_query(text: str) -> str:
+    """Quote user input as a single FTS5 phrase."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def snippet(text: str, query: str, width: int = 60) -> str:
+    """Text around the first case-insensitive occurrence of query (or its first word)."""
+    lowered = text.lower()
+    pos = lowered.find(query.lower())
+    length = len(query)
+    if pos < 0:
+        words = query.split()
+        pos = lowered.find(words[0].lower()) if words else -1
+        length = len(words[0]) if words else 0
+    if pos < 0:
+        return " ".join(text[: 2 * width].split())
+    start = max(0, pos - width)
+    end = min(len(text), pos + length + width)
+    return ("..." if start else "") + " ".join(text[start:end].split()) + ("..." if end < len(text) else "")
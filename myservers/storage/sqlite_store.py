@@ -1,181 +1,435 @@
 """SQLite-backed storage for servers and hosts.
 
 Implements the same minimal API as JsonStore: get/set/delete on sections.
-Only the "Servers" section is supported.
+Only the "Servers" section is supported. A typed API (list_servers, get_server,
+upsert_server, delete_server) skips the legacy dict shape.
 """
 
 from __future__ import annotations
 
 import json
 import sqlite3
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterable, Iterator
+
+from myservers.core.models import HostSet, Server
+from myservers.storage.migrations import MIGRATIONS, SCHEMA_VERSION, TRACKED_TABLES, MigrationTiming
+
+
+# hosts (kind, priority) -> HostSet field
+_HOST_FIELDS: dict[tuple[str, int], str] = {
+    ("internal", 1): "internal_primary",
+    ("internal", 2): "internal_secondary",
+    ("external", 1): "external_primary",
+    ("external", 2): "external_secondary",
+}
+
+
+def _server_to_payload(server: Server) -> dict[str, Any]:
+    """Legacy JsonStore shape: {"Hosts": {"Internal_Primary": ...}, "Notes": ...}."""
+    return {
+        "Hosts": {
+            "Internal_Primary": server.hosts.internal_primary,
+            "Internal_Secondary": server.hosts.internal_secondary,
+            "External_Primary": server.hosts.external_primary,
+            "External_Secondary": server.hosts.external_secondary,
+        },
+        "Notes": server.notes,
+    }
+
+
+def _server_from_payload(name: str, payload: dict) -> Server:
+    hosts_raw = (payload or {}).get("Hosts", {}) or {}
+    hosts = HostSet(
+        internal_primary=hosts_raw.get("Internal_Primary", "") or "",
+        internal_secondary=hosts_raw.get("Internal_Secondary", "") or "",
+        external_primary=hosts_raw.get("External_Primary", "") or "",
+        external_secondary=hosts_raw.get("External_Secondary", "") or "",
+    )
+    return Server(name=name, hosts=hosts, notes=(payload or {}).get("Notes", "") or "")
+
+
+# Applied to every connection handed out by the pool.
+# WAL lets readers proceed while a writer commits; NORMAL sync is durable in WAL mode
+# except for the last transactions on power loss.
+_CONNECTION_PRAGMAS = (
+    # Must precede journal_mode so it lands in a brand-new file's header; existing
+    # databases pick it up on their next full VACUUM (see core.retention).
+    "PRAGMA auto_vacuum = INCREMENTAL",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",  # KiB, i.e. ~16 MB page cache per connection
+    "PRAGMA mmap_size = 67108864",  # 64 MB
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+)
+
+# SQLite's auto_vacuum values
+_AUTO_VACUUM_INCREMENTAL = 2
+
+BUSY_TIMEOUT_MS = 5000
+
+# Minimum query length the trigram tokenizer can match; shorter queries use LIKE.
+_FTS_MIN_QUERY = 3
+
+
+@dataclass(frozen=True)
+class ChangeToken:
+    """Snapshot of the database state for has_changed_since()."""
+
+    connection_id: int
+    data_version: int
+    local_writes: int
+    counters: tuple[tuple[str, int], ...]
+
+
+class _ConnectionPool:
+    """Hands out one connection per thread and recycles them when threads exit.
+
+    Connections are opened with check_same_thread=False so that a connection
+    released by a finished thread can be reused by the next one.
+    """
+
+    def __init__(self, path: Path, max_idle: int = 4) -> None:
+        self._path = path
+        self._max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle: list[sqlite3.Connection] = []
+        self._all: list[sqlite3.Connection] = []
+        self._local = threading.local()
+        self._closed = False
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, acquiring one if needed."""
+        holder = getattr(self._local, "holder", None)
+        if holder is not None:
+            return holder.conn
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Cannot operate on a closed SqliteStore")
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._open()
+            with self._lock:
+                self._all.append(conn)
+        holder = _ConnectionHolder(conn)
+        # Return the connection to the pool once the owning thread's locals are gone.
+        weakref.finalize(holder, self._release, conn)
+        self._local.holder = holder
+        return conn
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            if conn.in_transaction:
+                conn.rollback()
+            if len(self._idle) < self._max_idle:
+                self._idle.append(conn)
+                return
+            self._all.remove(conn)
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            conns, self._all, self._idle = self._all, [], []
+        for conn in conns:
+            conn.close()
+
+
+class _ConnectionHolder:
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
 
 
 class SqliteStore:
-    """Relational storage for servers and their hosts."""
+    """Relational storage for servers and their hosts.
+
+    Each thread gets its own connection (WAL mode), so background workers and
+    the UI thread can read and write concurrently.
+    """
 
     def __init__(self, db_path: Path | str, json_migration_path: Path | str | None = None) -> None:
         self._path = Path(db_path)
         self._path.parent.mkdir(parents=True, exist_ok=True)
         should_init = not self._path.exists()
-        self._conn = sqlite3.connect(self._path)
-        self._conn.row_factory = sqlite3.Row
-        if should_init:
-            self._init_schema()
-            if json_migration_path is not None and Path(json_migration_path).exists():
-                self._migrate_from_json(Path(json_migration_path))
+        self._pool = _ConnectionPool(self._path)
+        self._tx_local = threading.local()
+        # Optional tables (FTS5 indexes may be missing when SQLite lacks FTS5).
+        self._tables_present: dict[str, bool] = {}
+        self.migration_timings: list[MigrationTiming] = []
+        # servers.name <-> servers.id, shared by every store on this backend
+        self._ids_lock = threading.Lock()
+        self._server_ids: dict[str, int] = {}
+        self._server_names: dict[int, str] = {}
+        # change_counters' servers version the map is valid for, and per thread
+        # the (data_version, local writes) it last checked that version at
+        self._ids_version: int | None = None
+        self._ids_local = threading.local()
+        # Bumped on every commit made through this store (data_version ignores a
+        # connection's own writes).
+        self._local_writes = 0
+        self._apply_migrations()
+        if should_init and json_migration_path is not None and Path(json_migration_path).exists():
+            self._migrate_from_json(Path(json_migration_path))
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Connection owned by the calling thread."""
+        return self._pool.connection()
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        self._pool.close()
+
+    # ---------- transactions ----------
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block of writes as one unit of work on the calling thread.
+
+        The outermost block opens an IMMEDIATE transaction and commits once on
+        exit; nested blocks use savepoints, so an exception only rolls back the
+        innermost block it escapes from. While a transaction is open, commit()
+        calls made by the stores are deferred to the outermost block.
+        """
+        conn = self._conn
+        depth = getattr(self._tx_local, "depth", 0)
+        savepoint = f"sp_{depth}"
+        if depth == 0:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute("BEGIN IMMEDIATE")
+            self._tx_local.serial = getattr(self._tx_local, "serial", 0) + 1
         else:
-            self._migrate_schema()
-
-    # ---------- schema & migration ----------
-
-    def _init_schema(self) -> None:
-        cur = self._conn.cursor()
-        cur.executescript(
-            """
-            PRAGMA foreign_keys = ON;
-
-            CREATE TABLE IF NOT EXISTS servers (
-                id      INTEGER PRIMARY KEY AUTOINCREMENT,
-                name    TEXT UNIQUE NOT NULL,
-                notes   TEXT DEFAULT ''
-            );
-
-            CREATE TABLE IF NOT EXISTS hosts (
-                id         INTEGER PRIMARY KEY AUTOINCREMENT,
-                server_id  INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
-                kind       TEXT NOT NULL,       -- 'internal' or 'external'
-                priority   INTEGER NOT NULL,    -- 1 or 2 (primary/secondary)
-                address    TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS tags (
-                id    INTEGER PRIMARY KEY AUTOINCREMENT,
-                name  TEXT UNIQUE NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS server_tags (
-                server_id  INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
-                tag_id     INTEGER NOT NULL REFERENCES tags(id) ON DELETE CASCADE,
-                PRIMARY KEY (server_id, tag_id)
-            );
-
-            CREATE TABLE IF NOT EXISTS identities (
-                id       INTEGER PRIMARY KEY AUTOINCREMENT,
-                name     TEXT UNIQUE NOT NULL,
-                username TEXT,
-                kind     TEXT NOT NULL CHECK (kind IN ('ssh_key_path','password','token')),
-                key_path TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS ssh_profiles (
-                server_id        INTEGER PRIMARY KEY REFERENCES servers(id) ON DELETE CASCADE,
-                port             INTEGER NOT NULL DEFAULT 22,
-                identity_id      INTEGER REFERENCES identities(id) ON DELETE SET NULL,
-                username_override TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS web_links (
-                id         INTEGER PRIMARY KEY AUTOINCREMENT,
-                server_id  INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
-                label      TEXT NOT NULL,
-                url        TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS actions (
-                id               INTEGER PRIMARY KEY AUTOINCREMENT,
-                name             TEXT UNIQUE NOT NULL,
-                description      TEXT,
-                command_template TEXT NOT NULL,
-                requires_confirm INTEGER NOT NULL DEFAULT 1,
-                execution_target TEXT NOT NULL DEFAULT 'local' CHECK (execution_target IN ('local','ssh'))
-            );
-
-            CREATE TABLE IF NOT EXISTS action_runs (
-                id              INTEGER PRIMARY KEY AUTOINCREMENT,
-                action_id       INTEGER NOT NULL REFERENCES actions(id) ON DELETE CASCADE,
-                server_id       INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
-                started_at      TEXT,
-                finished_at     TEXT,
-                status          TEXT,
-                exit_code       INTEGER,
-                duration_ms     INTEGER,
-                command_rendered TEXT,
-                stdout          TEXT,
-                stderr          TEXT
-            );
-            """
+            conn.execute(f"SAVEPOINT {savepoint}")
+        self._tx_local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            self._tx_local.depth = depth
+            # Ids cached inside the rolled-back block may no longer exist.
+            self._invalidate_server_ids()
+            if depth == 0:
+                conn.rollback()
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            raise
+        self._tx_local.depth = depth
+        if depth == 0:
+            conn.commit()
+            self._local_writes += 1
+        else:
+            conn.execute(f"RELEASE {savepoint}")
+
+    def in_transaction(self) -> bool:
+        """True while the calling thread is inside transaction()."""
+        return getattr(self._tx_local, "depth", 0) > 0
+
+    def commit(self) -> None:
+        """Commit the calling thread's pending writes unless a transaction() is open."""
+        if not self.in_transaction():
+            self._conn.commit()
+            self._local_writes += 1
+
+    # ---------- maintenance ----------
+
+    def database_size(self) -> int:
+        """Size of the database in bytes (page_count * page_size)."""
+        conn = self._conn
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return page_count * page_size
+
+    def compact(self, *, full: bool = False) -> None:
+        """Return free pages to the filesystem and truncate the WAL.
+
+        Uses incremental_vacuum; full=True runs VACUUM instead, which also
+        converts databases created before auto_vacuum was enabled. Neither can
+        run inside a transaction, so this raises sqlite3.ProgrammingError when
+        the calling thread has one open (it never commits the caller's writes).
+        """
+        conn = self._conn
+        if self.in_transaction() or conn.in_transaction:
+            raise sqlite3.ProgrammingError("Cannot compact the database inside a transaction")
+        if full:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        elif conn.execute("PRAGMA auto_vacuum").fetchone()[0] == _AUTO_VACUUM_INCREMENTAL:
+            # executescript steps the pragma to completion; execute() frees a single page.
+            conn.executescript("PRAGMA incremental_vacuum;")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+    # ---------- change detection ----------
+
+    def change_token(self, tables: Iterable[str] = TRACKED_TABLES) -> ChangeToken:
+        """Capture the current state of the given tables (see has_changed_since)."""
+        conn = self._conn
+        return ChangeToken(
+            connection_id=id(conn),
+            data_version=conn.execute("PRAGMA data_version").fetchone()[0],
+            local_writes=self._local_writes,
+            counters=self._read_counters(tuple(tables)),
         )
-        self._conn.commit()
 
-    def _migrate_schema(self) -> None:
-        """Add new columns/tables to existing databases."""
+    def has_changed_since(self, token: ChangeToken, *, external_only: bool = False) -> bool:
+        """True if any of the token's tables changed, in this or another process.
+
+        When nothing was committed anywhere since the token was taken this costs
+        a single PRAGMA; otherwise the per-table counters decide. external_only
+        ignores commits made through this store's connection, for caches that
+        already invalidate themselves on local writes.
+        """
+        conn = self._conn
+        if (
+            id(conn) == token.connection_id
+            and (external_only or self._local_writes == token.local_writes)
+            and conn.execute("PRAGMA data_version").fetchone()[0] == token.data_version
+        ):
+            return False
+        tables = tuple(name for name, _ in token.counters)
+        return self._read_counters(tables) != token.counters
+
+    def _read_counters(self, tables: tuple[str, ...]) -> tuple[tuple[str, int], ...]:
+        if not tables:
+            return ()
+        placeholders = ", ".join("?" for _ in tables)
         cur = self._conn.cursor()
-        # Add key_path to identities if missing
-        cur.execute("PRAGMA table_info(identities)")
-        cols = {row[1] for row in cur.fetchall()}
-        if "key_path" not in cols:
-            cur.execute("ALTER TABLE identities ADD COLUMN key_path TEXT")
-        # Add web_links table if missing
-        cur.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='web_links'"
-        )
-        if cur.fetchone() is None:
-            cur.execute(
-                """
-                CREATE TABLE web_links (
-                    id         INTEGER PRIMARY KEY AUTOINCREMENT,
-                    server_id  INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
-                    label      TEXT NOT NULL,
-                    url        TEXT NOT NULL
-                )
-                """
-            )
-        # Add actions table if missing
-        cur.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='actions'"
-        )
-        if cur.fetchone() is None:
-            cur.execute(
-                """
-                CREATE TABLE actions (
-                    id               INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name             TEXT UNIQUE NOT NULL,
-                    description      TEXT,
-                    command_template TEXT NOT NULL,
-                    requires_confirm INTEGER NOT NULL DEFAULT 1
-                )
-                """
-            )
-        # Add action_runs table if missing
         cur.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='action_runs'"
+            f"SELECT table_name, version FROM change_counters WHERE table_name IN ({placeholders})",
+            tables,
         )
-        if cur.fetchone() is None:
-            cur.execute(
-                """
-                CREATE TABLE action_runs (
-                    id              INTEGER PRIMARY KEY AUTOINCREMENT,
-                    action_id       INTEGER NOT NULL REFERENCES actions(id) ON DELETE CASCADE,
-                    server_id       INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
-                    started_at      TEXT,
-                    finished_at     TEXT,
-                    status          TEXT,
-                    exit_code       INTEGER,
-                    duration_ms     INTEGER,
-                    command_rendered TEXT,
-                    stdout          TEXT,
-                    stderr          TEXT
-                )
-                """
-            )
-        # Add execution_target to actions if missing
-        cur.execute("PRAGMA table_info(actions)")
-        cols = {row[1] for row in cur.fetchall()}
-        if "execution_target" not in cols:
-            cur.execute("ALTER TABLE actions ADD COLUMN execution_target TEXT NOT NULL DEFAULT 'local'")
-        self._conn.commit()
+        versions = {row["table_name"]: row["version"] for row in cur.fetchall()}
+        return tuple((table, versions.get(table, 0)) for table in tables)
+
+    # ---------- server ids ----------
+
+    def server_id(self, name: str) -> int | None:
+        """Return servers.id for a server name (cached), or None if it does not exist."""
+        name = name.strip()
+        self._check_server_ids()
+        with self._ids_lock:
+            cached = self._server_ids.get(name)
+        if cached is not None:
+            return cached
+        cur = self._conn.cursor()
+        cur.execute("SELECT id FROM servers WHERE name = ?", (name,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        self._remember_server_id(name, row["id"])
+        return row["id"]
+
+    def server_name(self, server_id: int) -> str | None:
+        """Return the server name for servers.id (cached), or None if it does not exist."""
+        self._check_server_ids()
+        with self._ids_lock:
+            cached = self._server_names.get(server_id)
+        if cached is not None:
+            return cached
+        cur = self._conn.cursor()
+        cur.execute("SELECT name FROM servers WHERE id = ?", (server_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        self._remember_server_id(row["name"], server_id)
+        return row["name"]
+
+    def _check_server_ids(self) -> None:
+        """Drop the id map if servers changed behind our back (e.g. another process).
+
+        The calling thread compares its connection's data_version (and this
+        store's commit count, which data_version ignores) with what it saw last;
+        only when something was committed since is the servers change counter
+        read. The map is shared by every thread, so it is only dropped when that
+        counter moved, and not for this thread's own commits, which already
+        forgot the names they changed. Other connections' commits stay invisible
+        inside a transaction(), so there one check per transaction is enough.
+        """
+        serial = getattr(self._tx_local, "serial", 0) if self.in_transaction() else None
+        if serial is not None and getattr(self._ids_local, "serial", None) == serial:
+            return
+        seen = (self._conn.execute("PRAGMA data_version").fetchone()[0], self._local_writes)
+        last = getattr(self._ids_local, "seen", None)
+        if last == seen:
+            self._ids_local.serial = serial
+            return
+        ((_, version),) = self._read_counters(("servers",))
+        with self._ids_lock:
+            if version != self._ids_version:
+                if last is None or last[0] != seen[0]:
+                    self._server_ids.clear()
+                    self._server_names.clear()
+                self._ids_version = version
+        self._ids_local.seen = seen
+        self._ids_local.serial = serial
+
+    def _remember_server_id(self, name: str, server_id: int) -> None:
+        with self._ids_lock:
+            self._server_ids[name] = server_id
+            self._server_names[server_id] = name
+
+    def _invalidate_server_ids(self, name: str | None = None) -> None:
+        """Forget one cached name (and its id), or the whole map when name is None."""
+        with self._ids_lock:
+            if name is None:
+                self._server_ids.clear()
+                self._server_names.clear()
+                return
+            server_id = self._server_ids.pop(name, None)
+            if server_id is not None:
+                self._server_names.pop(server_id, None)
+
+    # ---------- schema & migration ----------
+
+    def _apply_migrations(self) -> None:
+        """Bring the schema up to SCHEMA_VERSION.
+
+        A current database costs a single PRAGMA read; pending steps run in one
+        transaction and their timings are kept in migration_timings.
+        """
+        conn = self._conn
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        # Table rebuilds must not cascade; foreign_keys can only change outside a transaction.
+        fk_enabled = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            with self.transaction():
+                cur = conn.cursor()
+                for number, name, step in MIGRATIONS:
+                    if number <= version:
+                        continue
+                    started = time.perf_counter()
+                    step(cur)
+                    cur.execute(f"PRAGMA user_version = {number}")
+                    self.migration_timings.append(
+                        MigrationTiming(number, name, (time.perf_counter() - started) * 1000)
+                    )
+        finally:
+            conn.execute(f"PRAGMA foreign_keys = {'ON' if fk_enabled else 'OFF'}")
 
     def _migrate_from_json(self, json_path: Path) -> None:
         """Import existing JSON data (v2 or legacy-shaped) into SQLite."""
@@ -185,54 +439,105 @@ class SqliteStore:
             return
 
         servers = (raw or {}).get("Servers", {}) or {}
-        for name, payload in servers.items():
-            if not isinstance(payload, dict):
-                continue
-            hosts_raw = payload.get("Hosts", {}) or {}
-            internal_primary = hosts_raw.get("Internal_Primary", "") or ""
-            internal_secondary = hosts_raw.get("Internal_Secondary", "") or ""
-            external_primary = hosts_raw.get("External_Primary", "") or ""
-            external_secondary = hosts_raw.get("External_Secondary", "") or ""
-            self._insert_server_with_hosts(
-                name,
-                internal_primary,
-                internal_secondary,
-                external_primary,
-                external_secondary,
-            )
-        self._conn.commit()
-
-    def _insert_server_with_hosts(
-        self,
-        name: str,
-        internal_primary: str,
-        internal_secondary: str,
-        external_primary: str,
-        external_secondary: str,
-    ) -> None:
+        with self.transaction():
+            for name, payload in servers.items():
+                if not isinstance(payload, dict):
+                    continue
+                self.upsert_server(_server_from_payload(name, payload))
+
+    # ---------- typed server API ----------
+
+    def list_servers(self) -> list[Server]:
+        """Return all servers ordered by name, using two set-based queries."""
         cur = self._conn.cursor()
-        cur.execute("INSERT OR IGNORE INTO servers(name) VALUES (?)", (name.strip(),))
-        cur.execute("SELECT id FROM servers WHERE name = ?", (name.strip(),))
+        cur.execute("SELECT id, name, notes FROM servers ORDER BY name")
+        servers: list[Server] = []
+        hosts_by_id: dict[int, HostSet] = {}
+        for row in cur.fetchall():
+            hosts = HostSet()
+            hosts_by_id[row["id"]] = hosts
+            servers.append(Server(name=row["name"], hosts=hosts, notes=row["notes"] or ""))
+
+        cur.execute("SELECT server_id, kind, priority, address FROM hosts")
+        for row in cur.fetchall():
+            hosts = hosts_by_id.get(row["server_id"])
+            field = _HOST_FIELDS.get((row["kind"], row["priority"]))
+            if hosts is not None and field:
+                setattr(hosts, field, row["address"])
+        return servers
+
+    def get_server(self, name: str) -> Server | None:
+        name = name.strip()
+        cur = self._conn.cursor()
+        cur.execute("SELECT id, name, notes FROM servers WHERE name = ?", (name,))
         row = cur.fetchone()
         if row is None:
+            return None
+        self._remember_server_id(row["name"], row["id"])
+        return Server(name=row["name"], hosts=self._load_hosts(row["id"]), notes=row["notes"] or "")
+
+    def upsert_server(self, server: Server, original_name: str | None = None) -> None:
+        """Insert or update a server and its hosts.
+
+        When original_name differs from server.name the existing row is renamed in
+        place, so its tags, SSH profile, web links and run history stay attached.
+        """
+        name = server.name.strip()
+        if not name:
             return
-        server_id = row["id"]
-        # clear existing hosts for id if any
+        notes = server.notes or ""
+        cur = self._conn.cursor()
+
+        server_id: int | None = None
+        old_name = (original_name or "").strip()
+        if old_name and old_name != name:
+            server_id = self.server_id(old_name)
+            if server_id is not None:
+                cur.execute("UPDATE servers SET name = ?, notes = ? WHERE id = ?", (name, notes, server_id))
+                self._invalidate_server_ids(old_name)
+                self._remember_server_id(name, server_id)
+        if server_id is None:
+            server_id = self.server_id(name)
+            if server_id is None:
+                cur.execute("INSERT INTO servers(name, notes) VALUES (?, ?)", (name, notes))
+                server_id = int(cur.lastrowid)
+                self._remember_server_id(name, server_id)
+            else:
+                cur.execute("UPDATE servers SET notes = ? WHERE id = ?", (notes, server_id))
+
         cur.execute("DELETE FROM hosts WHERE server_id = ?", (server_id,))
+        rows = []
+        for (kind, priority), field in _HOST_FIELDS.items():
+            address = (getattr(server.hosts, field) or "").strip()
+            if address:
+                rows.append((server_id, kind, priority, address))
+        cur.executemany(
+            "INSERT INTO hosts(server_id, kind, priority, address) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        self.commit()
 
-        def _add_host(kind: str, priority: int, address: str) -> None:
-            address = (address or "").strip()
-            if not address:
-                return
-            cur.execute(
-                "INSERT INTO hosts(server_id, kind, priority, address) VALUES (?, ?, ?, ?)",
-                (server_id, kind, priority, address),
-            )
+    def delete_server(self, name: str) -> None:
+        name = name.strip()
+        if not name:
+            return
+        cur = self._conn.cursor()
+        cur.execute("DELETE FROM servers WHERE name = ?", (name,))
+        self._invalidate_server_ids(name)
+        self.commit()
 
-        _add_host("internal", 1, internal_primary)
-        _add_host("internal", 2, internal_secondary)
-        _add_host("external", 1, external_primary)
-        _add_host("external", 2, external_secondary)
+    def _load_hosts(self, server_id: int) -> HostSet:
+        cur = self._conn.cursor()
+        cur.execute(
+            "SELECT kind, priority, address FROM hosts WHERE server_id = ?",
+            (server_id,),
+        )
+        hosts = HostSet()
+        for row in cur.fetchall():
+            field = _HOST_FIELDS.get((row["kind"], row["priority"]))
+            if field:
+                setattr(hosts, field, row["address"])
+        return hosts
 
     # ---------- JsonStore-like API ----------
 
@@ -245,80 +550,93 @@ class SqliteStore:
         if section != "Servers":
             return {}
 
-        cur = self._conn.cursor()
         if key is None:
-            cur.execute("SELECT id, name, notes FROM servers ORDER BY name")
-            rows = cur.fetchall()
-            result: dict[str, dict[str, Any]] = {}
-            for row in rows:
-                server_id = row["id"]
-                hosts = self._load_hosts(server_id)
-                result[row["name"]] = {"Hosts": hosts, "Notes": row["notes"]}
-            return result
+            return {server.name: _server_to_payload(server) for server in self.list_servers()}
 
         # specific server
-        cur.execute("SELECT id, name, notes FROM servers WHERE name = ?", (key.strip(),))
-        row = cur.fetchone()
-        if row is None:
+        server = self.get_server(key)
+        if server is None:
             return None
-        hosts = self._load_hosts(row["id"])
-        return {"Hosts": hosts, "Notes": row["notes"]}
-
-    def _load_hosts(self, server_id: int) -> dict[str, str]:
-        cur = self._conn.cursor()
-        cur.execute(
-            "SELECT kind, priority, address FROM hosts WHERE server_id = ?",
-            (server_id,),
-        )
-        mapping: dict[str, str] = {
-            "Internal_Primary": "",
-            "Internal_Secondary": "",
-            "External_Primary": "",
-            "External_Secondary": "",
-        }
-        for row in cur.fetchall():
-            kind = row["kind"]
-            priority = row["priority"]
-            key: str | None = None
-            if kind == "internal" and priority == 1:
-                key = "Internal_Primary"
-            elif kind == "internal" and priority == 2:
-                key = "Internal_Secondary"
-            elif kind == "external" and priority == 1:
-                key = "External_Primary"
-            elif kind == "external" and priority == 2:
-                key = "External_Secondary"
-            if key:
-                mapping[key] = row["address"]
-        return mapping
+        return _server_to_payload(server)
 
     def set(self, section: str, key: str, value: dict) -> None:
         if section != "Servers":
             return
-        name = key.strip()
-        if not name:
-            return
-        hosts_raw = (value or {}).get("Hosts", {}) or {}
-        internal_primary = hosts_raw.get("Internal_Primary", "") or ""
-        internal_secondary = hosts_raw.get("Internal_Secondary", "") or ""
-        external_primary = hosts_raw.get("External_Primary", "") or ""
-        external_secondary = hosts_raw.get("External_Secondary", "") or ""
-        self._insert_server_with_hosts(
-            name,
-            internal_primary,
-            internal_secondary,
-            external_primary,
-            external_secondary,
-        )
-        self._conn.commit()
+        self.upsert_server(_server_from_payload(key, value))
 
     def delete(self, section: str, key: str) -> None:
         if section != "Servers":
             return
-        name = key.strip()
-        if not name:
-            return
-        cur = self._conn.cursor()
-        cur.execute("DELETE FROM servers WHERE name = ?", (name,))
-        self._conn.commit()
+        self.delete_server(key)
+
+    # ---------- search ----------
+
+    def search_servers(self, query: str, tag: str | None = None, limit: int | None = None) -> list[str]:
+        """Return server names matching query and/or tag.
+
+        - query matches name, notes, any host address or tag name
+          (case-insensitive substring); results are ranked by relevance
+        - tag (if provided and non-empty) must be one of the server's tags
+        - an empty query returns all (tag-filtered) servers ordered by name
+        """
+        q = (query or "").strip()
+        tag_norm = (tag or "").strip().lower()
+        params: list[Any] = []
+
+        tag_clause = ""
+        if tag_norm:
+            tag_clause = """
+                AND s.id IN (
+                    SELECT st.server_id FROM server_tags st JOIN tags t ON t.id = st.tag_id
+                    WHERE t.name = ?
+                )
+            """
 
+        if len(q) >= _FTS_MIN_QUERY and self.has_table("server_search"):
+            sql = f"""
+                SELECT s.name
+                FROM server_search f
+                JOIN servers s ON s.id = f.rowid
+                WHERE server_search MATCH ? {tag_clause}
+                ORDER BY f.rank, s.name
+                LIMIT ?
+            """
+            params.append('"' + q.replace('"', '""') + '"')
+        else:
+            text_clause = ""
+            if q:
+                pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                text_clause = """
+                    AND (
+                        s.name LIKE ? ESCAPE '\\'
+                        OR COALESCE(s.notes, '') LIKE ? ESCAPE '\\'
+                        OR EXISTS (SELECT 1 FROM hosts h
+                                   WHERE h.server_id = s.id AND h.address LIKE ? ESCAPE '\\')
+                        OR EXISTS (SELECT 1 FROM server_tags st JOIN tags t ON t.id = st.tag_id
+                                   WHERE st.server_id = s.id AND t.name LIKE ? ESCAPE '\\')
+                    )
+                """
+                params.extend([pattern] * 4)
+            sql = f"""
+                SELECT s.name FROM servers s
+                WHERE 1 = 1 {text_clause} {tag_clause}
+                ORDER BY s.name
+                LIMIT ?
+            """
+        if tag_norm:
+            params.append(tag_norm)
+        params.append(-1 if limit is None else limit)
+
+        cur = self._conn.cursor()
+        cur.execute(sql, params)
+        return [row["name"] for row in cur.fetchall()]
+
+    def has_table(self, name: str) -> bool:
+        """True if the table exists (cached; tables are only created by migrations)."""
+        present = self._tables_present.get(name)
+        if present is None:
+            cur = self._conn.cursor()
+            cur.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (name,))
+            present = cur.fetchone() is not None
+            self._tables_present[name] = present
+        return present
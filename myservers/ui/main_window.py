@@ -6,11 +6,13 @@ from __future__ import annotations
 Business logic lives in myservers/core; storage in myservers/storage.
 """
 
+import threading
 from pathlib import Path
 
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QClipboard, QDesktopServices
+from PySide6.QtCore import Qt, QTimer
+from PySide6.QtGui import QClipboard, QDesktopServices, QTextCursor
 from PySide6.QtWidgets import (
+    QAbstractItemView,
     QApplication,
     QMainWindow,
     QWidget,
@@ -30,6 +32,7 @@ from PySide6.QtWidgets import (
     QTableWidget,
     QTableWidgetItem,
     QHeaderView,
+    QProgressDialog,
 )
 
 from myservers.core.models import Server, HostSet
@@ -40,7 +43,9 @@ from myservers.core.identities_store import IdentitiesStore, IdentityMeta, SshPr
 from myservers.core import identity as identity_core
 from myservers.core.web_links_store import WebLinksStore, WebLink
 from myservers.core.tags_store import TagStore, ServerFilterItem, filter_servers
-from myservers.core.actions import ActionsStore, ActionTemplate, ActionRun
+from myservers.core.actions import ActionsStore, ActionTemplate, ActionRun, RunCursor, ServerResult
+from myservers.core.retention import RetentionPolicy
+from myservers.connectors.capture import CancelToken
 from myservers.connectors.host_select import choose_best_host
 from myservers.connectors.exec_ssh import build_ssh_invocation_string
 from myservers.storage.sqlite_store import SqliteStore
@@ -482,6 +487,9 @@ class ActionDialog(QDialog):
 class ActionsDialog(QDialog):
     """Manage actions and run them."""
 
+    # How often the fleet progress dialog checks on the runs.
+    RUN_MANY_POLL_MS = 100
+
     def __init__(self, parent: QWidget | None, actions_store: ActionsStore, server_store: ServerStore) -> None:
         super().__init__(parent)
         self.setWindowTitle("Actions")
@@ -605,6 +613,7 @@ class ActionsDialog(QDialog):
             dlg.setWindowTitle("Select Server")
             layout = QVBoxLayout(dlg)
             server_list = QListWidget()
+            server_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
             for s in servers:
                 server_list.addItem(s.name)
             layout.addWidget(server_list)
@@ -618,6 +627,10 @@ class ActionsDialog(QDialog):
             layout.addLayout(btns)
             if dlg.exec() != QDialog.Accepted:
                 return
+            selected = [item.text() for item in server_list.selectedItems()]
+            if len(selected) > 1:
+                self._run_many(action, selected, dry_run=self._dry_run.isChecked())
+                return
             item = server_list.currentItem()
             if item is None:
                 return
@@ -669,20 +682,213 @@ class ActionsDialog(QDialog):
                 if reply != QMessageBox.Yes:
                     return
 
-        try:
-            run = self._actions_store.run_action(action_id, server_name, dry_run=dry_run)
-            status_msg = f"Status: {run.status}"
-            if run.exit_code is not None:
-                status_msg += f"\nExit code: {run.exit_code}"
-            QMessageBox.information(self, "Action Run", status_msg)
-        except Exception as exc:
-            QMessageBox.critical(self, "Run Action", f"Execution failed: {exc}")
+        # Execute off the GUI thread and follow the output while it runs. The
+        # run may wait for a slot first; the dialog shows that without blocking.
+        finished = threading.Event()
+        outcome: dict[str, object] = {}
+        cancel = CancelToken()
+        live = LiveOutputDialog(self, self._actions_store, None, cancel=cancel, finished=finished)
+
+        def work() -> None:
+            try:
+                outcome["run"] = self._actions_store.run_action(
+                    action_id, server_name, dry_run=dry_run, on_started=live.attach, cancel=cancel
+                )
+            except Exception as exc:
+                outcome["error"] = exc
+            finally:
+                finished.set()
+
+        worker = threading.Thread(target=work, name="run-action", daemon=True)
+        worker.start()
+        live.exec()
+        if worker.is_alive():
+            # Closed early; the run keeps going and shows up in History.
+            return
+        worker.join()
+        if "error" in outcome:
+            QMessageBox.critical(self, "Run Action", f"Execution failed: {outcome['error']}")
+            return
+        run = outcome["run"]
+        status_msg = f"Status: {run.status}"
+        if run.exit_code is not None:
+            status_msg += f"\nExit code: {run.exit_code}"
+        QMessageBox.information(self, "Action Run", status_msg)
+
+    def _run_many(self, action: ActionTemplate, server_names: list[str], *, dry_run: bool) -> None:
+        if action.requires_confirm and not dry_run:
+            reply = QMessageBox.question(
+                self,
+                "Confirm Execution",
+                f"Run '{action.name}' on {len(server_names)} servers?",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.No,
+            )
+            if reply != QMessageBox.Yes:
+                return
+
+        done: list[ServerResult] = []
+        finished = threading.Event()
+        outcome: dict[str, object] = {}
+        cancel = CancelToken()
+
+        def work() -> None:
+            try:
+                outcome["fleet"] = self._actions_store.run_action_many(
+                    action.id, server_names, dry_run=dry_run, on_result=done.append, cancel=cancel
+                )
+            except Exception as exc:
+                outcome["error"] = exc
+            finally:
+                finished.set()
+
+        progress = QProgressDialog(f"Running '{action.name}'...", "Stop", 0, len(server_names), self)
+        progress.canceled.connect(cancel.cancel)
+        progress.setWindowTitle("Run Action")
+        progress.setWindowModality(Qt.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+
+        # The fleet runs on a worker thread; a timer on the GUI thread follows it.
+        def poll() -> None:
+            progress.setValue(len(done))
+            if finished.is_set():
+                timer.stop()
+                progress.accept()
+
+        timer = QTimer(progress)
+        timer.timeout.connect(poll)
+        timer.start(self.RUN_MANY_POLL_MS)
+        worker = threading.Thread(target=work, name="run-action-many", daemon=True)
+        worker.start()
+        progress.exec()
+        if not finished.is_set():
+            # Stopped: runs still executing get SIGTERM, then SIGKILL after a grace period.
+            progress.setLabelText("Stopping...")
+            progress.setCancelButton(None)
+            progress.exec()
+        timer.stop()
+        if not finished.is_set():
+            # Closed early; the runs finish in the background and show up in History.
+            return
+        worker.join()
+
+        if "error" in outcome:
+            QMessageBox.critical(self, "Run Action", f"Execution failed: {outcome['error']}")
+            return
+        fleet = outcome["fleet"]
+        lines = [f"{status}: {count}" for status, count in sorted(fleet.summary().items())]
+        failed = [r for r in fleet.results if r.error]
+        for result in failed[:10]:
+            lines.append(f"  {result.server_name}: {result.error}")
+        if fleet.run_ids and not dry_run:
+            groups = self._actions_store.output_groups(run_ids=fleet.run_ids)
+            lines.append(f"Distinct outputs: {len(groups)}")
+            for group in groups[1:6]:
+                lines.append(f"  differs on: {', '.join(group.server_names[:5])}")
+        lines.append(f"Took {fleet.duration_ms / 1000:.1f}s")
+        QMessageBox.information(self, "Action Run", "\n".join(lines))
 
     def _on_history(self) -> None:
         dlg = HistoryDialog(self, self._actions_store)
         dlg.exec()
 
 
+class LiveOutputDialog(QDialog):
+    """Follow the output of a run while it executes.
+
+    With cancel (the token the run was started with), a Stop button cancels it.
+    run_id may be None for a run that has not started yet: the dialog waits
+    for attach(), or closes itself if finished is set first (e.g. a dry run
+    or an error before the command started).
+    """
+
+    POLL_MS = 500
+
+    def __init__(
+        self,
+        parent: QWidget | None,
+        actions_store: ActionsStore,
+        run_id: int | None,
+        *,
+        cancel: CancelToken | None = None,
+        finished: threading.Event | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.setWindowTitle("Run" if run_id is None else f"Run {run_id}")
+        self._actions_store = actions_store
+        self._run_id = run_id
+        self._titled = run_id is not None
+        self._next_seq = 0
+        self._cancel = cancel
+        self._finished = finished
+
+        layout = QVBoxLayout(self)
+        self._status = QLabel()
+        layout.addWidget(self._status)
+        self._output = QTextEdit()
+        self._output.setReadOnly(True)
+        layout.addWidget(self._output)
+        btn_row = QHBoxLayout()
+        self._stop_btn = QPushButton("Stop")
+        self._stop_btn.clicked.connect(self._on_stop)
+        self._stop_btn.setVisible(cancel is not None)
+        btn_row.addWidget(self._stop_btn)
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        btn_row.addWidget(close_btn)
+        layout.addLayout(btn_row)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._poll)
+        self._timer.start(self.POLL_MS)
+        self._poll()
+
+    def attach(self, run_id: int) -> None:
+        """Follow run_id from now on; safe to call from the run's thread (see _poll)."""
+        self._run_id = run_id
+
+    def _poll(self) -> None:
+        run_id = self._run_id
+        if run_id is None:
+            if self._finished is not None and self._finished.is_set():
+                self._timer.stop()
+                self.accept()
+                return
+            self._status.setText("Status: waiting to start...")
+            return
+        if not self._titled:
+            self.setWindowTitle(f"Run {run_id}")
+            self._titled = True
+        tail = self._actions_store.tail_run(run_id, self._next_seq)
+        if tail is None:
+            self._timer.stop()
+            self._status.setText("Status: deleted")
+            return
+        self._next_seq = tail.next_seq
+        for _stream, text in tail.chunks:
+            self._output.moveCursor(QTextCursor.End)
+            self._output.insertPlainText(text)
+        self._status.setText(f"Status: {tail.status}")
+        if tail.status != "running":
+            self._timer.stop()
+            self._stop_btn.setEnabled(False)
+            # Replace the live view with the output as stored.
+            output = self._actions_store.get_run_output(run_id)
+            if output is not None:
+                text = output.stdout
+                if output.stderr:
+                    text += ("\n" if text else "") + output.stderr
+                self._output.setPlainText(text)
+
+    def _on_stop(self) -> None:
+        if self._cancel is not None:
+            self._cancel.cancel()
+        self._stop_btn.setEnabled(False)
+        self._status.setText("Status: stopping...")
+
+
 class HistoryDialog(QDialog):
     """View action execution history."""
 
@@ -690,8 +896,18 @@ class HistoryDialog(QDialog):
         super().__init__(parent)
         self.setWindowTitle("Action History")
         self._actions_store = actions_store
+        self._next_cursor: RunCursor | None = None
 
         layout = QVBoxLayout(self)
+        filter_row = QHBoxLayout()
+        self._status_filter = QComboBox()
+        self._status_filter.addItems(["All statuses", "success", "error", "dry_run", "running", "interrupted", "cancelled"])
+        self._status_filter.currentIndexChanged.connect(self._refresh)
+        filter_row.addWidget(QLabel("Status:"))
+        filter_row.addWidget(self._status_filter)
+        filter_row.addStretch(1)
+        layout.addLayout(filter_row)
+
         self._table = QTableWidget()
         self._table.setColumnCount(6)
         self._table.setHorizontalHeaderLabels(["Time", "Server", "Action", "Status", "Exit Code", "Duration"])
@@ -702,38 +918,97 @@ class HistoryDialog(QDialog):
 
         btns = QHBoxLayout()
         view_btn = QPushButton("View Details")
+        self._more_btn = QPushButton("Load More")
+        export_btn = QPushButton("Export...")
+        prune_btn = QPushButton("Prune History")
         close_btn = QPushButton("Close")
         view_btn.clicked.connect(self._on_view_details)
+        self._more_btn.clicked.connect(self._load_page)
+        export_btn.clicked.connect(self._on_export)
+        prune_btn.clicked.connect(self._on_prune)
         close_btn.clicked.connect(self.accept)
         btns.addWidget(view_btn)
+        btns.addWidget(self._more_btn)
+        btns.addWidget(export_btn)
+        btns.addWidget(prune_btn)
         btns.addWidget(close_btn)
         layout.addLayout(btns)
 
         self._refresh()
 
     def _refresh(self) -> None:
-        cur = self._actions_store._conn.cursor()
-        cur.execute(
-            """
-            SELECT ar.id, ar.started_at, ar.status, ar.exit_code, ar.duration_ms,
-                   s.name as server_name, a.name as action_name
-            FROM action_runs ar
-            JOIN servers s ON ar.server_id = s.id
-            JOIN actions a ON ar.action_id = a.id
-            ORDER BY ar.started_at DESC
-            LIMIT 100
-            """
+        self._actions_store.flush()
+        self._table.setRowCount(0)
+        self._next_cursor = None
+        self._load_page()
+
+    def _load_page(self) -> None:
+        status = self._status_filter.currentText() if self._status_filter.currentIndex() > 0 else None
+        page = self._actions_store.query_runs(status=status, after_cursor=self._next_cursor)
+        self._next_cursor = page.next_cursor
+        self._more_btn.setEnabled(page.next_cursor is not None)
+        start = self._table.rowCount()
+        self._table.setRowCount(start + len(page.runs))
+        for idx, run in enumerate(page.runs, start):
+            self._table.setItem(idx, 0, QTableWidgetItem(run.started_at[:19]))
+            server_item = QTableWidgetItem(run.server_name)
+            if run.host:
+                server_item.setToolTip(f"Served by {run.host}")
+            self._table.setItem(idx, 1, server_item)
+            self._table.setItem(idx, 2, QTableWidgetItem(run.action_name))
+            self._table.setItem(idx, 3, QTableWidgetItem(run.status))
+            self._table.setItem(idx, 4, QTableWidgetItem(str(run.exit_code) if run.exit_code is not None else ""))
+            self._table.setItem(idx, 5, QTableWidgetItem(f"{run.duration_ms}ms"))
+            self._table.item(idx, 0).setData(Qt.UserRole, run.id)
+
+    def _on_export(self) -> None:
+        file_name, selected_filter = QFileDialog.getSaveFileName(
+            self,
+            "Export history",
+            "history.ndjson",
+            "NDJSON (*.ndjson);;CSV (*.csv)",
+        )
+        if not file_name:
+            return
+        fmt = "csv" if file_name.lower().endswith(".csv") or selected_filter.startswith("CSV") else "ndjson"
+        reply = QMessageBox.question(
+            self,
+            "Export history",
+            "Include command and output of each run?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No,
         )
-        rows = cur.fetchall()
-        self._table.setRowCount(len(rows))
-        for idx, row in enumerate(rows):
-            self._table.setItem(idx, 0, QTableWidgetItem(row["started_at"][:19] if row["started_at"] else ""))
-            self._table.setItem(idx, 1, QTableWidgetItem(row["server_name"]))
-            self._table.setItem(idx, 2, QTableWidgetItem(row["action_name"]))
-            self._table.setItem(idx, 3, QTableWidgetItem(row["status"]))
-            self._table.setItem(idx, 4, QTableWidgetItem(str(row["exit_code"]) if row["exit_code"] is not None else ""))
-            self._table.setItem(idx, 5, QTableWidgetItem(f"{row['duration_ms']}ms"))
-            self._table.item(idx, 0).setData(Qt.UserRole, row["id"])
+        status = self._status_filter.currentText() if self._status_filter.currentIndex() > 0 else None
+        try:
+            with open(file_name, "w", encoding="utf-8", newline="") as fh:
+                count = self._actions_store.export_runs(
+                    fh, fmt, include_output=reply == QMessageBox.Yes, status=status
+                )
+        except OSError as exc:
+            QMessageBox.critical(self, "Export history", f"Export failed: {exc}")
+            return
+        QMessageBox.information(self, "Export history", f"Exported {count} run(s).")
+
+    def _on_prune(self) -> None:
+        policy = RetentionPolicy()
+        reply = QMessageBox.question(
+            self,
+            "Prune history",
+            f"Delete runs older than {policy.max_age_days} days and keep at most "
+            f"{policy.max_runs_per_action_server} runs per action and server?\n"
+            "The latest failed run of each action and server is kept.",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No,
+        )
+        if reply != QMessageBox.Yes:
+            return
+        report = self._actions_store.prune_history(policy)
+        QMessageBox.information(
+            self,
+            "Prune history",
+            f"Deleted {report.runs_deleted} runs, reclaimed {report.bytes_reclaimed // 1024} KiB.",
+        )
+        self._refresh()
 
     def _on_view_details(self) -> None:
         item = self._table.currentItem()
@@ -741,34 +1016,29 @@ class HistoryDialog(QDialog):
             return
         row = item.row()
         run_id = int(self._table.item(row, 0).data(Qt.UserRole))
-        cur = self._actions_store._conn.cursor()
-        cur.execute(
-            """
-            SELECT command_rendered, stdout, stderr
-            FROM action_runs
-            WHERE id = ?
-            """,
-            (run_id,),
-        )
-        row_data = cur.fetchone()
-        if row_data is None:
+        if self._table.item(row, 3).text() == "running":
+            LiveOutputDialog(self, self._actions_store, run_id).exec()
+            self._refresh()
+            return
+        output = self._actions_store.get_run_output(run_id)
+        if output is None:
             return
         dlg = QDialog(self)
         dlg.setWindowTitle("Run Details")
         layout = QVBoxLayout(dlg)
         layout.addWidget(QLabel("Command:"))
         cmd_edit = QTextEdit()
-        cmd_edit.setPlainText(row_data["command_rendered"] or "")
+        cmd_edit.setPlainText(output.command_rendered)
         cmd_edit.setReadOnly(True)
         layout.addWidget(cmd_edit)
         layout.addWidget(QLabel("Stdout:"))
         out_edit = QTextEdit()
-        out_edit.setPlainText(row_data["stdout"] or "")
+        out_edit.setPlainText(output.stdout)
         out_edit.setReadOnly(True)
         layout.addWidget(out_edit)
         layout.addWidget(QLabel("Stderr:"))
         err_edit = QTextEdit()
-        err_edit.setPlainText(row_data["stderr"] or "")
+        err_edit.setPlainText(output.stderr)
         err_edit.setReadOnly(True)
         layout.addWidget(err_edit)
         close_btn = QPushButton("Close")
@@ -859,7 +1129,6 @@ class MainWindow(QMainWindow):
 
     def _refresh_list(self) -> None:
         self._list.clear()
-        servers = self._store.list_servers()
 
         # Lazily initialize TagStore if SQLite backend is present
         backend = getattr(self._store, "_store", None)
@@ -869,9 +1138,6 @@ class MainWindow(QMainWindow):
         else:
             self._tag_store = None
 
-        items_for_filter: list[ServerFilterItem] = []
-        tags_by_server: dict[str, list[str]] = {}
-
         if self._tag_store is not None:
             all_tags = self._tag_store.list_tags()
             # Rebuild tag filter dropdown
@@ -888,23 +1154,22 @@ class MainWindow(QMainWindow):
                     self._tag_filter.setCurrentIndex(idx)
             self._tag_filter.blockSignals(False)
 
-            for s in servers:
-                stags = self._tag_store.get_server_tags(s.name)
-                tags_by_server[s.name] = stags
-                items_for_filter.append(
-                    ServerFilterItem(name=s.name, hosts=s.hosts, notes=s.notes, tags=stags)
-                )
-        else:
-            for s in servers:
-                items_for_filter.append(ServerFilterItem(name=s.name, hosts=s.hosts, notes=s.notes, tags=[]))
-
         query = self._search_edit.text()
         selected_tag = self._tag_filter.currentText()
         tag_filter_value = None if selected_tag == "All tags" else selected_tag
-        filtered = filter_servers(items_for_filter, query=query, tag=tag_filter_value)
 
-        for item in filtered:
-            self._list.addItem(item.name)
+        if isinstance(backend, SqliteStore):
+            # Indexed search in SQLite; no need to load the whole fleet.
+            names = backend.search_servers(query, tag=tag_filter_value)
+        else:
+            items_for_filter = [
+                ServerFilterItem(name=s.name, hosts=s.hosts, notes=s.notes, tags=[])
+                for s in self._store.list_servers()
+            ]
+            names = [item.name for item in filter_servers(items_for_filter, query=query, tag=tag_filter_value)]
+
+        for name in names:
+            self._list.addItem(name)
 
         self._refresh_details()
 
@@ -998,6 +1263,8 @@ class MainWindow(QMainWindow):
         if dlg.exec() != QDialog.Accepted:
             return
         updated = dlg.get_server()
+        # The dialog does not edit notes; keep the stored ones.
+        updated.notes = current.notes
         try:
             self._store.update_server(name, updated)
         except (ValueError, KeyError) as exc:
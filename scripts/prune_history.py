@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Prune action history and compact the database without starting the GUI.
+
+Suitable for cron / scheduled tasks, e.g.:
+
+    python scripts/prune_history.py --max-age-days 30 --max-runs 200
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_DB = Path.home() / ".myservers-tool-v2" / "data.sqlite3"
+
+
+def main(argv: list[str] | None = None) -> int:
+    sys.path.insert(0, str(REPO_ROOT))
+    from myservers.core.retention import DEFAULT_BATCH_SIZE, RetentionPolicy, prune_history
+    from myservers.storage.sqlite_store import SqliteStore
+
+    defaults = RetentionPolicy()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", type=Path, default=DEFAULT_DB, help=f"database path (default: {DEFAULT_DB})")
+    parser.add_argument(
+        "--max-age-days",
+        type=int,
+        default=defaults.max_age_days,
+        help="delete runs older than this; 0 disables (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--max-runs",
+        type=int,
+        default=defaults.max_runs_per_action_server,
+        help="keep at most this many runs per action/server; 0 disables (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-keep-last-failure",
+        action="store_true",
+        help="allow the latest failed run of an action/server to be pruned",
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--full-vacuum", action="store_true", help="rewrite the whole file with VACUUM")
+    args = parser.parse_args(argv)
+
+    if not args.db.exists():
+        print(f"Database not found: {args.db}", file=sys.stderr)
+        return 1
+
+    policy = RetentionPolicy(
+        max_age_days=args.max_age_days or None,
+        max_runs_per_action_server=args.max_runs or None,
+        keep_last_failure=not args.no_keep_last_failure,
+    )
+    backend = SqliteStore(args.db)
+    try:
+        report = prune_history(backend, policy, batch_size=args.batch_size, full_vacuum=args.full_vacuum)
+    finally:
+        backend.close()
+    print(
+        f"Deleted {report.runs_deleted} runs; "
+        f"{report.bytes_before} -> {report.bytes_after} bytes ({report.bytes_reclaimed} reclaimed)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""Shared setup for the action run tests."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+from myservers.core.actions import ActionsStore
+from myservers.core.models import HostSet, Server
+from myservers.core.servers import ServerStore
+from myservers.storage.sqlite_store import SqliteStore
+
+
+@dataclass
+class RunEnv:
+    backend: SqliteStore
+    servers: ServerStore
+    actions: ActionsStore
+    action_id: int
+    command: str
+
+    def add_run(
+        self,
+        server: str,
+        started_at: str,
+        *,
+        finished_at: Optional[str] = None,
+        status: str = "success",
+        duration_ms: int = 1,
+        stdout: str = "",
+        stderr: str = "",
+    ) -> int:
+        """Record a finished run of the action at a fixed time.
+
+        run_action stamps runs with the current time, while history, stats,
+        export and retention tests need runs at known points in the past. This
+        goes through _insert_run, the same write path run_action uses for a run
+        recorded after it finishes, so only the timestamps are made up.
+        """
+        return self.actions._insert_run(
+            action_id=self.action_id,
+            server_id=self.backend.server_id(server),
+            server_name=server,
+            started_at=started_at,
+            finished_at=finished_at or started_at,
+            status=status,
+            exit_code={"success": 0, "error": 1}.get(status),
+            duration_ms=duration_ms,
+            command_rendered=self.command,
+            stdout=stdout,
+            stderr=stderr,
+        )
+
+
+def make_env(
+    db_path: Path,
+    servers: int | Sequence[str] = ("Srv1",),
+    *,
+    command: str = "true",
+    action_name: str = "Check",
+    **store_kwargs: Any,
+) -> RunEnv:
+    """A database with servers (n gives Srv00, Srv01, ...), each with its own host, and one action."""
+    backend = SqliteStore(db_path)
+    store = ServerStore(backend)
+    actions = ActionsStore(backend, store, **store_kwargs)
+    names = [f"Srv{i:02d}" for i in range(servers)] if isinstance(servers, int) else list(servers)
+    for i, name in enumerate(names):
+        store.create_server(Server(name=name, hosts=HostSet(internal_primary=f"10.0.0.{i + 1}")))
+    action_id = actions.create_action(
+        name=action_name, description=None, command_template=command, requires_confirm=False
+    )
+    return RunEnv(backend=backend, servers=store, actions=actions, action_id=action_id, command=command)
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from myservers.connectors.capture import run_bounded_async
+from myservers.connectors.exec_local import execute_capture_async
+from tests.helpers import make_env
+
+
+def test_run_bounded_async_captures_and_truncates() -> None:
+    script = "import sys; sys.stdout.write('a' * 5000 + 'END'); sys.stderr.write('oops'); sys.exit(4)"
+    chunks: list[tuple[str, bytes]] = []
+    result = asyncio.run(
+        run_bounded_async(
+            [sys.executable, "-c", script],
+            head_bytes=100,
+            tail_bytes=100,
+            on_output=lambda stream, data: chunks.append((stream, data)),
+        )
+    )
+    assert result.exit_code == 4
+    assert result.stdout_bytes == 5003 and result.stdout_truncated
+    assert result.stdout.startswith("a" * 100) and result.stdout.endswith("END")
+    assert "[... 4803 bytes omitted ...]" in result.stdout
+    assert result.stderr == "oops"
+    assert sum(len(data) for stream, data in chunks if stream == "stdout") == 5003
+
+    shell = asyncio.run(execute_capture_async(f'"{sys.executable}" -c "print(\'ok\')"'))
+    assert (shell.exit_code, shell.stdout) == (0, "ok\n")
+
+
+def test_run_bounded_async_timeout_and_cancel() -> None:
+    start = time.monotonic()
+    result = asyncio.run(
+        run_bounded_async([sys.executable, "-c", "import time; time.sleep(30)"], timeout_s=0.5)
+    )
+    assert result.exit_code == -1 and result.timed_out
+    assert result.stderr.endswith("[timeout]")
+    assert time.monotonic() - start < 5
+
+    pids: list[int] = []
+
+    async def cancel_after_start() -> None:
+        script = "import os, time; print(os.getpid(), flush=True); time.sleep(30)"
+        task = asyncio.create_task(
+            run_bounded_async(
+                [sys.executable, "-c", script], on_output=lambda _stream, data: pids.append(int(data))
+            )
+        )
+        while not pids:
+            await asyncio.sleep(0.02)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_after_start())
+    # Killed and reaped.
+    with pytest.raises(ProcessLookupError):
+        os.kill(pids[0], 0)
+
+
+def test_run_action_many_async(tmp_path: Path) -> None:
+    command = f'"{sys.executable}" -c "import time; time.sleep(0.5); print(\'{{{{server.name}}}}\')"'
+    env = make_env(tmp_path / "data.sqlite3", 20, command=command)
+    names = [f"Srv{i:02d}" for i in range(20)] + ["Nope"]
+    seen: list[str] = []
+
+    start = time.monotonic()
+    fleet = asyncio.run(
+        env.actions.run_action_many_async(
+            env.action_id, names, dry_run=False, max_concurrency=20, on_result=lambda r: seen.append(r.server_name)
+        )
+    )
+    # Sequential execution would take at least 10s.
+    assert time.monotonic() - start < 5
+    assert fleet.summary() == {"success": 20, "not_run": 1}
+    assert [r.run.stdout for r in fleet.results if r.run] == [f"{name}\n" for name in names[:20]]
+    assert sorted(seen) == sorted(names)
+    assert len(env.actions.query_runs(status="success").runs) == 20
+    assert env.backend._conn.execute("SELECT COUNT(*) FROM action_run_chunks").fetchone()[0] == 0
+    assert env.actions.run_stats(group_by="action")[0].runs == 20
+
+
+def test_cancelled_async_run_is_interrupted(tmp_path: Path) -> None:
+    script = "import time; print('working', flush=True); time.sleep(30)"
+    env = make_env(tmp_path / "data.sqlite3", 1, command=f'"{sys.executable}" -c "{script}"')
+    run_ids: list[int] = []
+
+    async def run_then_cancel() -> None:
+        task = asyncio.create_task(
+            env.actions.run_action_async(env.action_id, "Srv00", dry_run=False, on_started=run_ids.append)
+        )
+        while not run_ids or not env.actions.tail_run(run_ids[0]).chunks:
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run_then_cancel())
+    run = env.actions.query_runs().runs[0]
+    assert run.id == run_ids[0] and run.status == "interrupted"
+    output = env.actions.get_run_output(run.id)
+    assert output is not None and output.stdout == "working\n"
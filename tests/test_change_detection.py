@@ -0,0 +1,53 @@
+from pathlib import Path
+
+from myservers.core.models import HostSet, Server
+from myservers.core.tags_store import TagStore
+from myservers.storage.sqlite_store import SqliteStore
+
+
+def test_change_token_detects_local_and_external_writes(tmp_path: Path) -> None:
+    path = tmp_path / "data.sqlite3"
+    ours = SqliteStore(path)
+    other = SqliteStore(path)  # stands in for a second process on the same file
+
+    token = ours.change_token(("servers", "tags"))
+    assert not ours.has_changed_since(token)
+
+    other.upsert_server(Server(name="Remote", hosts=HostSet()))
+    assert ours.has_changed_since(token)
+    assert not ours.has_changed_since(ours.change_token(("tags",)))
+
+    token = ours.change_token(("servers",))
+    ours.upsert_server(Server(name="Local", hosts=HostSet()))
+    assert ours.has_changed_since(token)
+    assert not ours.has_changed_since(token, external_only=True)
+
+    # Writes to untracked-by-this-token tables do not count.
+    token = ours.change_token(("tags",))
+    other.upsert_server(Server(name="Remote2", hosts=HostSet()))
+    assert not ours.has_changed_since(token)
+
+
+def test_caches_follow_changes_from_other_connections(tmp_path: Path) -> None:
+    path = tmp_path / "data.sqlite3"
+    ours = SqliteStore(path)
+    other = SqliteStore(path)
+    ours.upsert_server(Server(name="Srv", hosts=HostSet()))
+    tags = TagStore(ours)
+    TagStore(other).set_server_tags("Srv", ["prod"])
+
+    assert tags.list_tags() == ["prod"]
+    server_id = ours.server_id("Srv")
+
+    statements: list[str] = []
+    ours._conn.set_trace_callback(statements.append)
+    assert tags.list_tags() == ["prod"]
+    assert ours.server_id("Srv") == server_id
+    ours._conn.set_trace_callback(None)
+    assert not [s for s in statements if "FROM tags" in s or "FROM servers" in s]
+
+    TagStore(other).set_server_tags("Srv", ["prod", "web"])
+    other.upsert_server(Server(name="Renamed", hosts=HostSet()), original_name="Srv")
+    assert tags.list_tags() == ["prod", "web"]
+    assert ours.server_id("Srv") is None
+    assert ours.server_id("Renamed") == server_id
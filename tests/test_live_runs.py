@@ -0,0 +1,142 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+from myservers.core.actions import ActionsStore
+from myservers.core.live_output import LiveOutputWriter, flush_many
+from myservers.core.servers import ServerStore
+from myservers.storage.sqlite_store import SqliteStore
+from tests.helpers import make_env
+
+
+def _chunk_count(backend: SqliteStore) -> int:
+    return backend._conn.execute("SELECT COUNT(*) FROM action_run_chunks").fetchone()[0]
+
+
+def test_output_visible_while_running(tmp_path: Path) -> None:
+    script = "import time; print('first', flush=True); time.sleep(1.5); print('second', flush=True)"
+    env = make_env(tmp_path / "data.sqlite3", command=f'"{sys.executable}" -c "{script}"')
+    run_ids: list[int] = []
+    result = {}
+    worker = threading.Thread(
+        target=lambda: result.update(run=env.actions.run_action(env.action_id, "Srv1", dry_run=False, on_started=run_ids.append))
+    )
+    worker.start()
+
+    # Another connection (as the UI would use) sees the run and its first line.
+    reader = ActionsStore(SqliteStore(tmp_path / "data.sqlite3"), ServerStore(env.backend))
+    deadline = time.monotonic() + 5
+    tail = None
+    while time.monotonic() < deadline:
+        if run_ids:
+            tail = reader.tail_run(run_ids[0])
+            if tail is not None and tail.chunks:
+                break
+        time.sleep(0.05)
+    assert tail is not None
+    assert tail.status == "running"
+    assert tail.chunks == [("stdout", "first\n")]
+    assert reader.query_runs(status="running").runs[0].id == run_ids[0]
+    partial = reader.get_run_output(run_ids[0])
+    assert partial is not None and partial.stdout == "first\n"
+    assert reader.tail_run(run_ids[0], tail.next_seq).chunks in ([], [("stdout", "second\n")])
+
+    worker.join()
+    run = result["run"]
+    assert run.id == run_ids[0] and run.status == "success"
+    assert reader.tail_run(run.id).status == "success"
+    output = reader.get_run_output(run.id)
+    assert output is not None and output.stdout == "first\nsecond\n"
+    assert _chunk_count(env.backend) == 0
+    assert [m.run_id for m in env.actions.search_run_output("second")] == [run.id]
+    assert env.actions.run_stats()[0].runs == 1
+    # Filling in the output refs kept the blob refcounts right.
+    refcounts = env.backend._conn.execute("SELECT refcount FROM output_blobs").fetchall()
+    assert [row[0] for row in refcounts] == [1, 1]
+
+
+def test_orphaned_runs_recovered_as_interrupted(tmp_path: Path) -> None:
+    db_path = tmp_path / "data.sqlite3"
+    env = make_env(db_path, command="long-job")
+    server_id = env.backend.server_id("Srv1")
+    # A run whose process died after printing some output.
+    run_id = env.actions._start_run(env.action_id, server_id, "2024-01-01T00:00:00+00:00", "long-job")
+    writer = LiveOutputWriter(env.backend, run_id)
+    writer.write("stdout", "step 1 done\n".encode())
+    writer.write("stderr", b"warning: disk\n")
+    writer.close()
+    env.backend._conn.execute("UPDATE action_run_chunks SET written_at = '2024-01-01T00:00:42+00:00'")
+    env.backend.commit()
+    env.backend.close()
+
+    backend = SqliteStore(db_path)
+    actions = ActionsStore(backend, ServerStore(backend))
+    assert actions.recover_interrupted_runs() == 1
+    assert actions.recover_interrupted_runs() == 0
+    run = actions.query_runs().runs[0]
+    assert (run.status, run.exit_code, run.duration_ms) == ("interrupted", None, 42_000)
+    output = actions.get_run_output(run_id)
+    assert output is not None
+    assert (output.command_rendered, output.stdout, output.stderr) == ("long-job", "step 1 done\n", "warning: disk\n")
+    assert _chunk_count(backend) == 0
+    assert [m.run_id for m in actions.search_run_output("step 1")] == [run_id]
+
+
+def test_live_writer_decodes_split_characters_and_caps_output(tmp_path: Path) -> None:
+    env = make_env(tmp_path / "data.sqlite3", command="x")
+    run_id = env.actions._start_run(env.action_id, env.backend.server_id("Srv1"), "2024-01-01T00:00:00+00:00", "x")
+    writer = LiveOutputWriter(env.backend, run_id, limit_bytes=16)
+    data = "héllo wörld\n".encode()
+    for i in range(len(data)):
+        writer.write("stdout", data[i : i + 1])
+    writer.write("stdout", b"0123456789")
+    writer.close()
+
+    output = env.actions.get_run_output(run_id)
+    assert output is not None
+    # 14 bytes of text, then 2 of the digits fit in the limit
+    assert output.stdout == "héllo wörld\n01\n[... live output limit reached ...]\n"
+
+
+def test_server_deleted_while_running(tmp_path: Path) -> None:
+    script = "import time; print('first', flush=True); time.sleep(1); print('second', flush=True); time.sleep(0.6)"
+    env = make_env(tmp_path / "data.sqlite3", command=f'"{sys.executable}" -c "{script}"')
+    run_ids: list[int] = []
+    result = {}
+
+    def work() -> None:
+        try:
+            result["run"] = env.actions.run_action(env.action_id, "Srv1", dry_run=False, on_started=run_ids.append)
+        except Exception as exc:
+            result["error"] = exc
+
+    worker = threading.Thread(target=work)
+    worker.start()
+    while not run_ids or not env.actions.tail_run(run_ids[0]).chunks:
+        time.sleep(0.05)
+    # The run's row goes with its server; later chunks no longer have a parent.
+    env.servers.delete_server("Srv1")
+    worker.join()
+
+    assert "error" not in result
+    assert result["run"].status == "success" and result["run"].stdout == "first\nsecond\n"
+    assert env.actions.tail_run(run_ids[0]) is None
+    assert _chunk_count(env.backend) == 0
+
+
+def test_flush_drops_only_deleted_runs(tmp_path: Path) -> None:
+    env = make_env(tmp_path / "data.sqlite3")
+    server_id = env.backend.server_id("Srv1")
+    kept, gone = (env.actions._start_run(env.action_id, server_id, "2024-01-01T00:00:00+00:00", "x") for _ in range(2))
+    writers = [LiveOutputWriter(env.backend, run_id, ticker=False) for run_id in (kept, gone)]
+    env.backend._conn.execute("DELETE FROM action_runs WHERE id = ?", (gone,))
+    env.backend.commit()
+    for writer in writers:
+        writer.write("stdout", b"hello\n")
+
+    flush_many(env.backend, writers)
+    assert env.actions.tail_run(kept).chunks == [("stdout", "hello\n")]
+    assert not writers[1].has_pending()
+    writers[1].write("stdout", b"more\n")
+    assert not writers[1].has_pending()
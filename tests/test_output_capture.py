@@ -0,0 +1,110 @@
+import asyncio
+import gc
+import sys
+import warnings
+from pathlib import Path
+
+from myservers.connectors.capture import HEAD_BYTES, BoundedBuffer, run_bounded, run_bounded_async
+from myservers.connectors.exec_local import execute, execute_capture
+from myservers.core.actions import ActionsStore
+from myservers.core.models import HostSet, Server
+from myservers.core.servers import ServerStore
+from myservers.storage.sqlite_store import SqliteStore
+
+
+def test_bounded_buffer_keeps_head_and_tail() -> None:
+    buf = BoundedBuffer(head_bytes=10, tail_bytes=5)
+    for _ in range(1000):
+        buf.write(b"0123456789")
+    buf.write(b"END")
+    assert buf.total_bytes == 10003
+    assert buf.truncated
+    assert buf.text() == "0123456789\n[... 9988 bytes omitted ...]\n89END"
+
+    small = BoundedBuffer(head_bytes=10, tail_bytes=5)
+    small.write(b"abc")
+    small.write(b"defghijklm")
+    assert not small.truncated
+    assert small.text() == "abcdefghijklm"
+
+
+def test_bounded_buffer_decodes_across_the_head_boundary() -> None:
+    for text in ("a" * (HEAD_BYTES - 1) + "é" + "b" * 100, "a" * (HEAD_BYTES - 1) + "\r\nb"):
+        buf = BoundedBuffer()
+        buf.write(text.encode())
+        assert not buf.truncated
+        assert buf.text() == text.replace("\r\n", "\n")
+
+
+def test_run_bounded_caps_large_output() -> None:
+    script = "import sys; sys.stdout.write('x' * 5_000_000 + 'TAIL'); sys.stderr.write('warn')"
+    result = run_bounded([sys.executable, "-c", script], head_bytes=1024, tail_bytes=1024)
+    assert result.exit_code == 0
+    assert result.stdout_bytes == 5_000_004
+    assert result.stdout_truncated and not result.stderr_truncated
+    assert result.stdout.endswith("TAIL")
+    assert "bytes omitted" in result.stdout
+    assert len(result.stdout) < 3000
+    assert result.stderr == "warn"
+
+
+def test_run_bounded_timeout() -> None:
+    result = run_bounded([sys.executable, "-c", "import time; print('started', flush=True); time.sleep(30)"], timeout_s=0.5)
+    assert result.timed_out
+    assert result.exit_code == -1
+    assert result.stdout.strip() == "started"
+    assert result.stderr.endswith("[timeout]")
+    assert result.duration_ms < 10_000
+
+
+def test_run_bounded_timeout_covers_background_children() -> None:
+    # The shell exits at once, but its background child holds the pipes open.
+    script = f'"{sys.executable}" -c "import time; time.sleep(8)" & echo hi'
+    for result in (
+        run_bounded(script, shell=True, timeout_s=1),
+        asyncio.run(run_bounded_async(script, shell=True, timeout_s=1)),
+    ):
+        assert result.timed_out and result.exit_code == -1
+        assert result.stdout == "hi\n" and result.stderr.endswith("[timeout]")
+        assert result.duration_ms < 4000
+
+
+
+def test_run_bounded_async_stops_reading_after_child_leaves_group() -> None:
+    # The child moves to its own session, so killing the group misses it.
+    script = f'"{sys.executable}" -c "import os, time; os.setsid(); time.sleep(8)" & echo hi'
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        result = asyncio.run(run_bounded_async(script, shell=True, timeout_s=1, grace_s=0.2))
+        gc.collect()
+    assert result.timed_out and result.stdout == "hi\n"
+    # Its pipes were closed with the loop, not left to the garbage collector.
+    assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
+    assert result.duration_ms < 6000
+
+def test_execute_keeps_tuple_shape() -> None:
+    ec, out, err, duration_ms = execute(f'"{sys.executable}" -c "print(\'ok\')"')
+    assert (ec, out.strip(), err) == (0, "ok", "")
+    result = execute_capture(f'"{sys.executable}" -c "import sys; sys.exit(3)"')
+    assert result.exit_code == 3 and result.stdout_bytes == 0
+
+
+def test_action_run_reports_truncation(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+    actions = ActionsStore(backend, store)
+    store.create_server(Server(name="Srv1", hosts=HostSet()))
+    action_id = actions.create_action(
+        name="Chatty",
+        description=None,
+        command_template=f'"{sys.executable}" -c "print(\'y\' * 1_000_000)"',
+        requires_confirm=False,
+    )
+
+    run = actions.run_action(action_id, "Srv1", dry_run=False)
+    assert run.status == "success"
+    assert run.output_truncated
+    assert run.stdout_bytes > 1_000_000
+    assert "bytes omitted" in run.stdout
+    output = actions.get_run_output(run.id)
+    assert output is not None and output.stdout == run.stdout
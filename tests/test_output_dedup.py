@@ -0,0 +1,78 @@
+import sqlite3
+from pathlib import Path
+
+from myservers.core.actions import ActionsStore
+from myservers.core.servers import ServerStore
+from myservers.storage.compression import compress_text
+from myservers.storage.migrations import MIGRATIONS
+from myservers.storage.sqlite_store import SqliteStore
+from tests.helpers import make_env
+
+
+def _blobs(backend: SqliteStore) -> list[tuple[int, int]]:
+    return [tuple(row) for row in backend._conn.execute("SELECT size, refcount FROM output_blobs ORDER BY size")]
+
+
+def test_identical_outputs_stored_once_and_grouped(tmp_path: Path) -> None:
+    env = make_env(tmp_path / "data.sqlite3", 10, command="cat /etc/os-release", action_name="OS")
+    backend, actions = env.backend, env.actions
+    common = 'NAME="Debian GNU/Linux"\nVERSION_ID="12"\n'
+    odd = 'NAME="Ubuntu"\nVERSION_ID="20.04"\n'
+    run_ids = [
+        env.add_run(
+            f"Srv{i:02d}",
+            "2024-01-01T00:00:00+00:00",
+            finished_at="2024-01-01T00:00:01+00:00",
+            duration_ms=1000,
+            stdout=odd if i in (3, 7) else common,
+        )
+        for i in range(10)
+    ]
+
+    # one blob for the command, one per distinct stdout
+    assert _blobs(backend) == [(len("cat /etc/os-release"), 10), (len(odd), 2), (len(common), 8)]
+
+    groups = actions.output_groups(run_ids=run_ids)
+    assert [g.runs for g in groups] == [8, 2]
+    assert groups[0].stdout == common
+    assert groups[1].server_names == ["Srv03", "Srv07"]
+    assert len(groups[1].output_hash) == 64
+    assert actions.output_groups(run_ids=run_ids[:2]) != groups
+    output = actions.get_run_output(run_ids[3])
+    assert output is not None and output.stdout == odd
+
+    # Dropping references releases blobs once nobody uses them.
+    env.servers.delete_server("Srv03")
+    assert _blobs(backend)[1] == (len(odd), 1)
+    env.servers.delete_server("Srv07")
+    assert [size for size, _ in _blobs(backend)] == [len("cat /etc/os-release"), len(common)]
+
+
+def test_existing_outputs_deduplicated_by_migration(tmp_path: Path) -> None:
+    db_path = tmp_path / "data.sqlite3"
+    # A schema version 8 database: one compressed copy of the output per run.
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    for _, _, step in MIGRATIONS[:8]:
+        step(cur)
+    conn.execute("INSERT INTO actions(name, command_template) VALUES ('Uptime', 'uptime')")
+    for i in range(3):
+        conn.execute("INSERT INTO servers(name) VALUES (?)", (f"Srv{i}",))
+        conn.execute(
+            "INSERT INTO action_runs(action_id, server_id, started_at, status) VALUES (1, ?, '2024-01-01', 'success')",
+            (i + 1,),
+        )
+        conn.execute(
+            "INSERT INTO action_run_output(run_id, command_rendered, stdout, stderr) VALUES (?, ?, ?, NULL)",
+            (i + 1, compress_text("uptime"), compress_text("up 3 days" if i else "up 9 days")),
+        )
+    conn.execute("PRAGMA user_version = 8")
+    conn.commit()
+    conn.close()
+
+    backend = SqliteStore(db_path)
+    actions = ActionsStore(backend, ServerStore(backend))
+    assert _blobs(backend) == [(6, 3), (9, 1), (9, 2)]
+    assert [(g.runs, g.stdout) for g in actions.output_groups(action=1)] == [(2, "up 3 days"), (1, "up 9 days")]
+    output = actions.get_run_output(3)
+    assert output is not None and (output.command_rendered, output.stdout) == ("uptime", "up 3 days")
@@ -0,0 +1,91 @@
+import secrets
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from myservers.core.retention import RetentionPolicy, compact, prune_history
+from myservers.storage.sqlite_store import SqliteStore
+from tests.helpers import RunEnv, make_env
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def _add_run(env: RunEnv, days_ago: float, status: str = "success", stdout: str = "x" * 2000) -> int:
+    return env.add_run("Srv1", (NOW - timedelta(days=days_ago)).isoformat(), status=status, stdout=stdout)
+
+
+def _run_ids(backend: SqliteStore) -> list[int]:
+    return [row[0] for row in backend._conn.execute("SELECT id FROM action_runs ORDER BY id")]
+
+
+def test_prune_by_age_and_count_keeps_last_failure(tmp_path: Path) -> None:
+    env = make_env(tmp_path / "data.sqlite3")
+    backend = env.backend
+    old_failure = _add_run(env, days_ago=100, status="error")
+    old_success = _add_run(env, days_ago=95)
+    recent = [_add_run(env, days_ago=d) for d in (5, 4, 3, 2, 1)]
+
+    report = prune_history(
+        backend,
+        RetentionPolicy(max_age_days=90, max_runs_per_action_server=3, keep_last_failure=True),
+        batch_size=2,
+        now=NOW,
+    )
+
+    assert report.runs_deleted == 3
+    assert _run_ids(backend) == [old_failure] + recent[2:]
+    assert old_success not in _run_ids(backend)
+    assert backend._conn.execute("SELECT COUNT(*) FROM action_run_output").fetchone()[0] == 4
+
+    prune_history(backend, RetentionPolicy(max_age_days=90, keep_last_failure=False), now=NOW)
+    assert _run_ids(backend) == recent[2:]
+
+
+def test_prune_reclaims_space(tmp_path: Path) -> None:
+    env = make_env(tmp_path / "data.sqlite3")
+    backend = env.backend
+    assert backend._conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2  # incremental
+    conn = backend._conn
+    with backend.transaction():
+        for i in range(300):
+            # incompressible output so the runs occupy real pages
+            _add_run(env, days_ago=200, stdout=secrets.token_urlsafe(4000))
+
+    report = prune_history(backend, RetentionPolicy(max_age_days=30), now=NOW)
+
+    assert report.runs_deleted == 300
+    assert report.bytes_reclaimed > 300 * 4000 * 0.8
+    assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+
+def test_compact_refuses_to_commit_an_open_transaction(tmp_path: Path) -> None:
+    env = make_env(tmp_path / "data.sqlite3")
+    with pytest.raises(RuntimeError):
+        with env.backend.transaction():
+            _add_run(env, days_ago=1)
+            with pytest.raises(sqlite3.ProgrammingError):
+                compact(env.backend)
+            with pytest.raises(sqlite3.ProgrammingError):
+                prune_history(env.backend, RetentionPolicy(max_age_days=30), now=NOW)
+            raise RuntimeError("caller gives up")
+    # The caller's rollback still undid its write.
+    assert _run_ids(env.backend) == []
+
+def test_prune_script_runs_headless(tmp_path: Path, capsys) -> None:
+    db_path = tmp_path / "data.sqlite3"
+    env = make_env(db_path)
+    backend = env.backend
+    _add_run(env, days_ago=10000)
+    backend.close()
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+    try:
+        import prune_history as script
+    finally:
+        sys.path.pop(0)
+
+    assert script.main(["--db", str(db_path), "--max-age-days", "30"]) == 0
+    assert "Deleted 1 runs" in capsys.readouterr().out
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from myservers.connectors.capture import CancelToken, run_bounded, run_bounded_async
+from myservers.core.actions import ActionsStore
+from myservers.core.models import HostSet, Server
+from myservers.core.scheduler import ConcurrencyLimits, RunScheduler
+from myservers.core.servers import ServerStore
+from myservers.storage.sqlite_store import SqliteStore
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="process groups are POSIX only")
+
+# Prints its pid, then ignores SIGTERM and sleeps: only SIGKILL stops it.
+STUBBORN = "import os, signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print(os.getpid(), flush=True); time.sleep(30)"
+
+
+def _alive(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            # Reparented children may stay zombies if nothing reaps them here.
+            return fh.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def _cancel_when_output(cancel: CancelToken, pids: list[int]):
+    def on_output(_stream: str, data: bytes) -> None:
+        pids.extend(int(line) for line in data.split())
+        cancel.cancel()
+
+    return on_output
+
+
+def test_timeout_kills_the_whole_process_group() -> None:
+    # The shell's background child used to survive the timeout and hold the pipes open.
+    script = f'"{sys.executable}" -c "import time; time.sleep(30)" & echo $!; wait'
+    start = time.monotonic()
+    result = run_bounded(script, shell=True, timeout_s=0.5)
+    assert result.timed_out and result.exit_code == -1
+    assert time.monotonic() - start < 3
+    assert not _alive(int(result.stdout))
+
+
+def test_cancel_escalates_to_sigkill() -> None:
+    cancel = CancelToken()
+    pids: list[int] = []
+    start = time.monotonic()
+    result = run_bounded(
+        [sys.executable, "-c", STUBBORN], cancel=cancel, grace_s=0.3, on_output=_cancel_when_output(cancel, pids)
+    )
+    assert result.cancelled and not result.timed_out
+    assert result.exit_code == -1 and result.stderr.endswith("[cancelled]")
+    assert 0.3 <= time.monotonic() - start < 5
+    assert not _alive(pids[0])
+
+    cancelled_async = asyncio.run(
+        run_bounded_async([sys.executable, "-c", "import time; time.sleep(30)"], cancel=cancel)
+    )
+    # Already cancelled: stopped right away.
+    assert cancelled_async.cancelled and cancelled_async.duration_ms < 3000
+
+
+def test_async_cancel_from_another_thread() -> None:
+    cancel = CancelToken()
+    pids: list[int] = []
+
+    async def main() -> None:
+        def on_output(_stream: str, data: bytes) -> None:
+            pids.append(int(data))
+            threading.Timer(0.1, cancel.cancel).start()
+
+        return await run_bounded_async(
+            [sys.executable, "-c", STUBBORN], cancel=cancel, grace_s=0.3, on_output=on_output
+        )
+
+    result = asyncio.run(main())
+    assert result.cancelled and result.exit_code == -1
+    assert not _alive(pids[0])
+
+
+def test_fleet_abort_records_cancelled_runs(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+    for name in ("A", "B", "C"):
+        store.create_server(Server(name=name, hosts=HostSet(internal_primary="10.0.0.1")))
+    # One run at a time on the shared host: B and C wait for A's slot.
+    actions = ActionsStore(backend, store, scheduler=RunScheduler(ConcurrencyLimits(per_host=1)))
+    script = "import time; print('started', flush=True); time.sleep(30)"
+    action_id = actions.create_action(
+        name="Hang", description=None, command_template=f'"{sys.executable}" -c "{script}"', requires_confirm=False
+    )
+
+    cancel = CancelToken()
+
+    def abort_once_running() -> None:
+        while not actions.query_runs(status="running").runs:
+            time.sleep(0.05)
+        time.sleep(0.2)
+        cancel.cancel()
+
+    threading.Thread(target=abort_once_running, daemon=True).start()
+    start = time.monotonic()
+    fleet = actions.run_action_many(action_id, ["A", "B", "C"], dry_run=False, max_workers=3, cancel=cancel)
+    assert fleet.summary() == {"cancelled": 3}
+    assert time.monotonic() - start < 10
+
+    runs = actions.query_runs(status="cancelled").runs
+    assert len(runs) == 3
+    outputs = [actions.get_run_output(run.id) for run in runs]
+    assert sum(o.stdout == "started\n" for o in outputs) == 1
+    assert sum("[cancelled before start]" in o.stderr for o in outputs) == 2
+    # Cancelled runs are not timings of the command.
+    assert actions.run_stats(group_by="action") == []
+
+    single = CancelToken()
+    run = actions.run_action(
+        action_id, "A", dry_run=False, cancel=single, on_started=lambda _: threading.Timer(0.3, single.cancel).start()
+    )
+    assert run.status == "cancelled" and run.exit_code == -1
+    assert actions.tail_run(run.id).status == "cancelled"
@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from myservers.core.actions import ActionsStore
+from tests.helpers import make_env
+
+
+def _setup(tmp_path: Path) -> ActionsStore:
+    env = make_env(tmp_path / "data.sqlite3", ("Srv1", "Srv2"), command="uptime", action_name="Uptime")
+    with env.backend.transaction():
+        for i in range(1200):
+            started = f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}+00:00"
+            env.add_run(
+                "Srv1" if i % 3 else "Srv2",
+                started,
+                status="success" if i % 10 else "error",
+                duration_ms=i,
+                stdout=f"up {i} days, \"load\", ok",
+            )
+    return env.actions
+
+
+def test_export_ndjson_streams_all_runs_in_order(tmp_path: Path) -> None:
+    actions = _setup(tmp_path)
+    fh = io.StringIO()
+    assert actions.export_runs(fh) == 1200
+    records = [json.loads(line) for line in fh.getvalue().splitlines()]
+    assert len(records) == 1200
+    assert [r["duration_ms"] for r in records] == list(range(1200))
+    assert records[0] == {
+        "id": records[0]["id"],
+        "started_at": "2024-01-01T00:00:00+00:00",
+        "finished_at": "2024-01-01T00:00:00+00:00",
+        "server": "Srv2",
+        "action": "Uptime",
+        "status": "error",
+        "exit_code": 1,
+        "duration_ms": 0,
+        "queue_wait_ms": 0,
+        "host": None,
+    }
+
+
+def test_export_csv_with_output_and_filters(tmp_path: Path) -> None:
+    actions = _setup(tmp_path)
+    fh = io.StringIO()
+    count = actions.export_runs(fh, "csv", include_output=True, server="Srv2", status="error")
+    rows = list(csv.DictReader(io.StringIO(fh.getvalue())))
+    assert count == len(rows) == 40
+    assert {r["server"] for r in rows} == {"Srv2"}
+    assert rows[1]["stdout"] == 'up 30 days, "load", ok'
+    assert rows[1]["command_rendered"] == "uptime"
+
+    assert actions.export_runs(io.StringIO(), server="Missing") == 0
+    with pytest.raises(ValueError):
+        actions.export_runs(io.StringIO(), "xml")
@@ -0,0 +1,85 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+from myservers.core.actions import ServerResult
+from tests.helpers import make_env
+
+
+def test_runs_servers_concurrently(tmp_path: Path) -> None:
+    command = f'"{sys.executable}" -c "import time; time.sleep(0.5); print(\'{{{{server.name}}}}\')"'
+    env = make_env(tmp_path / "data.sqlite3", 8, command=command)
+    names = [f"Srv{i:02d}" for i in range(8)]
+    seen: list[ServerResult] = []
+    lock = threading.Lock()
+
+    def on_result(result: ServerResult) -> None:
+        with lock:
+            seen.append(result)
+
+    start = time.monotonic()
+    fleet = env.actions.run_action_many(env.action_id, names, dry_run=False, max_workers=8, on_result=on_result)
+    elapsed = time.monotonic() - start
+
+    # Sequential execution would take at least 4s.
+    assert elapsed < 3
+    assert fleet.summary() == {"success": 8}
+    assert [r.server_name for r in fleet.results] == names
+    assert [r.run.stdout for r in fleet.results if r.run] == [f"{name}\n" for name in names]
+    assert sorted(r.server_name for r in seen) == names
+    assert len(fleet.run_ids) == 8
+    assert len(env.actions.query_runs(action=env.action_id).runs) == 8
+    assert env.actions.run_stats(group_by="action")[0].runs == 8
+
+
+def test_failures_are_reported_per_server(tmp_path: Path) -> None:
+    command = f'"{sys.executable}" -c "import sys; sys.exit(1 if \'{{{{server.name}}}}\' == \'Srv01\' else 0)"'
+    env = make_env(tmp_path / "data.sqlite3", 3, command=command)
+
+    fleet = env.actions.run_action_many(env.action_id, ["Srv00", "Nope", "Srv01", "Srv02"], dry_run=False, max_workers=2)
+
+    assert [r.status for r in fleet.results] == ["success", "not_run", "error", "success"]
+    assert fleet.results[1].error == "Server not found"
+    assert fleet.summary() == {"success": 2, "not_run": 1, "error": 1}
+    groups = env.actions.output_groups(run_ids=fleet.run_ids)
+    assert sum(g.runs for g in groups) == 3
+
+
+def test_dry_run_and_write_behind(tmp_path: Path) -> None:
+    env = make_env(tmp_path / "data.sqlite3", 4, command="echo {{host}}", write_behind=True)
+    names = [f"Srv{i:02d}" for i in range(4)]
+
+    dry = env.actions.run_action_many(env.action_id, names, dry_run=True)
+    assert dry.summary() == {"dry_run": 4}
+    assert [r.run.command_rendered for r in dry.results if r.run] == [f"echo 10.0.0.{i + 1}" for i in range(4)]
+
+    fleet = env.actions.run_action_many(env.action_id, names, dry_run=False, max_workers=4)
+    assert fleet.summary() == {"success": 4}
+    # Write-behind runs have no id until they are saved.
+    assert fleet.run_ids == []
+    env.actions.flush()
+    groups = env.actions.output_groups(action=env.action_id, status="success")
+    assert sorted(g.stdout for g in groups) == [f"10.0.0.{i + 1}\n" for i in range(4)]
+    env.actions.close()
+
+
+def test_fan_out_shares_one_output_flusher(tmp_path: Path) -> None:
+    script = "import time; print('working', flush=True); time.sleep(1.5); print('done')"
+    env = make_env(tmp_path / "data.sqlite3", 6, command=f'"{sys.executable}" -c "{script}"')
+    worker = threading.Thread(
+        target=lambda: env.actions.run_action_many(env.action_id, [f"Srv{i:02d}" for i in range(6)], dry_run=False)
+    )
+    worker.start()
+    deadline = time.monotonic() + 5
+    streaming: list[int] = []
+    while time.monotonic() < deadline and len(streaming) < 6:
+        streaming = [run.id for run in env.actions.query_runs(status="running").runs if env.actions.tail_run(run.id).chunks]
+        time.sleep(0.05)
+    flushers = [thread.name for thread in threading.enumerate() if thread.name.startswith("live-output")]
+    worker.join()
+
+    # Every run's live output was written by the one fleet flusher.
+    assert len(streaming) == 6
+    assert flushers == ["live-output"]
+    assert [env.actions.get_run_output(run_id).stdout for run_id in streaming] == ["working\ndone\n"] * 6
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from myservers.core.actions import ActionsStore
+from myservers.storage.sqlite_store import SqliteStore
+from tests.helpers import make_env
+
+BASE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _setup(tmp_path: Path) -> tuple[SqliteStore, ActionsStore, int]:
+    env = make_env(tmp_path / "data.sqlite3", ("Srv1", "Srv2"))
+    with env.backend.transaction():
+        for i in range(25):
+            # pairs of runs share a timestamp so paging has to break ties on id
+            started = (BASE + timedelta(minutes=i // 2)).isoformat()
+            env.add_run("Srv1" if i % 2 == 0 else "Srv2", started, status="error" if i % 5 == 0 else "success", duration_ms=i)
+    return env.backend, env.actions, env.action_id
+
+
+def test_query_runs_pages_through_everything_in_order(tmp_path: Path) -> None:
+    _, actions, _ = _setup(tmp_path)
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        page = actions.query_runs(after_cursor=cursor, page_size=10)
+        seen.extend(page.runs)
+        pages += 1
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+    assert pages == 3
+    assert len({r.id for r in seen}) == 25
+    keys = [(r.started_at, r.id) for r in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert seen[0].action_name == "Check"
+
+
+def test_query_runs_filters(tmp_path: Path) -> None:
+    _, actions, action_id = _setup(tmp_path)
+    srv1 = actions.query_runs(server="Srv1", page_size=100).runs
+    assert len(srv1) == 13 and {r.server_name for r in srv1} == {"Srv1"}
+    errors = actions.query_runs(status="error", action=action_id).runs
+    assert [r.duration_ms for r in errors] == [20, 15, 10, 5, 0]
+    window = actions.query_runs(
+        since=(BASE + timedelta(minutes=2)).isoformat(), until=(BASE + timedelta(minutes=4)).isoformat()
+    ).runs
+    assert sorted(r.duration_ms for r in window) == [4, 5, 6, 7]
+    assert actions.query_runs(server="Missing").runs == []
+
+
+def test_query_runs_seeks_on_index(tmp_path: Path) -> None:
+    backend, actions, _ = _setup(tmp_path)
+    statements: list[str] = []
+    backend._conn.set_trace_callback(statements.append)
+    page = actions.query_runs(page_size=5)
+    actions.query_runs(server="Srv1", after_cursor=page.next_cursor, page_size=5)
+    backend._conn.set_trace_callback(None)
+    for sql in [s for s in statements if "FROM action_runs" in s]:
+        plan = " ".join(row[3] for row in backend._conn.execute("EXPLAIN QUERY PLAN " + sql))
+        assert "TEMP B-TREE" not in plan
+        assert "idx_action_runs_" in plan
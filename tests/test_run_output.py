@@ -0,0 +1,76 @@
+import sqlite3
+from pathlib import Path
+
+from myservers.core.actions import ActionsStore
+from myservers.core.models import HostSet, Server
+from myservers.core.servers import ServerStore
+from myservers.storage.migrations import MIGRATIONS
+from myservers.storage.sqlite_store import SqliteStore
+
+
+def test_run_output_stored_compressed_out_of_row(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+    actions = ActionsStore(backend, store)
+    store.create_server(Server(name="Srv1", hosts=HostSet(internal_primary="10.0.0.1")))
+    action_id = actions.create_action(
+        name="Repeat",
+        description=None,
+        command_template="python -c \"print('line of output\\n' * 2000)\"",
+        requires_confirm=False,
+    )
+
+    run = actions.run_action(action_id, "Srv1", dry_run=False)
+
+    conn = backend._conn
+    inline = conn.execute("SELECT command_rendered, stdout, stderr FROM action_runs WHERE id = ?", (run.id,)).fetchone()
+    assert tuple(inline) == (None, None, None)
+    blob = conn.execute(
+        "SELECT b.data FROM action_run_output o JOIN output_blobs b ON b.id = o.stdout_id WHERE o.run_id = ?",
+        (run.id,),
+    ).fetchone()[0]
+    assert len(blob) * 10 < len(run.stdout)
+
+    output = actions.get_run_output(run.id)
+    assert output is not None
+    assert output.stdout == run.stdout
+    assert output.command_rendered == run.command_rendered
+    assert actions.get_run_output(run.id + 1) is None
+
+    conn.execute("DELETE FROM action_runs WHERE id = ?", (run.id,))
+    assert conn.execute("SELECT COUNT(*) FROM action_run_output").fetchone()[0] == 0
+    assert conn.execute("SELECT COUNT(*) FROM output_blobs").fetchone()[0] == 0
+
+
+def _database_at(db_path: Path, version: int) -> sqlite3.Connection:
+    """Create a database as an older release (schema version `version`) left it."""
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    for _, _, step in MIGRATIONS[:version]:
+        step(cur)
+    conn.execute(f"PRAGMA user_version = {version}")
+    conn.execute("INSERT INTO servers(name) VALUES ('Srv1')")
+    conn.execute("INSERT INTO actions(name, command_template) VALUES ('Noop', 'true')")
+    return conn
+
+
+def test_existing_run_output_moved_by_migration(tmp_path: Path) -> None:
+    db_path = tmp_path / "data.sqlite3"
+    # Output stored inline in action_runs, before it moved out.
+    conn = _database_at(db_path, 5)
+    conn.execute(
+        """
+        INSERT INTO action_runs(action_id, server_id, status, command_rendered, stdout, stderr)
+        VALUES (1, 1, 'success', 'echo hi', 'hi', '')
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    backend = SqliteStore(db_path)
+    actions = ActionsStore(backend, ServerStore(backend))
+    row = backend._conn.execute("SELECT id, stdout FROM action_runs").fetchone()
+    assert row["stdout"] is None
+    output = actions.get_run_output(row["id"])
+    assert output is not None
+    assert (output.command_rendered, output.stdout, output.stderr) == ("echo hi", "hi", "")
@@ -0,0 +1,80 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from myservers.core.actions import ActionsStore
+from myservers.core.retention import RetentionPolicy, prune_history
+from myservers.core.servers import ServerStore
+from myservers.storage.compression import compress_text
+from myservers.storage.migrations import MIGRATIONS
+from myservers.storage.sqlite_store import SqliteStore
+from tests.helpers import RunEnv, make_env
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+SERVERS = ("Web1", "Web2", "Db1")
+
+
+def _add_run(env: RunEnv, server: str, days_ago: int, stdout: str, stderr: str = "") -> int:
+    started = (NOW - timedelta(days=days_ago)).isoformat()
+    return env.add_run(server, started, status="error" if stderr else "success", duration_ms=5, stdout=stdout, stderr=stderr)
+
+
+def _indexed_ids(backend: SqliteStore, phrase: str) -> list[int]:
+    rows = backend._conn.execute("SELECT rowid FROM run_output_search WHERE run_output_search MATCH ?", (f'"{phrase}"',))
+    return sorted(row[0] for row in rows)
+
+
+def test_search_run_output_returns_servers_and_snippets(tmp_path: Path) -> None:
+    env = make_env(tmp_path / "data.sqlite3", SERVERS, command="check", action_name="Health")
+    actions = env.actions
+    noise = "all good\n" * 500
+    _add_run(env, "Web1", 3, noise)
+    web2 = _add_run(env, "Web2", 2, noise, "nginx: Connection refused by upstream 10.0.0.5")
+    db1 = _add_run(env, "Db1", 1, "log:\nFATAL connection REFUSED on port 5432\n" + noise)
+
+    matches = actions.search_run_output("connection refused")
+    assert [(m.run_id, m.server_name, m.stream) for m in matches] == [(db1, "Db1", "stdout"), (web2, "Web2", "stderr")]
+    assert "FATAL connection REFUSED on port 5432" in matches[0].snippet
+    assert len(matches[0].snippet) < 200
+    assert actions.search_run_output("connection refused", limit=1)[0].run_id == db1
+    assert actions.search_run_output("refused connection") == []
+    assert actions.search_run_output("  ") == []
+
+
+def test_search_run_output_skips_deleted_runs(tmp_path: Path) -> None:
+    env = make_env(tmp_path / "data.sqlite3", SERVERS, command="check", action_name="Health")
+    backend, actions = env.backend, env.actions
+    old = _add_run(env, "Web1", 200, "disk full on /var")
+    recent = _add_run(env, "Web2", 1, "disk full on /var")
+    gone = _add_run(env, "Db1", 1, "disk full on /var")
+
+    prune_history(backend, RetentionPolicy(max_age_days=90), now=NOW)
+    assert _indexed_ids(backend, "disk full") == [recent, gone]
+
+    # Cascaded deletes leave the index entry behind; search must not return it.
+    env.servers.delete_server("Db1")
+    assert [m.run_id for m in actions.search_run_output("disk full")] == [recent]
+    assert old not in _indexed_ids(backend, "disk full")
+
+
+def test_run_output_index_backfilled_by_migration(tmp_path: Path) -> None:
+    db_path = tmp_path / "data.sqlite3"
+    # A database from before the index existed (schema version 7).
+    conn = sqlite3.connect(db_path)
+    cur = conn.cursor()
+    for _, _, step in MIGRATIONS[:7]:
+        step(cur)
+    conn.execute("INSERT INTO servers(name) VALUES ('Web1')")
+    conn.execute("INSERT INTO actions(name, command_template) VALUES ('Health', 'check')")
+    conn.execute("INSERT INTO action_runs(action_id, server_id, started_at, status) VALUES (1, 1, '2024-01-01', 'success')")
+    conn.execute(
+        "INSERT INTO action_run_output(run_id, command_rendered, stdout, stderr) VALUES (1, ?, ?, NULL)",
+        (compress_text("check"), compress_text("segfault in worker 3")),
+    )
+    conn.execute("PRAGMA user_version = 7")
+    conn.commit()
+    conn.close()
+
+    backend = SqliteStore(db_path)
+    actions = ActionsStore(backend, ServerStore(backend))
+    assert [(m.run_id, m.server_name) for m in actions.search_run_output("segfault")] == [(1, "Web1")]
@@ -0,0 +1,90 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from myservers.core.actions import ActionsStore
+from myservers.core.models import HostSet, Server
+from myservers.core.run_persister import RunPersister
+from myservers.core.servers import ServerStore
+from myservers.storage.sqlite_store import SqliteStore
+
+
+def _count_runs(backend: SqliteStore) -> int:
+    return backend._conn.execute("SELECT COUNT(*) FROM action_runs").fetchone()[0]
+
+
+def test_write_behind_runs_are_saved_on_flush_and_close(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+    actions = ActionsStore(backend, store, write_behind=True)
+    store.create_server(Server(name="Srv1", hosts=HostSet(internal_primary="10.0.0.1")))
+    action_id = actions.create_action(name="Ping", description=None, command_template="ping {{host}}", requires_confirm=False)
+
+    runs = [actions.run_action(action_id, "Srv1", dry_run=True) for _ in range(20)]
+    assert {run.id for run in runs} == {0}
+    actions.flush()
+    assert _count_runs(backend) == 20
+    assert actions.query_runs().runs[0].status == "dry_run"
+
+    actions.run_action(action_id, "Srv1", dry_run=True)
+    actions.close()
+    assert _count_runs(backend) == 21
+    with pytest.raises(RuntimeError):
+        actions.run_action(action_id, "Srv1", dry_run=True)
+
+
+def test_persister_batches_and_applies_backpressure(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    gate = threading.Event()
+    written: list[int] = []
+
+    def insert(n: int) -> int:
+        gate.wait()
+        backend._conn.execute("INSERT INTO tags(name) VALUES (?)", (f"t{n}",))
+        backend.commit()
+        written.append(n)
+        return n
+
+    persister = RunPersister(backend, insert, max_pending=5, batch_size=100)
+    commits_before = backend._local_writes
+    persister.submit({"n": 0})
+    # wait until the writer has taken it and is blocked on the gate
+    deadline = time.monotonic() + 5
+    while persister.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    for n in range(1, 6):
+        persister.submit({"n": n})
+
+    blocked = threading.Thread(target=persister.submit, args=({"n": 6},))
+    blocked.start()
+    blocked.join(0.2)
+    assert blocked.is_alive()  # queue is full
+
+    gate.set()
+    blocked.join(5)
+    assert not blocked.is_alive()
+    persister.close()
+    assert sorted(written) == list(range(7))
+    # the first record is written alone; the ones that queued up behind it share commits
+    assert backend._local_writes - commits_before <= 3
+
+
+def test_persister_isolates_failing_records(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+
+    def insert(name: str) -> int:
+        if name == "bad":
+            raise ValueError("boom")
+        backend._conn.execute("INSERT INTO tags(name) VALUES (?)", (name,))
+        return 0
+
+    persister = RunPersister(backend, insert)
+    for name in ("a", "bad", "b"):
+        persister.submit({"name": name})
+    with pytest.raises(RuntimeError, match="1 run"):
+        persister.flush()
+    persister.close()
+    names = [row[0] for row in backend._conn.execute("SELECT name FROM tags ORDER BY name")]
+    assert names == ["a", "b"]
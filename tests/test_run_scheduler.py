@@ -0,0 +1,168 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+from myservers.core.actions import ActionsStore
+from myservers.core.models import HostSet, Server
+from myservers.core.scheduler import ConcurrencyLimits, RunScheduler
+from myservers.core.servers import ServerStore
+from myservers.core.tags_store import TagStore
+from myservers.storage.sqlite_store import SqliteStore
+
+
+def _hammer(scheduler: RunScheduler, keys: list[tuple[str, ...]], watch: str) -> int:
+    """Run one short job per keys entry in threads; the peak in_flight(watch)."""
+    peak = 0
+    lock = threading.Lock()
+
+    def job(slot_keys: tuple[str, ...]) -> None:
+        nonlocal peak
+        with scheduler.slot(slot_keys):
+            with lock:
+                peak = max(peak, scheduler.in_flight(watch))
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=job, args=(k,)) for k in keys]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return peak
+
+
+def test_host_global_and_tag_limits() -> None:
+    scheduler = RunScheduler(ConcurrencyLimits(max_in_flight=5, per_host=2, per_tag={"bastion": 1}))
+    assert scheduler.keys("h1", ["bastion", "web"]) == ("*", "host:h1", "tag:bastion")
+
+    assert _hammer(scheduler, [scheduler.keys("h1")] * 12, "host:h1") == 2
+    assert _hammer(scheduler, [scheduler.keys(f"h{i}") for i in range(20)], "*") == 5
+    tagged = [scheduler.keys(f"h{i}", ["bastion"]) for i in range(6)]
+    assert _hammer(scheduler, tagged, "tag:bastion") == 1
+    assert scheduler.in_flight("*") == 0
+
+
+def test_start_rate_and_queue_wait() -> None:
+    scheduler = RunScheduler(ConcurrencyLimits(per_host=None, starts_per_second=20, burst=2))
+    waits: list[int] = []
+    start = time.monotonic()
+    for i in range(6):
+        with scheduler.slot(scheduler.keys(f"h{i}")) as slot:
+            waits.append(slot.queue_wait_ms)
+    # Two starts from the burst, then one every 50ms.
+    assert time.monotonic() - start >= 0.18
+    assert waits[:2] == [0, 0] and all(w > 0 for w in waits[2:])
+
+
+def test_async_slots_share_limits_with_threads() -> None:
+    scheduler = RunScheduler(ConcurrencyLimits(per_host=2))
+    keys = scheduler.keys("h1")
+    peak = 0
+
+    async def job() -> int:
+        nonlocal peak
+        async with scheduler.slot_async(keys) as slot:
+            peak = max(peak, scheduler.in_flight("host:h1"))
+            await asyncio.sleep(0.05)
+        return slot.queue_wait_ms
+
+    async def main() -> list[int]:
+        # A thread holds one of the two slots for a while.
+        held = threading.Event()
+
+        def hold() -> None:
+            with scheduler.slot(keys):
+                held.set()
+                time.sleep(0.2)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        held.wait()
+        waits = await asyncio.gather(*(job() for _ in range(6)))
+        thread.join()
+        return waits
+
+    waits = asyncio.run(main())
+    assert peak == 2
+    assert max(waits) >= 100
+    assert scheduler.in_flight("host:h1") == 0
+
+
+def test_release_skips_closed_event_loops() -> None:
+    scheduler = RunScheduler(ConcurrencyLimits(per_host=1))
+    keys = scheduler.keys("h1")
+    acquired = threading.Event()
+
+    async def job() -> None:
+        async with scheduler.slot_async(keys):
+            acquired.set()
+
+    with scheduler.slot(keys):
+        # A task that queued for the slot, then lost its loop.
+        gone = asyncio.new_event_loop()
+        task = gone.create_task(job())
+        gone.run_until_complete(asyncio.sleep(0.05))
+        gone.close()
+        waiter = threading.Thread(target=lambda: asyncio.run(job()), daemon=True)
+        waiter.start()
+        time.sleep(0.1)
+    waiter.join(2)
+
+    assert acquired.is_set() and not task.done()
+    assert scheduler.in_flight("host:h1") == 0
+
+def test_move_host_waits_for_the_new_host() -> None:
+    scheduler = RunScheduler(ConcurrencyLimits(per_host=1))
+    busy = threading.Event()
+    done = threading.Event()
+
+    def hold_h2() -> None:
+        with scheduler.slot(scheduler.keys("h2")):
+            busy.set()
+            time.sleep(0.2)
+        done.set()
+
+    thread = threading.Thread(target=hold_h2)
+    thread.start()
+    busy.wait()
+    with scheduler.slot(scheduler.keys("h1")) as slot:
+        scheduler.move_host(slot, "h2")
+        # h1 was given back before waiting; h2 only once the other run let go.
+        assert done.is_set() and scheduler.in_flight("host:h1") == 0
+        assert slot.keys == ("*", "host:h2") and scheduler.in_flight("host:h2") == 1
+        scheduler.move_host(slot, "h2")
+        assert scheduler.in_flight("host:h2") == 1
+    thread.join()
+    assert scheduler.in_flight("host:h2") == 0 and scheduler.in_flight("*") == 0
+
+    async def move_async() -> tuple[str, ...]:
+        async with scheduler.slot_async(scheduler.keys("h1")) as slot:
+            await scheduler.move_host_async(slot, "h3")
+            assert scheduler.in_flight("host:h1") == 0
+            return slot.keys
+
+    assert asyncio.run(move_async()) == ("*", "host:h3")
+    assert scheduler.in_flight("host:h3") == 0
+
+def test_runs_record_queue_wait(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+    for name in ("A", "B"):
+        store.create_server(Server(name=name, hosts=HostSet(internal_primary="10.0.0.1")))
+    TagStore(backend).set_server_tags("B", ["slow"])
+    actions = ActionsStore(
+        backend, store, scheduler=RunScheduler(ConcurrencyLimits(per_host=None, per_tag={"slow": 1}))
+    )
+    command = f'"{sys.executable}" -c "import time; time.sleep(0.3)"'
+    action_id = actions.create_action(name="Sleep", description=None, command_template=command, requires_confirm=False)
+
+    fleet = actions.run_action_many(action_id, ["A", "B", "B"], dry_run=False)
+    assert fleet.summary() == {"success": 3}
+    # The two runs on the "slow" server went one after the other.
+    b_waits = sorted(r.run.queue_wait_ms for r in fleet.results if r.server_name == "B")
+    assert b_waits[0] < 100 and b_waits[1] >= 200
+    assert [r.run.queue_wait_ms < 100 for r in fleet.results if r.server_name == "A"] == [True]
+
+    recorded = {run.id: run.queue_wait_ms for run in actions.query_runs().runs}
+    assert recorded == {r.run.id: r.run.queue_wait_ms for r in fleet.results}
@@ -0,0 +1,67 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from myservers.core.actions import ActionsStore
+from myservers.core.servers import ServerStore
+from myservers.storage.sqlite_store import SqliteStore
+from tests.helpers import RunEnv, make_env
+
+BASE = datetime(2024, 3, 1, 12, tzinfo=timezone.utc)
+
+
+def _add_runs(env: RunEnv) -> None:
+    with env.backend.transaction():
+        for i in range(100):
+            for name, base_ms in (("Fast", 10), ("Slow", 1000)):
+                started = (BASE + timedelta(hours=i)).isoformat()
+                status = "error" if name == "Slow" and i % 10 == 0 else "success"
+                env.add_run(name, started, status=status, duration_ms=base_ms + i)
+        env.add_run("Fast", BASE.isoformat(), status="dry_run", duration_ms=0)
+
+
+def _check(actions: ActionsStore) -> None:
+    by_server = {st.server_name: st for st in actions.run_stats()}
+    fast, slow = by_server["Fast"], by_server["Slow"]
+    assert fast.runs == 100 and fast.successes == 100 and fast.last_failure_at is None
+    assert slow.runs == 100 and slow.failures == 10 and slow.success_rate == 0.9
+    assert slow.last_failure_at == (BASE + timedelta(hours=90)).isoformat()
+    assert fast.max_ms == 109 and abs(fast.avg_ms - 59.5) < 1e-9
+    # histogram buckets are ~19% wide
+    assert 59 <= fast.p50_ms <= 59 * 1.2
+    assert 1094 <= slow.p95_ms <= 1094 * 1.2
+
+    (overall,) = actions.run_stats(group_by="action")
+    assert overall.runs == 200 and overall.server_name is None
+
+    first_day = actions.run_stats(server="Slow", since="2024-03-01", until="2024-03-02")
+    assert [st.runs for st in first_day] == [12]
+
+
+def test_run_stats_maintained_on_insert(tmp_path: Path) -> None:
+    env = make_env(tmp_path / "data.sqlite3", ("Fast", "Slow"))
+    backend, actions = env.backend, env.actions
+    _add_runs(env)
+    _check(actions)
+
+    statements: list[str] = []
+    backend._conn.set_trace_callback(statements.append)
+    actions.run_stats()
+    backend._conn.set_trace_callback(None)
+    assert not [s for s in statements if "action_runs" in s]
+
+
+def test_run_stats_backfilled_by_migration(tmp_path: Path) -> None:
+    db_path = tmp_path / "data.sqlite3"
+    env = make_env(db_path, ("Fast", "Slow"))
+    _add_runs(env)
+    env.backend.close()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE action_run_stats")
+    conn.execute("PRAGMA user_version = 6")
+    conn.commit()
+    conn.close()
+
+    backend = SqliteStore(db_path)
+    _check(ActionsStore(backend, ServerStore(backend)))
@@ -1,7 +1,10 @@
 import sqlite3
 from pathlib import Path
 
+import pytest
+
 from myservers.core.identities_store import IdentitiesStore
+from myservers.storage.migrations import SCHEMA_VERSION
 from myservers.storage.sqlite_store import SqliteStore
 
 
@@ -42,3 +45,128 @@ def test_identities_key_path_migration(tmp_path: Path) -> None:
     cols = {row[1] for row in cur.fetchall()}
     assert "key_path" in cols
     conn.close()
+
+
+def _plan(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> str:
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return " | ".join(row[3] for row in rows)
+
+
+def test_hot_queries_use_indexes(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    conn = backend._conn
+
+    plan = _plan(conn, "SELECT kind, priority, address FROM hosts WHERE server_id = ?", (1,))
+    assert "USING COVERING INDEX idx_hosts_server" in plan
+
+    plan = _plan(conn, "SELECT id, label, url FROM web_links WHERE server_id = ? ORDER BY label", (1,))
+    assert "idx_web_links_server" in plan
+    assert "TEMP B-TREE" not in plan
+
+    plan = _plan(conn, "SELECT server_id FROM server_tags WHERE tag_id = ?", (1,))
+    assert "idx_server_tags_tag" in plan
+
+    plan = _plan(
+        conn,
+        """
+        SELECT ar.id, ar.started_at, s.name, a.name
+        FROM action_runs ar
+        JOIN servers s ON ar.server_id = s.id
+        JOIN actions a ON ar.action_id = a.id
+        ORDER BY ar.started_at DESC
+        LIMIT 100
+        """,
+    )
+    assert "idx_action_runs_started" in plan
+    assert "TEMP B-TREE" not in plan
+
+    plan = _plan(
+        conn,
+        "SELECT id FROM action_runs WHERE server_id = ? ORDER BY started_at DESC",
+        (1,),
+    )
+    assert "idx_action_runs_server_started" in plan
+    assert "TEMP B-TREE" not in plan
+
+    plan = _plan(conn, "SELECT id FROM action_runs WHERE action_id = ?", (1,))
+    assert "idx_action_runs_action_started" in plan
+
+
+def test_indexes_added_to_existing_database(tmp_path: Path) -> None:
+    db_path = tmp_path / "data.sqlite3"
+    SqliteStore(db_path).close()
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP INDEX idx_hosts_server")
+    conn.execute("PRAGMA user_version = 2")
+    conn.commit()
+    conn.close()
+
+    backend = SqliteStore(db_path)
+    names = {
+        row[0]
+        for row in backend._conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+    }
+    assert "idx_hosts_server" in names
+
+
+def test_current_database_skips_introspection(tmp_path: Path) -> None:
+    db_path = tmp_path / "data.sqlite3"
+    first = SqliteStore(db_path)
+    assert [t.version for t in first.migration_timings] == list(range(1, SCHEMA_VERSION + 1))
+    assert first._conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    first.close()
+
+    statements: list[str] = []
+    original_connect = sqlite3.connect
+
+    def tracing_connect(*args, **kwargs):  # type: ignore[no-untyped-def]
+        conn = original_connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    sqlite3.connect = tracing_connect  # type: ignore[assignment]
+    try:
+        second = SqliteStore(db_path)
+    finally:
+        sqlite3.connect = original_connect  # type: ignore[assignment]
+    assert second.migration_timings == []
+    assert not [s for s in statements if "sqlite_master" in s or "table_info" in s]
+
+
+def test_legacy_actions_table_gets_target_check(tmp_path: Path) -> None:
+    db_path = tmp_path / "data.sqlite3"
+    conn = sqlite3.connect(db_path)
+    conn.executescript(
+        """
+        CREATE TABLE servers (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL, notes TEXT DEFAULT '');
+        CREATE TABLE actions (
+            id               INTEGER PRIMARY KEY AUTOINCREMENT,
+            name             TEXT UNIQUE NOT NULL,
+            description      TEXT,
+            command_template TEXT NOT NULL,
+            requires_confirm INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE TABLE action_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action_id INTEGER NOT NULL REFERENCES actions(id) ON DELETE CASCADE,
+            server_id INTEGER NOT NULL REFERENCES servers(id) ON DELETE CASCADE,
+            started_at TEXT, finished_at TEXT, status TEXT, exit_code INTEGER,
+            duration_ms INTEGER, command_rendered TEXT, stdout TEXT, stderr TEXT
+        );
+        INSERT INTO servers(name) VALUES ('Srv1');
+        INSERT INTO actions(name, command_template) VALUES ('Echo', 'echo hi');
+        INSERT INTO action_runs(action_id, server_id, status) VALUES (1, 1, 'success');
+        """
+    )
+    conn.commit()
+    conn.close()
+
+    backend = SqliteStore(db_path)
+    conn = backend._conn
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'actions'").fetchone()[0]
+    assert "CHECK (execution_target" in sql
+    row = conn.execute("SELECT name, execution_target FROM actions").fetchone()
+    assert (row["name"], row["execution_target"]) == ("Echo", "local")
+    assert conn.execute("SELECT COUNT(*) FROM action_runs").fetchone()[0] == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("UPDATE actions SET execution_target = 'telnet'")
@@ -0,0 +1,87 @@
+import threading
+from pathlib import Path
+
+from myservers.core.identities_store import IdentitiesStore
+from myservers.core.models import HostSet, Server
+from myservers.core.servers import ServerStore
+from myservers.core.tags_store import TagStore
+from myservers.core.web_links_store import WebLinksStore
+from myservers.storage.sqlite_store import SqliteStore
+
+
+def _id_lookups(statements: list[str]) -> list[str]:
+    return [s for s in statements if "FROM servers WHERE name" in s]
+
+
+def test_server_id_lookups_are_cached(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+    tags = TagStore(backend)
+    idents = IdentitiesStore(backend)
+    links = WebLinksStore(backend)
+    store.create_server(Server(name="Srv1", hosts=HostSet(internal_primary="10.0.0.1")))
+
+    statements: list[str] = []
+    backend._conn.set_trace_callback(statements.append)
+    tags.set_server_tags("Srv1", ["prod"])
+    tags.get_server_tags("Srv1")
+    idents.set_ssh_profile("Srv1", port=2222, identity_id=None, username_override=None)
+    idents.get_ssh_profile("Srv1")
+    links.create_link("Srv1", "Dash", "https://example.com")
+    links.list_links("Srv1")
+    backend._conn.set_trace_callback(None)
+    assert _id_lookups(statements) == []
+
+    server_id = backend.server_id("Srv1")
+    assert server_id is not None
+    assert backend.server_name(server_id) == "Srv1"
+    assert tags.get_server_tags_by_id(server_id) == ["prod"]
+    profile = idents.get_ssh_profile_by_id(server_id)
+    assert profile is not None and profile.server_name == "Srv1" and profile.port == 2222
+    assert [l.label for l in links.list_links_by_id(server_id)] == ["Dash"]
+
+
+def test_server_id_cache_invalidated_on_rename_and_delete(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+    store.create_server(Server(name="Old", hosts=HostSet()))
+    old_id = backend.server_id("Old")
+
+    store.update_server("Old", Server(name="New", hosts=HostSet()))
+    assert backend.server_id("Old") is None
+    # Renames keep the row, so the id now resolves to the new name.
+    assert backend.server_id("New") == old_id
+    assert backend.server_name(old_id) == "New"
+
+    store.delete_server("New")
+    assert backend.server_id("New") is None
+
+
+def test_server_id_cache_is_shared_across_threads(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    ServerStore(backend).create_server(Server(name="Srv1", hosts=HostSet()))
+    server_id = backend.server_id("Srv1")
+    statements: list[str] = []
+
+    def lookups() -> None:
+        backend._conn.set_trace_callback(statements.append)
+        for _ in range(3):
+            assert backend.server_id("Srv1") == server_id
+        backend._conn.set_trace_callback(None)
+
+    for _ in range(2):
+        worker = threading.Thread(target=lookups)
+        worker.start()
+        worker.join()
+    # No re-query of servers; the change counter is read once per new connection.
+    assert _id_lookups(statements) == []
+    assert len([s for s in statements if "change_counters" in s]) <= 2
+
+    # Inside a transaction other connections' commits are invisible: one check.
+    statements.clear()
+    backend._conn.set_trace_callback(statements.append)
+    with backend.transaction():
+        for _ in range(3):
+            assert backend.server_id("Srv1") == server_id
+    backend._conn.set_trace_callback(None)
+    assert statements.count("PRAGMA data_version") == 1
@@ -0,0 +1,73 @@
+import sqlite3
+from pathlib import Path
+
+from myservers.core.models import HostSet, Server
+from myservers.core.servers import ServerStore
+from myservers.core.tags_store import TagStore
+from myservers.storage.sqlite_store import SqliteStore
+
+
+def _seed(backend: SqliteStore) -> None:
+    store = ServerStore(backend)
+    tags = TagStore(backend)
+    store.create_server(Server(name="app1", hosts=HostSet(internal_primary="10.0.0.1")))
+    store.create_server(
+        Server(name="db1", hosts=HostSet(internal_primary="10.0.0.2", external_primary="db.example.com"))
+    )
+    store.create_server(Server(name="cache1", hosts=HostSet(internal_primary="10.0.0.3")))
+    tags.set_server_tags("app1", ["prod", "frontend"])
+    tags.set_server_tags("db1", ["prod", "database"])
+    tags.set_server_tags("cache1", ["staging"])
+
+
+def test_search_servers_by_name_host_and_tag(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    _seed(backend)
+
+    assert backend.search_servers("app1") == ["app1"]
+    assert backend.search_servers("10.0.0.2") == ["db1"]
+    assert backend.search_servers("EXAMPLE.com") == ["db1"]
+    assert backend.search_servers("frontend") == ["app1"]
+    assert sorted(backend.search_servers("", tag="prod")) == ["app1", "db1"]
+    assert backend.search_servers("10.0.0", tag="Prod", limit=1) in (["app1"], ["db1"])
+    assert backend.search_servers("") == ["app1", "cache1", "db1"]
+    # Short queries fall back to substring matching.
+    assert backend.search_servers("b1") == ["db1"]
+
+
+def test_search_index_follows_updates(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    _seed(backend)
+    store = ServerStore(backend)
+    tags = TagStore(backend)
+
+    store.update_server("cache1", Server(name="redis1", hosts=HostSet(internal_primary="10.9.9.9")))
+    assert backend.search_servers("cache1") == []
+    assert backend.search_servers("10.9.9.9") == ["redis1"]
+
+    tags.set_server_tags("app1", ["canary"])
+    assert backend.search_servers("frontend") == []
+    assert backend.search_servers("canary") == ["app1"]
+
+    store.delete_server("db1")
+    assert backend.search_servers("10.0.0.2") == []
+
+
+def test_search_index_backfilled_for_existing_database(tmp_path: Path) -> None:
+    db_path = tmp_path / "data.sqlite3"
+    backend = SqliteStore(db_path)
+    _seed(backend)
+    backend.close()
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DROP TABLE server_search")
+    for (trigger,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'server_search_%'"
+    ).fetchall():
+        conn.execute(f"DROP TRIGGER {trigger}")
+    conn.execute("PRAGMA user_version = 3")
+    conn.commit()
+    conn.close()
+
+    reopened = SqliteStore(db_path)
+    assert reopened.search_servers("database") == ["db1"]
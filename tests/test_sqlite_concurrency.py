@@ -0,0 +1,59 @@
+import threading
+from pathlib import Path
+
+from myservers.core.models import HostSet, Server
+from myservers.core.servers import ServerStore
+from myservers.core.tags_store import TagStore
+from myservers.storage.sqlite_store import SqliteStore
+
+
+def test_sqlite_uses_wal_and_per_thread_connections(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    assert backend._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert backend._conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
+
+    main_conn = backend._conn
+    assert backend._conn is main_conn
+
+    seen: list[object] = []
+    t = threading.Thread(target=lambda: seen.append(backend._conn))
+    t.start()
+    t.join()
+    assert seen and seen[0] is not main_conn
+    backend.close()
+
+
+def test_sqlite_concurrent_writers_and_readers(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+    tags = TagStore(backend)
+    errors: list[BaseException] = []
+
+    def writer(prefix: str) -> None:
+        try:
+            for i in range(20):
+                name = f"{prefix}{i}"
+                store.create_server(Server(name=name, hosts=HostSet(internal_primary="10.0.0.1")))
+                tags.set_server_tags(name, [prefix])
+        except BaseException as exc:  # pragma: no cover - surfaced via assert below
+            errors.append(exc)
+
+    def reader() -> None:
+        try:
+            for _ in range(20):
+                store.list_servers()
+                tags.list_tags()
+        except BaseException as exc:  # pragma: no cover
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer, args=(p,)) for p in ("a", "b", "c")]
+    threads += [threading.Thread(target=reader) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(store.list_servers()) == 60
+    assert tags.list_tags() == ["a", "b", "c"]
+    backend.close()
@@ -57,3 +57,64 @@ def test_sqlite_migration_from_json(tmp_path: Path) -> None:
     assert migrated.hosts.internal_primary == "10.10.0.1"
     assert migrated.hosts.external_secondary == "198.51.100.2"
 
+
+
+def test_sqlite_list_servers_uses_constant_queries(tmp_path: Path) -> None:
+    db_path = tmp_path / "data.sqlite3"
+    backend = SqliteStore(db_path)
+    store = ServerStore(backend)
+    for i in range(25):
+        store.create_server(
+            Server(
+                name=f"srv{i:02d}",
+                hosts=HostSet(internal_primary=f"10.0.0.{i}", external_secondary=f"203.0.113.{i}"),
+            )
+        )
+    store.create_server(Server(name="nohosts", hosts=HostSet()))
+
+    statements: list[str] = []
+    backend._conn.set_trace_callback(statements.append)
+    try:
+        servers = store.list_servers()
+    finally:
+        backend._conn.set_trace_callback(None)
+
+    assert len([s for s in statements if s.lstrip().upper().startswith("SELECT")]) == 2
+    assert len(servers) == 26
+    by_name = {s.name: s for s in servers}
+    assert by_name["srv07"].hosts.internal_primary == "10.0.0.7"
+    assert by_name["srv07"].hosts.external_secondary == "203.0.113.7"
+    assert by_name["nohosts"].hosts == HostSet()
+
+
+def test_sqlite_typed_api_round_trips_notes(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+    store.create_server(
+        Server(name="Srv", hosts=HostSet(internal_primary="10.0.0.1", external_primary="203.0.113.1"), notes="rack 4")
+    )
+
+    got = backend.get_server("Srv")
+    assert got == Server(name="Srv", hosts=HostSet(internal_primary="10.0.0.1", external_primary="203.0.113.1"), notes="rack 4")
+    assert backend.list_servers() == [got]
+    # Legacy dict API sees the same data.
+    assert backend.get("Servers", "Srv")["Notes"] == "rack 4"
+
+
+def test_sqlite_rename_keeps_related_rows(tmp_path: Path) -> None:
+    from myservers.core.tags_store import TagStore
+
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+    tags = TagStore(backend)
+    store.create_server(Server(name="Old", hosts=HostSet(internal_primary="10.0.0.1")))
+    tags.set_server_tags("Old", ["prod"])
+
+    store.update_server("Old", Server(name="New", hosts=HostSet(internal_primary="10.0.0.2")))
+    assert store.get_server("Old") is None
+    assert store.get_server("New").hosts.internal_primary == "10.0.0.2"
+    assert tags.get_server_tags("New") == ["prod"]
+
+    store.delete_server("New")
+    # Foreign keys cascade on delete.
+    assert backend._conn.execute("SELECT COUNT(*) FROM server_tags").fetchone()[0] == 0
@@ -41,3 +41,9 @@ def test_ssh_command_empty_host_returns_empty() -> None:
     profile = SshProfileMeta(server_name="Srv", port=22, identity_id=None, username_override=None)
     cmd = build_ssh_command(server, profile, None)
     assert cmd == ""
+
+
+def test_ssh_command_for_given_host() -> None:
+    server = Server(name="Srv", hosts=HostSet(internal_primary="10.0.0.1", external_primary="203.0.113.5"))
+    profile = SshProfileMeta(server_name="Srv", port=22, identity_id=None, username_override="admin")
+    assert build_ssh_command(server, profile, None, host="203.0.113.5") == "ssh admin@203.0.113.5"
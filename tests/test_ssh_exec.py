@@ -5,6 +5,7 @@ import keyring
 import pytest
 from keyring.backend import KeyringBackend
 
+from myservers.connectors.capture import CaptureResult
 from myservers.connectors.exec_ssh import build_ssh_invocation_string, execute_ssh
 from myservers.core.actions import ActionsStore
 from myservers.core.identities_store import IdentitiesStore
@@ -80,18 +81,14 @@ def test_ssh_invocation_never_includes_secrets() -> None:
     assert "SECRET" not in cmd
 
 
-@patch("myservers.connectors.exec_ssh.subprocess.run")
+@patch("myservers.connectors.exec_ssh.run_bounded")
 def test_ssh_execution_calls_subprocess_correctly(mock_run: MagicMock) -> None:
     server = Server(name="Srv", hosts=HostSet(internal_primary="10.0.0.1"))
     from myservers.core.identities_store import SshProfileMeta, IdentityMeta
 
     profile = SshProfileMeta(server_name="Srv", port=2222, identity_id=1, username_override="admin")
     identity = IdentityMeta(id=1, name="id1", username="user", kind="ssh_key_path", key_path="/key")
-    mock_proc = MagicMock()
-    mock_proc.returncode = 0
-    mock_proc.stdout = "output"
-    mock_proc.stderr = ""
-    mock_run.return_value = mock_proc
+    mock_run.return_value = CaptureResult(exit_code=0, stdout="output", stderr="", duration_ms=5)
 
     ec, out, err, duration = execute_ssh(server, profile, identity, "echo hello", timeout_s=30)
     assert ec == 0
@@ -105,7 +102,7 @@ def test_ssh_execution_calls_subprocess_correctly(mock_run: MagicMock) -> None:
     assert "echo hello" in call_args[0][0]
 
 
-@patch("myservers.connectors.exec_ssh.subprocess.run")
+@patch("myservers.connectors.exec_ssh.run_bounded")
 def test_ssh_action_run_records_history(mock_run: MagicMock, tmp_path: Path) -> None:
     db_path = tmp_path / "test_ssh_action.db"
     backend = SqliteStore(db_path)
@@ -127,11 +124,7 @@ def test_ssh_action_run_records_history(mock_run: MagicMock, tmp_path: Path) ->
         execution_target="ssh",
     )
 
-    mock_proc = MagicMock()
-    mock_proc.returncode = 0
-    mock_proc.stdout = "Srv1"
-    mock_proc.stderr = ""
-    mock_run.return_value = mock_proc
+    mock_run.return_value = CaptureResult(exit_code=0, stdout="Srv1", stderr="", duration_ms=5)
 
     run = actions.run_action(action_id, "Srv1", dry_run=False)
     assert run.status == "success"
@@ -0,0 +1,154 @@
+import asyncio
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from myservers.connectors import exec_ssh
+from myservers.connectors.capture import CaptureResult
+from myservers.connectors.exec_ssh import RetryPolicy, execute_ssh_capture, execute_ssh_capture_async
+from myservers.connectors.ssh_mux import SshMultiplexer
+from myservers.core.actions import ActionsStore
+from myservers.core.identities_store import SshProfileMeta
+from myservers.core.models import HostSet, Server
+from myservers.core.servers import ServerStore
+from myservers.storage.sqlite_store import SqliteStore
+
+SERVER = Server(
+    name="Srv",
+    hosts=HostSet(internal_primary="10.0.0.1", internal_secondary="10.0.0.1", external_primary="203.0.113.5"),
+)
+PROFILE = SshProfileMeta(server_name="Srv", port=22, identity_id=None, username_override="admin")
+FAST = RetryPolicy(attempts_per_host=2, backoff_s=0.01)
+
+
+def _refused(host: str) -> CaptureResult:
+    stderr = f"ssh: connect to host {host} port 22: Connection refused\r\n"
+    return CaptureResult(exit_code=255, stdout="", stderr=stderr, duration_ms=3)
+
+
+def _destinations(mock_run: MagicMock) -> list[str]:
+    # The destination is the last argument of build_ssh_command, before the safe options.
+    return [call.args[0][call.args[0].index("-o") - 1] for call in mock_run.call_args_list]
+
+
+@pytest.fixture(autouse=True)
+def no_mux(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(exec_ssh, "default_multiplexer", lambda: SshMultiplexer(None))
+
+
+@patch("myservers.connectors.exec_ssh.run_bounded")
+def test_fails_over_to_next_host_after_retries(mock_run: MagicMock) -> None:
+    ok = CaptureResult(exit_code=0, stdout="up\n", stderr="", duration_ms=3)
+    mock_run.side_effect = [_refused("10.0.0.1"), _refused("10.0.0.1"), ok]
+
+    result = execute_ssh_capture(SERVER, PROFILE, None, "uptime", retry=FAST)
+    assert result.exit_code == 0 and result.host == "203.0.113.5"
+    # Duplicate addresses are tried once.
+    assert _destinations(mock_run) == ["admin@10.0.0.1", "admin@10.0.0.1", "admin@203.0.113.5"]
+
+
+@patch("myservers.connectors.exec_ssh.run_bounded")
+def test_command_and_login_failures_are_not_retried(mock_run: MagicMock) -> None:
+    # The remote command itself exited 255.
+    mock_run.return_value = CaptureResult(
+        exit_code=255, stdout="partial\n", stderr="Connection refused", duration_ms=3, stdout_bytes=8
+    )
+    assert execute_ssh_capture(SERVER, PROFILE, None, "x", retry=FAST).host == "10.0.0.1"
+    assert mock_run.call_count == 1
+
+    # Another address of the same server would refuse the login too.
+    mock_run.reset_mock()
+    mock_run.return_value = CaptureResult(
+        exit_code=255, stdout="", stderr="admin@10.0.0.1: Permission denied (publickey).", duration_ms=3
+    )
+    execute_ssh_capture(SERVER, PROFILE, None, "x", retry=FAST)
+    assert mock_run.call_count == 1
+
+    # Every address down: the last failure is reported.
+    mock_run.reset_mock()
+    mock_run.side_effect = lambda argv, **_: _refused(argv[argv.index("-o") - 1].split("@")[-1])
+    result = execute_ssh_capture(SERVER, PROFILE, None, "x", retry=FAST)
+    assert result.exit_code == 255 and result.host == "203.0.113.5"
+    assert mock_run.call_count == 4
+
+
+@pytest.mark.parametrize(
+    "stderr",
+    [
+        # The session was up and the command may have run: never re-run it.
+        "Connection to 10.0.0.1 closed by remote host.\r\n",
+        "client_loop: send disconnect: Broken pipe\r\n",
+        "Connection reset by 10.0.0.1 port 22\r\n",
+        "deploy failed\nssh: connect to host 10.0.0.1 port 22: Connection refused\r\n",
+        # The remote command's own ssh could not connect elsewhere.
+        "ssh: connect to host 10.9.9.9 port 22: Connection refused\r\n",
+    ],
+)
+@patch("myservers.connectors.exec_ssh.run_bounded")
+def test_failures_after_the_session_started_are_not_retried(mock_run: MagicMock, stderr: str) -> None:
+    mock_run.return_value = CaptureResult(exit_code=255, stdout="", stderr=stderr, duration_ms=3)
+    result = execute_ssh_capture(SERVER, PROFILE, None, "deploy", retry=FAST)
+    assert result.host == "10.0.0.1"
+    assert mock_run.call_count == 1
+
+
+@patch("myservers.connectors.exec_ssh.run_bounded")
+def test_handshake_and_lookup_failures_fail_over(mock_run: MagicMock) -> None:
+    kex = "kex_exchange_identification: read: Connection reset by peer\r\nConnection reset by 10.0.0.1 port 22\r\n"
+    mock_run.side_effect = [
+        CaptureResult(exit_code=255, stdout="", stderr=kex, duration_ms=3),
+        CaptureResult(
+            exit_code=255,
+            stdout="",
+            stderr="ssh: Could not resolve hostname 10.0.0.1: Name or service not known\r\n",
+            duration_ms=3,
+        ),
+        CaptureResult(exit_code=0, stdout="ok", stderr="", duration_ms=3),
+    ]
+    result = execute_ssh_capture(SERVER, PROFILE, None, "x", retry=FAST)
+    assert result.exit_code == 0 and result.host == "203.0.113.5"
+
+
+def test_async_failover() -> None:
+    calls: list[str] = []
+
+    async def fake_run(argv: list[str], **_kwargs: object) -> CaptureResult:
+        host = argv[argv.index("-o") - 1]
+        calls.append(host)
+        if host.endswith("10.0.0.1"):
+            return _refused("10.0.0.1")
+        return CaptureResult(exit_code=0, stdout="ok", stderr="", duration_ms=3)
+
+    with patch.object(exec_ssh, "run_bounded_async", fake_run):
+        result = asyncio.run(execute_ssh_capture_async(SERVER, PROFILE, None, "x", retry=FAST))
+    assert result.host == "203.0.113.5"
+    assert calls == ["admin@10.0.0.1", "admin@10.0.0.1", "admin@203.0.113.5"]
+
+
+@patch("myservers.connectors.exec_ssh.run_bounded")
+def test_run_records_serving_host(mock_run: MagicMock, tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+    store.create_server(SERVER)
+    actions = ActionsStore(backend, store, ssh_retry=RetryPolicy(attempts_per_host=1))
+    action_id = actions.create_action(
+        name="Uptime", description=None, command_template="uptime", requires_confirm=False, execution_target="ssh"
+    )
+    results = iter([_refused("10.0.0.1"), CaptureResult(exit_code=0, stdout="up", stderr="", duration_ms=3)])
+    held: list[tuple[int, int]] = []
+
+    def fake_run(argv: list[str], **_kwargs: object) -> CaptureResult:
+        scheduler = actions.scheduler
+        held.append((scheduler.in_flight("host:10.0.0.1"), scheduler.in_flight("host:203.0.113.5")))
+        return next(results)
+
+    mock_run.side_effect = fake_run
+
+    run = actions.run_action(action_id, "Srv", dry_run=False)
+    assert run.status == "success" and run.host == "203.0.113.5"
+    # The per-host slot followed the failover.
+    assert held == [(1, 0), (0, 1)]
+    assert actions.scheduler.in_flight("host:203.0.113.5") == 0
+    assert actions.query_runs().runs[0].host == "203.0.113.5"
+    assert actions.run_action(action_id, "Srv", dry_run=True).host is None
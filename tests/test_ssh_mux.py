@@ -0,0 +1,97 @@
+import subprocess
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from myservers.connectors import exec_ssh, ssh_mux
+from myservers.connectors.capture import CaptureResult
+from myservers.connectors.exec_ssh import NO_RETRY, execute_ssh_capture
+from myservers.connectors.ssh_mux import SshMultiplexer, runtime_dir
+from myservers.core.identities_store import SshProfileMeta
+from myservers.core.models import HostSet, Server
+
+SERVER = Server(name="Srv", hosts=HostSet(internal_primary="10.0.0.1"))
+PROFILE = SshProfileMeta(server_name="Srv", port=2222, identity_id=None, username_override="admin")
+BASE = ["ssh", "-p", "2222", "admin@10.0.0.1"]
+
+
+@pytest.fixture
+def mux(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> SshMultiplexer:
+    control_dir = tmp_path / "run"
+    control_dir.mkdir(mode=0o700)
+    mux = SshMultiplexer(control_dir, persist_s=60)
+    monkeypatch.setattr(exec_ssh, "default_multiplexer", lambda: mux)
+    return mux
+
+
+def test_runtime_dir_is_private(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    path = runtime_dir()
+    assert path == tmp_path / "myservers-tool-v2"
+    assert path.stat().st_mode & 0o777 == 0o700
+
+    path.chmod(0o777)
+    assert runtime_dir() is None
+
+    monkeypatch.setattr(ssh_mux.os, "name", "nt")
+    assert runtime_dir() is None
+
+
+@patch("myservers.connectors.exec_ssh.run_bounded")
+def test_runs_go_through_the_control_master(mock_run: MagicMock, mux: SshMultiplexer) -> None:
+    mock_run.return_value = CaptureResult(exit_code=0, stdout="ok", stderr="", duration_ms=3)
+
+    execute_ssh_capture(SERVER, PROFILE, None, "uptime")
+    argv = mock_run.call_args[0][0]
+    control_path = f"ControlPath={mux._dir / '%C'}"
+    assert argv[: len(BASE)] == BASE
+    assert "ControlMaster=auto" in argv and control_path in argv and "ControlPersist=60" in argv
+    assert argv.index(control_path) < argv.index("--")
+    assert argv[-2:] == ["--", "uptime"]
+
+    execute_ssh_capture(SERVER, PROFILE, None, "uptime", multiplex=False)
+    assert not any(arg.startswith("Control") for arg in mock_run.call_args[0][0])
+    assert SshMultiplexer(None).options(BASE) == []
+
+
+@patch("myservers.connectors.exec_ssh.run_bounded")
+def test_broken_master_is_dropped_after_connection_error(mock_run: MagicMock, mux: SshMultiplexer) -> None:
+    mock_run.return_value = CaptureResult(exit_code=255, stdout="", stderr="Connection reset", duration_ms=3)
+    control_path = f"ControlPath={mux._dir / '%C'}"
+
+    with patch.object(ssh_mux.subprocess, "run") as control:
+        # Master still answers: the 255 came from elsewhere, keep it.
+        control.return_value = subprocess.CompletedProcess([], 0)
+        execute_ssh_capture(SERVER, PROFILE, None, "uptime", retry=NO_RETRY)
+        assert [call.args[0] for call in control.call_args_list] == [
+            ["ssh", "-o", control_path, "-O", "check", "-p", "2222", "admin@10.0.0.1"],
+        ]
+
+        control.reset_mock()
+        control.return_value = subprocess.CompletedProcess([], 255)
+        execute_ssh_capture(SERVER, PROFILE, None, "uptime", retry=NO_RETRY)
+        assert [call.args[0][4] for call in control.call_args_list] == ["check", "exit"]
+
+
+def test_close_all_stops_masters_in_use(mux: SshMultiplexer) -> None:
+    other = ["ssh", "root@10.0.0.2"]
+    mux.options(BASE)
+    mux.options(other)
+    with patch.object(ssh_mux.subprocess, "run") as control:
+        control.return_value = subprocess.CompletedProcess([], 0)
+        # No control sockets at all: nothing to stop.
+        mux.close_all()
+        assert control.call_count == 0
+
+        mux.options(BASE)
+        mux.options(other)
+        (mux._dir / "0123abcd").touch()
+        mux.close_all()
+        stopped = sorted(call.args[0][-1] for call in control.call_args_list)
+        assert stopped == ["admin@10.0.0.1", "root@10.0.0.2"]
+        assert all(call.args[0][3:5] == ["-O", "stop"] for call in control.call_args_list)
+
+        control.reset_mock()
+        mux.close_all()
+        assert control.call_count == 0
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+import pytest
+
+from myservers.core.models import HostSet, Server
+from myservers.core.servers import ServerStore
+from myservers.core.tags_store import TagStore
+from myservers.storage.sqlite_store import SqliteStore
+
+
+def test_transaction_commits_once(tmp_path: Path) -> None:
+    db_path = tmp_path / "data.sqlite3"
+    backend = SqliteStore(db_path)
+    store = ServerStore(backend)
+    tags = TagStore(backend)
+
+    statements: list[str] = []
+    backend._conn.set_trace_callback(statements.append)
+    with backend.transaction():
+        for i in range(10):
+            store.create_server(Server(name=f"srv{i}", hosts=HostSet(internal_primary="10.0.0.1")))
+            tags.set_server_tags(f"srv{i}", ["prod"])
+    backend._conn.set_trace_callback(None)
+
+    assert [s for s in statements if s.upper().startswith("COMMIT")] == ["COMMIT"]
+    reopened = ServerStore(SqliteStore(db_path))
+    assert len(reopened.list_servers()) == 10
+
+
+def test_transaction_rolls_back_on_error(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+
+    with pytest.raises(RuntimeError):
+        with backend.transaction():
+            store.create_server(Server(name="a", hosts=HostSet()))
+            raise RuntimeError("boom")
+    assert store.list_servers() == []
+    assert not backend.in_transaction()
+
+
+def test_nested_transaction_uses_savepoints(tmp_path: Path) -> None:
+    backend = SqliteStore(tmp_path / "data.sqlite3")
+    store = ServerStore(backend)
+
+    with backend.transaction():
+        store.create_server(Server(name="outer", hosts=HostSet()))
+        with pytest.raises(ValueError):
+            with backend.transaction():
+                store.create_server(Server(name="inner", hosts=HostSet()))
+                raise ValueError("inner failure")
+        with backend.transaction():
+            store.create_server(Server(name="inner2", hosts=HostSet()))
+
+    assert sorted(s.name for s in store.list_servers()) == ["inner2", "outer"]